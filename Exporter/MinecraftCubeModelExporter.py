@@ -1,10 +1,25 @@
 # ExportHelper is a helper class, defines filename and
 # invoke() function which calls the file selector.
+import traceback
+
 from bpy_extras.io_utils import ExportHelper
-from bpy.props import StringProperty, BoolProperty, EnumProperty
+from bpy.props import StringProperty, BoolProperty, EnumProperty, FloatProperty, IntProperty
 from bpy.types import Operator
 
+from MCExport.Exporter import formats
 from MCExport.Exporter import function
+from MCExport.Exporter import lod
+from MCExport.Exporter import profiling
+from MCExport.Exporter import reduce
+from MCExport.Exporter import steps
+from MCExport.Exporter import watch
+
+
+# Interval of the timer driving the modal export and the time spent
+# exporting per timer event, in seconds. The rest is left to the user
+# interface.
+TIMER_INTERVAL = 0.02
+TIME_SLICE = 0.05
 
 
 class MinecraftCubeModelExporter(Operator, ExportHelper):
@@ -21,14 +36,205 @@ class MinecraftCubeModelExporter(Operator, ExportHelper):
         options={'HIDDEN'},
         )
     
+    output_formats = EnumProperty(
+        name="Formats",
+        description="Files written from the exported model. Other formats than the java class are put "
+                    "next to the .java file.",
+        items=tuple((name, backend.label, "Write a " + backend.extension + " file")
+                    for name, backend in formats.BACKENDS.items()),
+        options={'ENUM_FLAG'},
+        default=set(formats.DEFAULT_FORMATS),
+    )
+    
+    construction = EnumProperty(
+        name="Box construction",
+        description="How the generated class builds its ModelRenderers.",
+        items=(('CODE', "Java statements", "Statements for every box in the constructor"),
+               ('TABLE', "Binary resource", "Build the ModelRenderers in a loop from a .mcmodel resource, the "
+                                            "size of the class does not grow with the number of boxes")),
+        default='CODE',
+    )
+    
+    split_static = BoolProperty(
+        name="Compile static parts",
+        description="Render the parts no animation moves from a single display list recorded on the "
+                    "first frame. They can no longer be moved or hidden in setRotationAngles.",
+        default=False,
+    )
+    
+    cull_faces = BoolProperty(
+        name="Cull hidden faces",
+        description="Leave out the faces of boxes covered by other boxes and boxes buried in others. "
+                    "Assumes opaque textures and parts only moved by the exported animations.",
+        default=False,
+    )
+    
+    lod_distances = StringProperty(
+        name="Detail distances",
+        description="Comma separated distances in blocks from which the class hides more of the parts "
+                    "too small to be seen, e.g. '24, 48'. Only whole ModelRenderers are hidden, a small box "
+                    "sharing one with a large box (e.g. merged boxes) stays. Leave empty to always render "
+                    "everything.",
+        default="",
+    )
+    
     export_animations = BoolProperty(
         name="Export animations",
         description="Set to export animation data.",
         default=False,
     )
     
+    animation_format = EnumProperty(
+        name="Animation data",
+        description="How the baked animations are stored.",
+        items=(('INLINE', "Java literals", "Inline the animation data into the class"),
+               ('FLOAT32', "Binary resource", "Write the animation data into a .mcanim resource"),
+               ('INT16', "Binary resource (16 bit)", "Write the animation data quantized to 16 bit "
+                                                     "into a .mcanim resource")),
+        default='INLINE',
+    )
+    
+    reduce_keyframes = BoolProperty(
+        name="Reduce keyframes",
+        description="Drop baked frames the interpolation of the generated class restores within the tolerances.",
+        default=True,
+    )
+    
+    pivot_tolerance = FloatProperty(
+        name="Position tolerance",
+        description="Maximum error of the rotation points in pixels.",
+        default=reduce.PIVOT_TOLERANCE,
+        min=0.,
+        precision=4,
+    )
+    
+    angle_tolerance = FloatProperty(
+        name="Rotation tolerance",
+        description="Maximum error of the rotation angles.",
+        default=reduce.ANGLE_TOLERANCE,
+        min=0.,
+        precision=4,
+        subtype='ANGLE',
+    )
+    
+    merge_boxes = BoolProperty(
+        name="Merge boxes",
+        description="Boxes with the same rotation point, rotation and animation share a single "
+                    "ModelRenderer, which renders faster.",
+        default=False,
+    )
+    
+    use_cache = BoolProperty(
+        name="Use export cache",
+        description="Only recompute objects that changed since the last export. "
+                    "The cache is stored next to the .blend file.",
+        default=False,
+    )
+    
+    bake_workers = IntProperty(
+        name="Bake workers",
+        description="Number of processes baking the animation clips in parallel (0: one per CPU core). "
+                    "Small animations are always baked in blender's process.",
+        default=0,
+        min=0,
+        max=64,
+    )
+    
+    run_modal = BoolProperty(
+        name="Export in background",
+        description="Keep blender's interface drawn during the export and show its progress. The "
+                    "scene cannot be edited meanwhile. Press Esc to cancel, the files are only "
+                    "replaced when the export has finished. Without a "
+                    "window (e.g. in background mode) the export always runs at once.",
+        default=True,
+    )
+    
+    profile_export = BoolProperty(
+        name="Profile export",
+        description="Measure the time and memory of every export phase. A summary is reported and "
+                    "the full profile is written to <name>.profile.json next to the exported file.",
+        default=False,
+    )
+    
+    _timer = None
+    _steps = None
+    _profile = None
+    
     def execute(self, context):
-        return function.write_data(context, self.filepath, self.export_animations)#, self.use_setting)
+        if not self.output_formats:
+            self.report({'ERROR'}, "No output format selected")
+            return {'CANCELLED'}
+        try:
+            lod_distances = lod.parse_distances(self.lod_distances)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
+        tolerances = (self.pivot_tolerance, self.angle_tolerance) if self.reduce_keyframes else None
+        self._profile = profiling.Profile() if self.profile_export else None
+        self._steps = function.iter_write_data(context, self.filepath, self.export_animations,
+                                               use_cache=self.use_cache, animation_format=self.animation_format,
+                                               keyframe_tolerances=tolerances, merge_boxes=self.merge_boxes,
+                                               profile=self._profile, bake_workers=self.bake_workers,
+                                               output_formats=self.output_formats,
+                                               construction=self.construction, split_static=self.split_static,
+                                               cull_faces=self.cull_faces, lod_distances=lod_distances)
+        if not self.run_modal or context.window is None:
+            return self.finish_(context, steps.run(self._steps))
+        
+        wm = context.window_manager
+        self._timer = wm.event_timer_add(TIMER_INTERVAL, window=context.window)
+        wm.progress_begin(0, 100)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            # Closing the generator removes the temporary files, the old files stay untouched.
+            self._steps.close()
+            self.report({'WARNING'}, "Export cancelled")
+            return self.finish_(context, {'CANCELLED'})
+        if event.type == 'TIMER' and event.timer != self._timer:
+            return {'PASS_THROUGH'}
+        if event.type != 'TIMER':
+            # The scene is read while exporting, so it must not be edited in between.
+            return {'RUNNING_MODAL'}
+        
+        try:
+            # The profile only runs during the time slice, not while blender's interface is busy.
+            with profiling.resumed(self._profile):
+                finished, progress, result = steps.advance(self._steps, TIME_SLICE)
+        except Exception as e:
+            traceback.print_exc()
+            self.report({'ERROR'}, "Export failed: "+str(e))
+            return self.finish_(context, {'CANCELLED'})
+        if finished:
+            return self.finish_(context, result)
+        context.window_manager.progress_update(int(progress * 100))
+        context.workspace.status_text_set("Exporting Minecraft model: {:.0%} (Esc to cancel)".format(progress))
+        return {'RUNNING_MODAL'}
+    
+    def finish_(self, context, result):
+        """
+        Clean up after the export and report the result.
+        """
+        
+        if self._timer is not None:
+            wm = context.window_manager
+            wm.event_timer_remove(self._timer)
+            wm.progress_end()
+            context.workspace.status_text_set(None)
+            self._timer = None
+        if result == {'FINISHED'}:
+            tolerances = (self.pivot_tolerance, self.angle_tolerance) if self.reduce_keyframes else None
+            watch.remember_export(self.filepath, export_anim=self.export_animations,
+                                  animation_format=self.animation_format, keyframe_tolerances=tolerances,
+                                  merge_boxes=self.merge_boxes, bake_workers=self.bake_workers,
+                                  output_formats=set(self.output_formats), construction=self.construction,
+                                  split_static=self.split_static, cull_faces=self.cull_faces,
+                                  lod_distances=lod.parse_distances(self.lod_distances))
+        if result == {'FINISHED'} and self._profile is not None:
+            self.report({'INFO'}, self._profile.get_summary())
+        return result
 
 
 # Only needed if you want to add into a dynamic menu
@@ -0,0 +1,87 @@
+"""
+Index of the animations (NLA tracks) of a scene.
+
+Every NLA track name is an animation clip. The index is built in a single
+pass over the objects and holds everything the exporter needs to know
+about a clip: its index, its length and which objects take part in it with
+which actions.
+"""
+
+import math
+from collections import namedtuple
+
+
+AnimationClip = namedtuple("AnimationClip", ["index", "max_frame", "objects", "strips"])
+AnimationClip.__doc__ = """
+An animation clip (all NLA tracks with the same name).
+index: Running index of the clip in the order the clips were found.
+max_frame: Number of frames of the clip (end of its last strip).
+objects: Names of the objects which have a track for this clip.
+strips: Dict mapping the object names to the StripRefs of their track.
+"""
+
+StripRef = namedtuple("StripRef", ["action", "frame_start", "frame_end", "action_frame_start",
+                                   "action_frame_end", "scale", "repeat"])
+StripRef.__doc__ = """
+The parts of an NLA strip needed to map clip frames to action frames.
+"""
+
+
+def get_strip_refs(track) -> list:
+    """
+    Collect the strips of an NLA track which have an action assigned.
+
+    Args:
+        track: (bpy.types.NlaTrack) Blender NLA track.
+
+    Returns:
+        List of StripRefs sorted by their start frame.
+    """
+
+    out_strips = [StripRef(strip.action, strip.frame_start, strip.frame_end, strip.action_frame_start,
+                           strip.action_frame_end, strip.scale, strip.repeat)
+                  for strip in track.strips if strip.action is not None]
+    out_strips.sort(key=lambda strip: strip.frame_start)
+    return out_strips
+
+
+def get_animation_index(obj_list) -> dict:
+    """
+    Build the index of all animation clips in a single pass over the objects.
+
+    Args:
+        obj_list: List of all objects in the scene.
+                  (Generally: bpy.data.objects)
+
+    Returns:
+        A dict mapping the clip names to AnimationClips. The dict is
+        ordered by the clip index.
+    """
+
+    clip_objects = {}
+    clip_strips = {}
+    clip_max_frames = {}
+    for obj in obj_list:
+        if obj.type != "MESH":
+            continue
+        if obj.animation_data == None:
+            print("Warning: Object has no animation data set!")
+            continue
+        if len(obj.animation_data.nla_tracks) == 0:
+            print("Warning: Object has no nla-track set!")
+            continue
+        for track in obj.animation_data.nla_tracks:
+            strips = get_strip_refs(track)
+            if len(strips) == 0:
+                continue
+            if track.name not in clip_objects:
+                clip_objects[track.name] = []
+                clip_strips[track.name] = {}
+                clip_max_frames[track.name] = 0
+            clip_objects[track.name].append(obj.name)
+            clip_strips[track.name][obj.name] = strips
+            max_frame = int(math.ceil(max(strip.frame_end for strip in strips)))
+            clip_max_frames[track.name] = max(clip_max_frames[track.name], max_frame)
+
+    return {name: AnimationClip(index, clip_max_frames[name], clip_objects[name], clip_strips[name])
+            for index, name in enumerate(clip_objects)}
@@ -0,0 +1,189 @@
+"""
+Binary animation resource.
+
+Instead of inlining the baked animation channels as java array literals
+(which quickly hits the 64KB method size and constant pool limits of the
+JVM) the channels can be written into a compact binary file that the
+generated class reads once per model type when it is loaded.
+
+Layout (little-endian):
+    Header:
+        magic           4 bytes  b"MCXA"
+        version         uint16
+        flags           uint16   (reserved, 0)
+        part count      uint16
+        clip count      uint16
+    Per clip:
+        frame count     uint32
+        channel count   uint16
+        reserved        uint16
+        Per channel:
+            part        uint16   index of the part in the generated class
+            channel     uint8    index in model.CHANNEL_NAMES
+            encoding    uint8    ENCODING_FLOAT32 or ENCODING_INT16, or'ed
+                                 with FLAG_KEYFRAMES for reduced channels
+            value count uint32
+            data offset uint32   from the start of the file
+            scale       float32  value = stored * scale + bias (int16 only)
+            bias        float32
+    Payload:
+        The values of all channels, float32 or int16, 4 byte aligned. The
+        values of reduced channels are preceded by their key frames (uint16,
+        padded to 4 bytes).
+"""
+
+import struct
+import sys
+from array import array
+
+from MCExport.Exporter import model
+
+
+MAGIC = b"MCXA"
+VERSION = 2
+
+ENCODING_FLOAT32 = 0
+ENCODING_INT16 = 1
+# Set in the encoding of channels that store key frames (see reduce.py).
+FLAG_KEYFRAMES = 0x80
+
+HEADER = struct.Struct("<4sHHHH")
+CLIP_HEADER = struct.Struct("<IHH")
+CHANNEL_ENTRY = struct.Struct("<HBBIIff")
+
+
+def quantize(values) -> (array, float, float):
+    """
+    Quantize values to 16 bit integers over their range.
+
+    Returns:
+        An array('h') and the scale and bias restoring the values as
+        stored * scale + bias.
+    """
+
+    low = min(values)
+    high = max(values)
+    scale = (high - low) / 65535. if high > low else 1.
+    bias = low + 32768. * scale
+    out_values = array("h", (max(-32768, min(32767, int(round((value - bias) / scale)))) for value in values))
+    return out_values, scale, bias
+
+
+def iter_channels(part_names: list, clips: list, channel_names=model.PIVOT_CHANNELS + model.ANGLE_CHANNELS):
+    """
+    Iterate over the channels of all clips in file order.
+
+    Args:
+        part_names: Names of the parts in the order of the generated code.
+        clips: List of model.Clips.
+        channel_names: The channels that are written.
+
+    Yields:
+        Tuples (clip, part index, channel index, values, key frames). The
+        key frames are None for channels with one value per frame.
+    """
+
+    part_indices = {name: i for i, name in enumerate(part_names)}
+    for clip in clips:
+        for track in clip.tracks:
+            if track.part not in part_indices:
+                continue
+            for name in channel_names:
+                if name in track.channels:
+                    yield (clip, part_indices[track.part], model.CHANNEL_NAMES.index(name), track.channels[name],
+                           track.keyframes.get(name))
+
+
+def write_animation_data(file, part_names: list, clips: list, encoding: int = ENCODING_FLOAT32,
+                         channel_names=model.PIVOT_CHANNELS + model.ANGLE_CHANNELS) -> int:
+    """
+    Write animation clips into a binary stream.
+
+    Args:
+        file: An open binary stream.
+        part_names: Names of the parts in the order of the generated code.
+        clips: List of model.Clips.
+        encoding: ENCODING_FLOAT32 or ENCODING_INT16.
+        channel_names: The channels that are written.
+
+    Returns:
+        The number of bytes written.
+    """
+
+    channels = list(iter_channels(part_names, clips, channel_names))
+    table_size = HEADER.size + len(clips) * CLIP_HEADER.size + len(channels) * CHANNEL_ENTRY.size
+    offset = (table_size + 3) & ~3
+    payloads = []
+    clip_entries = {clip.index: [] for clip in clips}
+    for clip, part, channel, values, keyframes in channels:
+        if encoding == ENCODING_INT16:
+            data, scale, bias = quantize(values)
+        else:
+            data, scale, bias = array("f", values), 1., 0.
+        if sys.byteorder == "big":
+            data.byteswap()
+        payload = data.tobytes()
+        flags = 0
+        if keyframes is not None:
+            keys = array("H", keyframes)
+            if sys.byteorder == "big":
+                keys.byteswap()
+            keys = keys.tobytes()
+            payload = keys + b"\0" * (-len(keys) % 4) + payload
+            flags = FLAG_KEYFRAMES
+        clip_entries[clip.index].append(CHANNEL_ENTRY.pack(part, channel, encoding | flags, len(data), offset,
+                                                           scale, bias))
+        payloads.append(payload + b"\0" * (-len(payload) % 4))
+        offset += len(payloads[-1])
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, 0, len(part_names), len(clips)))
+    for clip in clips:
+        out += CLIP_HEADER.pack(clip.frame_count, len(clip_entries[clip.index]), 0)
+        for entry in clip_entries[clip.index]:
+            out += entry
+    out += b"\0" * (-len(out) % 4)
+    file.write(out)
+    written = len(out)
+    for payload in payloads:
+        file.write(payload)
+        written += len(payload)
+    return written
+
+
+def read_animation_data(data: bytes) -> (int, list):
+    """
+    Read a binary animation resource, the inverse of write_animation_data.
+
+    Args:
+        data: Content of the file.
+
+    Returns:
+        The number of parts and a list with one entry per clip: a tuple
+        (frame count, dict mapping (part index, channel index) to lists of
+        values). Reduced channels map to a tuple (key frames, values)
+        instead.
+    """
+
+    magic, version, _, part_count, clip_count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not an animation resource of version "+str(VERSION))
+    position = HEADER.size
+    out_clips = []
+    for _ in range(clip_count):
+        frame_count, channel_count, _ = CLIP_HEADER.unpack_from(data, position)
+        position += CLIP_HEADER.size
+        channels = {}
+        for _ in range(channel_count):
+            part, channel, encoding, count, offset, scale, bias = CHANNEL_ENTRY.unpack_from(data, position)
+            position += CHANNEL_ENTRY.size
+            keyframes = None
+            if encoding & FLAG_KEYFRAMES:
+                keyframes = list(struct.unpack_from("<"+str(count)+"H", data, offset))
+                offset += (2 * count + 3) & ~3
+            if (encoding & ~FLAG_KEYFRAMES) == ENCODING_INT16:
+                values = [value * scale + bias for value in struct.unpack_from("<"+str(count)+"h", data, offset)]
+            else:
+                values = list(struct.unpack_from("<"+str(count)+"f", data, offset))
+            channels[(part, channel)] = values if keyframes is None else (keyframes, values)
+        out_clips.append((frame_count, channels))
+    return part_count, out_clips
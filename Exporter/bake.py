@@ -0,0 +1,440 @@
+"""
+Baking of fcurves into per-frame arrays.
+
+Instead of calling fcurve.evaluate() once per channel and frame, the
+keyframes of an fcurve are read in bulk with 'foreach_get' and the
+constant, linear and bezier segments are evaluated for all frames at once
+with numpy. Only segments using other interpolation modes (the easing
+modes) and fcurves with modifiers are evaluated by blender.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+
+# Channels that can be exported, identified by the fcurve's data path and array index.
+LOCATION_CHANNELS = (("location", 0), ("location", 1), ("location", 2))
+ROTATION_CHANNELS = (("rotation_euler", 0), ("rotation_euler", 1), ("rotation_euler", 2))
+SCALE_CHANNELS = (("scale", 0), ("scale", 1), ("scale", 2))
+TRANSFORM_CHANNELS = LOCATION_CHANNELS + ROTATION_CHANNELS + SCALE_CHANNELS
+
+# Integer values of the keyframe interpolation enum as returned by foreach_get.
+INTERPOLATION_CONSTANT = 0
+INTERPOLATION_LINEAR = 1
+INTERPOLATION_BEZIER = 2
+
+# Number of bisection steps used to invert the x(t) polynomial of a bezier segment.
+BEZIER_ITERATIONS = 30
+
+
+FCurveData = namedtuple("FCurveData", ["co", "handle_left", "handle_right", "interpolation",
+                                       "extrapolation"])
+FCurveData.__doc__ = """
+Plain copy of the keyframes of an fcurve (no reference to blender data).
+co, handle_left and handle_right are float64 arrays of shape (n, 2),
+interpolation is an int array of shape (n,) and extrapolation is the
+name of the extrapolation mode ('CONSTANT' or 'LINEAR').
+"""
+
+ActionData = namedtuple("ActionData", ["name", "fcurves"])
+ActionData.__doc__ = """
+Plain copy of the transform fcurves of an action which can be baked
+without blender (e.g. in another process). fcurves maps the channels to
+their FCurveData.
+"""
+
+
+def read_fcurve(fcurve) -> FCurveData:
+    """
+    Read the keyframes of an fcurve into numpy arrays.
+
+    Args:
+        fcurve: (bpy.types.FCurve) Blender fcurve.
+
+    Returns:
+        The keyframe data of the fcurve.
+    """
+
+    points = fcurve.keyframe_points
+    n = len(points)
+    co = np.empty(n*2, dtype=np.float32)
+    handle_left = np.empty(n*2, dtype=np.float32)
+    handle_right = np.empty(n*2, dtype=np.float32)
+    interpolation = np.empty(n, dtype=np.int32)
+    points.foreach_get("co", co)
+    points.foreach_get("handle_left", handle_left)
+    points.foreach_get("handle_right", handle_right)
+    points.foreach_get("interpolation", interpolation)
+    return FCurveData(co.reshape(-1, 2).astype(np.float64),
+                      handle_left.reshape(-1, 2).astype(np.float64),
+                      handle_right.reshape(-1, 2).astype(np.float64),
+                      interpolation, fcurve.extrapolation)
+
+
+def _correct_bezier_handles(p0, p1, p2, p3):
+    """
+    Shorten the handles of bezier segments whose handles reach beyond the
+    neighbouring keyframe, the same way blender does it. This keeps x(t)
+    monotonic within each segment.
+    All arguments are arrays of shape (n, 2), p1 and p2 are modified.
+    """
+
+    h1 = p0 - p1
+    h2 = p3 - p2
+    len1 = np.abs(h1[:, 0])
+    len2 = np.abs(h2[:, 0])
+    length = p3[:, 0] - p0[:, 0]
+    total = len1 + len2
+    overlap = (total > length) & (total > 0.)
+    if overlap.any():
+        fac = (length[overlap] / total[overlap])[:, None]
+        p1[overlap] = p0[overlap] - fac * h1[overlap]
+        p2[overlap] = p3[overlap] - fac * h2[overlap]
+
+
+def _evaluate_bezier(p0, p1, p2, p3, x) -> np.ndarray:
+    """
+    Evaluate cubic bezier segments at the x coordinates x.
+    All control points are arrays of shape (n, 2), x has shape (n,).
+    The curve parameter t is found by bisection since x(t) is monotonic.
+    """
+
+    p1 = p1.copy()
+    p2 = p2.copy()
+    _correct_bezier_handles(p0, p1, p2, p3)
+
+    def cubic(t, i):
+        s = 1. - t
+        return s*s*s*p0[:, i] + 3.*s*s*t*p1[:, i] + 3.*s*t*t*p2[:, i] + t*t*t*p3[:, i]
+
+    lower = np.zeros(len(x))
+    upper = np.ones(len(x))
+    for _ in range(BEZIER_ITERATIONS):
+        t = 0.5 * (lower + upper)
+        below = cubic(t, 0) < x
+        lower = np.where(below, t, lower)
+        upper = np.where(below, upper, t)
+    return cubic(0.5 * (lower + upper), 1)
+
+
+def evaluate_keyframes(data: FCurveData, frames: np.ndarray) -> (np.ndarray, np.ndarray):
+    """
+    Evaluate an fcurve given by its keyframe data at several frames.
+
+    Args:
+        data: Keyframe data as returned by read_fcurve.
+        frames: Array of frames (float) to evaluate.
+
+    Returns:
+        An array of values (float64) with the same shape as frames and a
+        boolean array which is True for the frames lying in segments with
+        an interpolation mode that is not supported here. Their values
+        have to be evaluated by blender.
+    """
+
+    frames = np.asarray(frames, dtype=np.float64)
+    values = np.zeros(len(frames))
+    unsupported = np.zeros(len(frames), dtype=bool)
+    co = data.co
+    n = len(co)
+    if n == 0:
+        return values, unsupported
+    if n == 1:
+        values[:] = co[0, 1]
+        return values, unsupported
+
+    # Index of the keyframe starting the segment of every frame.
+    segment = np.clip(np.searchsorted(co[:, 0], frames, side="right") - 1, 0, n - 2)
+    before = frames < co[0, 0]
+    after = frames >= co[-1, 0]
+    inside = ~(before | after)
+
+    interpolation = data.interpolation[segment]
+    x0 = co[segment, 0]
+    y0 = co[segment, 1]
+    x1 = co[segment + 1, 0]
+    y1 = co[segment + 1, 1]
+
+    constant = inside & (interpolation == INTERPOLATION_CONSTANT)
+    values[constant] = y0[constant]
+
+    linear = inside & (interpolation == INTERPOLATION_LINEAR)
+    if linear.any():
+        fac = (frames[linear] - x0[linear]) / (x1[linear] - x0[linear])
+        values[linear] = y0[linear] + fac * (y1[linear] - y0[linear])
+
+    bezier = inside & (interpolation == INTERPOLATION_BEZIER)
+    if bezier.any():
+        index = segment[bezier]
+        values[bezier] = _evaluate_bezier(co[index], data.handle_right[index],
+                                          data.handle_left[index + 1], co[index + 1], frames[bezier])
+
+    unsupported = inside & (interpolation > INTERPOLATION_BEZIER)
+
+    # Extrapolation before the first and after the last keyframe.
+    values[before] = co[0, 1]
+    values[after] = co[-1, 1]
+    if data.extrapolation == "LINEAR":
+        values[before] += _get_extrapolation_slope(data, 0) * (frames[before] - co[0, 0])
+        values[after] += _get_extrapolation_slope(data, n - 1) * (frames[after] - co[-1, 0])
+    return values, unsupported
+
+
+def _get_extrapolation_slope(data: FCurveData, index: int) -> float:
+    """
+    Slope used for linear extrapolation at the first (index 0) or last
+    keyframe. Like in blender it depends on the interpolation of that
+    keyframe: bezier keyframes extrapolate along their handle, linear ones
+    along the line to their neighbour and constant ones not at all.
+    """
+
+    co = data.co
+    first = index == 0
+    interpolation = data.interpolation[index]
+    if interpolation == INTERPOLATION_BEZIER:
+        handle = data.handle_left[index] if first else data.handle_right[index]
+        dx = co[index, 0] - handle[0]
+        dy = co[index, 1] - handle[1]
+    elif interpolation == INTERPOLATION_LINEAR:
+        neighbour = 1 if first else index - 1
+        dx = co[index, 0] - co[neighbour, 0]
+        dy = co[index, 1] - co[neighbour, 1]
+    else:
+        return 0.
+    if dx == 0.:
+        return 0.
+    return dy / dx
+
+
+def bake_fcurve(fcurve, frames: np.ndarray) -> np.ndarray:
+    """
+    Evaluate an fcurve at several frames.
+
+    Args:
+        fcurve: (bpy.types.FCurve) Blender fcurve.
+        frames: Array of frames to evaluate.
+
+    Returns:
+        A float32 array holding the value of the fcurve at every frame.
+    """
+
+    frames = np.asarray(frames, dtype=np.float64)
+    if len(fcurve.modifiers) > 0:
+        # Modifiers can do anything, leave them to blender.
+        return np.array([fcurve.evaluate(frame) for frame in frames], dtype=np.float32)
+    values, unsupported = evaluate_keyframes(read_fcurve(fcurve), frames)
+    for i in np.flatnonzero(unsupported):
+        values[i] = fcurve.evaluate(frames[i])
+    return values.astype(np.float32)
+
+
+def read_action(action, channels=TRANSFORM_CHANNELS) -> ActionData:
+    """
+    Read the fcurves of an action into an ActionData.
+
+    Args:
+        action: (bpy.types.Action) Blender action.
+        channels: The channels to read, any subset of TRANSFORM_CHANNELS.
+
+    Returns:
+        The ActionData or None if an fcurve needs blender to be evaluated
+        (modifiers or easing interpolation modes).
+    """
+
+    out_fcurves = {}
+    for channel in channels:
+        fcurve = action.fcurves.find(channel[0], index=channel[1])
+        if fcurve is None:
+            continue
+        if len(fcurve.modifiers) > 0:
+            return None
+        data = read_fcurve(fcurve)
+        if (data.interpolation > INTERPOLATION_BEZIER).any():
+            return None
+        out_fcurves[channel] = data
+    return ActionData(action.name, out_fcurves)
+
+
+def bake_action(action, frames, channels=TRANSFORM_CHANNELS) -> dict:
+    """
+    Evaluate the transform channels of an action at several frames.
+
+    Args:
+        action: (bpy.types.Action) Blender action or its ActionData.
+        frames: Frames to evaluate (e.g. range(max_frame)).
+        channels: The channels to bake given as (data path, array index)
+                  tuples. Any subset of TRANSFORM_CHANNELS is possible.
+
+    Returns:
+        A dict mapping the channels which are animated in the action to
+        float32 arrays holding the value for every frame. Channels without
+        fcurve are left out.
+    """
+
+    frames = np.asarray(frames, dtype=np.float64)
+    out_channels = {}
+    if isinstance(action, ActionData):
+        for channel in channels:
+            data = action.fcurves.get(channel)
+            if data is not None:
+                out_channels[channel] = evaluate_keyframes(data, frames)[0].astype(np.float32)
+        return out_channels
+    for channel in channels:
+        fcurve = action.fcurves.find(channel[0], index=channel[1])
+        if fcurve is not None:
+            out_channels[channel] = bake_fcurve(fcurve, frames)
+    return out_channels
+
+
+def get_action_frames(strips, frames: np.ndarray) -> (np.ndarray, np.ndarray):
+    """
+    Map clip frames (NLA time) to frames of the actions of NLA strips.
+    Between two strips and after the last one the end of the previous strip
+    is held, before the first strip its start is held.
+
+    Args:
+        strips: List of animation.StripRefs sorted by their start frame.
+        frames: Array of clip frames.
+
+    Returns:
+        Two arrays of the same shape as frames: the index of the strip in
+        effect at every frame and the corresponding frame of its action.
+    """
+
+    frames = np.asarray(frames, dtype=np.float64)
+    starts = np.array([strip.frame_start for strip in strips])
+    ends = np.array([strip.frame_end for strip in strips])
+    scales = np.array([strip.scale if strip.scale != 0. else 1. for strip in strips])
+    action_starts = np.array([strip.action_frame_start for strip in strips])
+    action_lengths = np.array([strip.action_frame_end - strip.action_frame_start for strip in strips])
+    repeats = np.array([strip.repeat for strip in strips])
+
+    index = np.clip(np.searchsorted(starts, frames, side="right") - 1, 0, len(strips) - 1)
+    local = (np.clip(frames, starts[index], ends[index]) - starts[index]) / scales[index]
+    length = action_lengths[index]
+    repeated = (repeats[index] > 1.) & (length > 0.)
+    # The last frame of a repeated strip is the end of the action, not its start.
+    wrapped = np.where(repeated & (local < length * repeats[index]),
+                       np.mod(local, np.where(length > 0., length, 1.)), np.minimum(local, length))
+    return index, action_starts[index] + wrapped
+
+
+def bake_strips(strips, frames, channels=TRANSFORM_CHANNELS, defaults=None) -> dict:
+    """
+    Evaluate the transform channels of a (possibly multi strip) NLA track
+    at several clip frames.
+
+    Args:
+        strips: List of animation.StripRefs sorted by their start frame.
+                Their actions may also be ActionData (see read_action).
+        frames: Clip frames to evaluate (e.g. range(max_frame)).
+        channels: The channels to bake, any subset of TRANSFORM_CHANNELS.
+        defaults: Optional dict mapping channels to the value used at
+                  frames whose strip does not animate the channel (0 or 1
+                  for scales if not given).
+
+    Returns:
+        A dict mapping the channels which are animated in any of the
+        strips to float32 arrays holding the value for every frame.
+    """
+
+    frames = np.asarray(frames, dtype=np.float64)
+    if len(strips) == 0:
+        return {}
+    if len(strips) == 1 and strips[0].frame_start == strips[0].action_frame_start \
+            and strips[0].scale == 1. and strips[0].repeat == 1.:
+        # Plain strip, clip frames are action frames.
+        return bake_action(strips[0].action, frames, channels)
+
+    strip_index, action_frames = get_action_frames(strips, frames)
+    out_channels = {}
+    for i, strip in enumerate(strips):
+        mask = strip_index == i
+        if not mask.any():
+            continue
+        for channel, values in bake_action(strip.action, action_frames[mask], channels).items():
+            if channel not in out_channels:
+                default = 1. if channel[0] == "scale" else 0.
+                if defaults is not None and channel in defaults:
+                    default = defaults[channel]
+                out_channels[channel] = np.full(len(frames), default, dtype=np.float32)
+            out_channels[channel][mask] = values
+    return out_channels
+
+
+def get_euler_matrices(angles: np.ndarray) -> np.ndarray:
+    """
+    Rotation matrices of 'XYZ' euler angles (blender's default rotation
+    mode, the matrix is Rz @ Ry @ Rx).
+
+    Args:
+        angles: Array of shape (3, n) holding the angles around x, y and z.
+
+    Returns:
+        An array of shape (n, 3, 3).
+    """
+
+    cx, cy, cz = np.cos(angles)
+    sx, sy, sz = np.sin(angles)
+    out_matrices = np.empty((angles.shape[1], 3, 3))
+    out_matrices[:, 0, 0] = cy * cz
+    out_matrices[:, 0, 1] = sx * sy * cz - cx * sz
+    out_matrices[:, 0, 2] = cx * sy * cz + sx * sz
+    out_matrices[:, 1, 0] = cy * sz
+    out_matrices[:, 1, 1] = sx * sy * sz + cx * cz
+    out_matrices[:, 1, 2] = cx * sy * sz - sx * cz
+    out_matrices[:, 2, 0] = -sy
+    out_matrices[:, 2, 1] = sx * cy
+    out_matrices[:, 2, 2] = cx * cy
+    return out_matrices
+
+
+def get_matrix_eulers(matrices: np.ndarray) -> np.ndarray:
+    """
+    'XYZ' euler angles of rotation matrices, the inverse of
+    get_euler_matrices. The angles are unwrapped over the frames so they do
+    not jump by 2 pi.
+
+    Returns:
+        An array of shape (3, n).
+    """
+
+    out_angles = np.empty((3, len(matrices)))
+    out_angles[0] = np.arctan2(matrices[:, 2, 1], matrices[:, 2, 2])
+    out_angles[1] = np.arcsin(np.clip(-matrices[:, 2, 0], -1., 1.))
+    out_angles[2] = np.arctan2(matrices[:, 1, 0], matrices[:, 0, 0])
+    return np.unwrap(out_angles, axis=1)
+
+
+def transform_channels(baked: dict, matrix: np.ndarray, defaults: dict) -> dict:
+    """
+    Move baked location and rotation channels into another space, e.g. from
+    the space of a parent's inverse matrix into the parent's local space.
+
+    Args:
+        baked: Dict of baked channels (see bake_strips).
+        matrix: 4x4 array mapping the baked space into the target space
+                (scale is applied to the locations only).
+        defaults: Dict with the values of the channels that are not baked.
+
+    Returns:
+        A dict holding all location and rotation channels (as float32
+        arrays) and the baked scale channels.
+    """
+
+    frame_count = len(next(iter(baked.values())))
+    channels = {channel: baked[channel] if channel in baked else np.full(frame_count, defaults[channel])
+                for channel in LOCATION_CHANNELS + ROTATION_CHANNELS}
+    locations = np.array([channels[channel] for channel in LOCATION_CHANNELS], dtype=np.float64)
+    angles = np.array([channels[channel] for channel in ROTATION_CHANNELS], dtype=np.float64)
+    linear = matrix[:3, :3]
+    # Remove the scale from the columns to get the rotation.
+    rotation = linear / np.linalg.norm(linear, axis=0)
+    locations = linear @ locations + matrix[:3, 3:4]
+    angles = get_matrix_eulers(rotation @ get_euler_matrices(angles))
+    out_channels = {channel: values for channel, values in baked.items() if channel in SCALE_CHANNELS}
+    for channels, values in ((LOCATION_CHANNELS, locations), (ROTATION_CHANNELS, angles)):
+        for channel, row in zip(channels, values):
+            out_channels[channel] = row.astype(np.float32)
+    return out_channels
@@ -0,0 +1,178 @@
+"""
+Command line tool to export many '.blend' files at once.
+
+Every file is exported by its own blender process running in background
+mode, so a full re-export is bounded by the number of cores instead of
+the time it takes to click through the export menu.
+
+Usage:
+    python -m MCExport.Exporter.batch [-j JOBS] [-o OUTDIR] FILE_OR_GLOB [...]
+"""
+
+import argparse
+import glob
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from MCExport.Exporter import formats
+from MCExport.Exporter import lod
+
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "batch_worker.py")
+
+
+def get_model_name(blend_path: str) -> str:
+    """
+    Derive a java class name from the name of a '.blend' file.
+    
+    Args:
+        blend_path: Path to the '.blend' file.
+    
+    Returns:
+        The file name without extension in camel case, e.g.
+        'zombie_pigman.blend' becomes 'ZombiePigman'.
+    """
+
+    stem = os.path.splitext(os.path.basename(blend_path))[0]
+    parts = [part for part in re.split(r"[^0-9A-Za-z]+", stem) if part]
+    name = "".join(part[0].upper() + part[1:] for part in parts)
+    if not name or name[0].isdigit():
+        name = "_" + name
+    return name
+
+
+def expand_inputs(patterns) -> list:
+    """
+    Expand file names and glob patterns ('**' is recursive) into a sorted
+    list of unique '.blend' files.
+    """
+
+    out_files = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isfile(match) and match.endswith(".blend"):
+                out_files.add(os.path.abspath(match))
+            elif not glob.has_magic(pattern):
+                print("Warning: '"+pattern+"' is not a .blend file!")
+    return sorted(out_files)
+
+
+def get_output_path(blend_path: str, output_dir: str) -> str:
+    """
+    Path of the '.java' file written for a '.blend' file. The file is put
+    next to the '.blend' file if no output directory is given.
+    """
+
+    directory = output_dir if output_dir is not None else os.path.dirname(blend_path)
+    return os.path.join(directory, "Model" + get_model_name(blend_path) + ".java")
+
+
+def export_file(blender: str, blend_path: str, out_path: str, export_anim: bool,
+                texture_size: str, animation_format: str = "INLINE", merge_boxes: bool = False,
+                output_formats=formats.DEFAULT_FORMATS, construction: str = "CODE",
+                split_static: bool = False, cull_faces: bool = False, lod_distances=()) -> (str, int, str):
+    """
+    Export a single '.blend' file with a background blender process.
+    
+    Returns:
+        The path of the '.blend' file, the exit code of blender and its
+        output (stdout and stderr).
+    """
+
+    command = [blender, "--background", "--factory-startup", blend_path,
+               "--python-exit-code", "1", "--python", WORKER_SCRIPT,
+               "--", out_path, "--model-name", get_model_name(blend_path)]
+    if export_anim:
+        command += ["--animations", "--animation-format", animation_format]
+    if texture_size is not None:
+        command += ["--texture-size", texture_size]
+    if merge_boxes:
+        command.append("--merge-boxes")
+    command += ["--formats", ",".join(output_formats), "--construction", construction]
+    if split_static:
+        command.append("--split-static")
+    if cull_faces:
+        command.append("--cull-faces")
+    if lod_distances:
+        command += ["--lod-distances", ",".join(str(distance) for distance in lod_distances)]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            universal_newlines=True)
+    return blend_path, result.returncode, result.stdout
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m MCExport.Exporter.batch",
+        description="Export .blend files as Minecraft cube models using background blender processes.")
+    parser.add_argument("inputs", nargs="+", help=".blend files or glob patterns ('**' is recursive).")
+    parser.add_argument("-o", "--output-dir", default=None,
+                        help="Directory for the .java files (default: next to each .blend file).")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Number of blender processes running in parallel (default: number of cores).")
+    parser.add_argument("--blender", default=os.environ.get("BLENDER", "blender"),
+                        help="Blender executable (default: $BLENDER or 'blender').")
+    parser.add_argument("--animations", action="store_true", help="Export animation data.")
+    parser.add_argument("--animation-format", choices=("INLINE", "FLOAT32", "INT16"), default="INLINE",
+                        help="Inline the animation data or write it to a binary .mcanim resource "
+                             "(default: INLINE).")
+    parser.add_argument("--texture-size", default=None, metavar="WIDTHxHEIGHT",
+                        help="Texture size to use instead of looking it up in the materials.")
+    parser.add_argument("--merge-boxes", action="store_true",
+                        help="Merge boxes with the same rotation point, rotation and animation into a "
+                             "single ModelRenderer.")
+    parser.add_argument("--formats", default=",".join(formats.DEFAULT_FORMATS), metavar="FORMAT[,FORMAT...]",
+                        help="Comma separated output formats, written next to the .java file: "
+                             + ", ".join(formats.BACKENDS)+" (default: JAVA).")
+    parser.add_argument("--construction", choices=("CODE", "TABLE"), default="CODE",
+                        help="Build the ModelRenderers with statements for every box or in a loop from a "
+                             "binary .mcmodel resource (default: CODE). Use TABLE for models with thousands "
+                             "of boxes.")
+    parser.add_argument("--split-static", action="store_true",
+                        help="Render the parts no animation moves from a single display list.")
+    parser.add_argument("--cull-faces", action="store_true",
+                        help="Leave out the faces of boxes covered by other boxes.")
+    parser.add_argument("--lod-distances", default="", metavar="DISTANCE[,DISTANCE...]",
+                        help="Ascending distances in blocks from which more of the small parts are hidden (whole "
+                             "ModelRenderers only, see lod.py).")
+    args = parser.parse_args(argv)
+
+    output_formats = [name.strip().upper() for name in args.formats.split(",") if name.strip()]
+    if not output_formats or any(name not in formats.BACKENDS for name in output_formats):
+        parser.error("--formats must be a comma separated list of "+", ".join(formats.BACKENDS))
+    try:
+        lod_distances = lod.parse_distances(args.lod_distances)
+    except ValueError as e:
+        parser.error("--lod-distances: "+str(e))
+    if args.texture_size is not None and re.fullmatch(r"\d+x\d+", args.texture_size) is None:
+        parser.error("--texture-size must look like 64x32")
+    blend_files = expand_inputs(args.inputs)
+    if not blend_files:
+        parser.error("no .blend files found")
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    # The actual work is done by the blender processes, threads are enough to wait for them.
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        jobs = [pool.submit(export_file, args.blender, path, get_output_path(path, args.output_dir),
+                            args.animations, args.texture_size, args.animation_format, args.merge_boxes,
+                            output_formats, args.construction, args.split_static, args.cull_faces, lod_distances)
+                for path in blend_files]
+        for job in jobs:
+            blend_path, returncode, output = job.result()
+            if returncode == 0:
+                print("Exported "+blend_path)
+            else:
+                failed.append(blend_path)
+                print("Failed to export "+blend_path+":\n"+output, file=sys.stderr)
+
+    print(str(len(blend_files)-len(failed))+" of "+str(len(blend_files))+" files exported.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""
+Script run by blender in background mode to export the loaded '.blend' file.
+It is started by MCExport.Exporter.batch, the arguments follow after '--':
+
+    blender -b model.blend --python batch_worker.py -- out.java [--model-name NAME]
+        [--animations] [--animation-format FORMAT] [--texture-size WIDTHxHEIGHT] [--merge-boxes]
+        [--formats FORMAT[,FORMAT...]] [--construction CODE|TABLE] [--split-static]
+        [--cull-faces] [--lod-distances DISTANCE[,DISTANCE...]]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+
+import bpy
+
+# Import the add-on as the MCExport package without installing it, whatever its folder is called.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if "MCExport" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("MCExport", os.path.join(ROOT, "__init__.py"),
+                                                  submodule_search_locations=[ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["MCExport"] = package
+    spec.loader.exec_module(package)
+
+from MCExport.Exporter import function
+from MCExport.Exporter import lod
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--")+1:] if "--" in sys.argv else []
+    parser = argparse.ArgumentParser(prog="batch_worker.py")
+    parser.add_argument("output")
+    parser.add_argument("--model-name", default="ModelName")
+    parser.add_argument("--animations", action="store_true")
+    parser.add_argument("--animation-format", default="INLINE")
+    parser.add_argument("--texture-size", default=None)
+    parser.add_argument("--merge-boxes", action="store_true")
+    parser.add_argument("--formats", default="JAVA")
+    parser.add_argument("--construction", default="CODE")
+    parser.add_argument("--split-static", action="store_true")
+    parser.add_argument("--cull-faces", action="store_true")
+    parser.add_argument("--lod-distances", default="")
+    args = parser.parse_args(argv)
+
+    texture_size = None
+    if args.texture_size is not None:
+        texture_size = tuple(int(size) for size in args.texture_size.split("x"))
+    # The batch tool already runs one blender per core.
+    function.write_data(bpy.context, args.output, args.animations, args.model_name, texture_size,
+                        animation_format=args.animation_format, merge_boxes=args.merge_boxes, bake_workers=1,
+                        output_formats=args.formats.split(","), construction=args.construction,
+                        split_static=args.split_static, cull_faces=args.cull_faces,
+                        lod_distances=lod.parse_distances(args.lod_distances))
+
+
+main()
@@ -0,0 +1,144 @@
+"""
+Bedrock geometry ('.geo.json') from the model representation (see model.py).
+
+Bedrock bones have their pivot in model space with the y axis pointing up
+and their cubes are given by their minimum corner in model space as well,
+while a ModelRenderer's rotation point is relative to its parent and its
+boxes are relative to the rotation point. The conversion follows
+Blockbench's 'Modded Entity' format: x is mirrored, y is flipped around the
+ground (24 pixels below the origin of the java model) and the angles are
+converted to degrees with the x and y rotation inverted.
+"""
+
+import json
+import math
+
+
+# Version of the geometry format written.
+FORMAT_VERSION = "1.12.0"
+
+# Decimal places of the written coordinates.
+PRECISION = 4
+
+
+def is_box_mirrored(part) -> bool:
+    """
+    Whether the texture of the boxes of a part is mirrored in game. A
+    ModelBox reads the mirror flag of its ModelRenderer when it is created,
+    but the java class sets the flag only after adding the boxes (see
+    codegen.box_instantiation_template and codegen.table_constructor_code),
+    so model.Part.mirror never takes effect.
+    """
+
+    return False
+
+
+def round_value(value: float) -> float:
+    """
+    Round a coordinate for the json file. Adding 0. turns -0. into 0.
+    """
+
+    return round(value, PRECISION) + 0.
+
+
+def get_bone_origins(model) -> dict:
+    """
+    Compute the pivots of all parts in Bedrock model space.
+
+    Args:
+        model: (model.Model) The model.
+
+    Returns:
+        A dict mapping part names to their pivot (x, y, z).
+    """
+
+    origins = {}
+    for part, parent in model.iter_hierarchy():
+        if parent is None:
+            origins[part.name] = (-part.pivot_x, 24. - part.pivot_y, part.pivot_z)
+        else:
+            px, py, pz = origins[parent.name]
+            origins[part.name] = (px - part.pivot_x, py - part.pivot_y, pz + part.pivot_z)
+    return origins
+
+
+def get_bone_rotation(part) -> (float, float, float):
+    """
+    The rotation of a part in degrees as Bedrock expects it.
+    """
+
+    return -math.degrees(part.angle_x), -math.degrees(part.angle_y), math.degrees(part.angle_z)
+
+
+def get_cube_bounds(box, origin) -> ((float, float, float), (float, float, float)):
+    """
+    The minimum corner and size of a box in Bedrock model space.
+
+    Args:
+        box: (model.Box) The box.
+        origin: Pivot of the box's part in Bedrock model space.
+
+    Returns:
+        The minimum corner and the size.
+    """
+
+    ox, oy, oz = origin
+    return (ox - box.x - box.width, oy - box.y - box.height, oz + box.z), (box.width, box.height, box.depth)
+
+
+def get_geometry(model) -> dict:
+    """
+    Convert a model into Bedrock geometry.
+
+    Args:
+        model: (model.Model) The model.
+
+    Returns:
+        The content of the '.geo.json' file as dict.
+    """
+
+    origins = get_bone_origins(model)
+    bones = []
+    for part, parent in model.iter_hierarchy():
+        bone = {"name": part.name}
+        if parent is not None:
+            bone["parent"] = parent.name
+        bone["pivot"] = [round_value(value) for value in origins[part.name]]
+        rotation = get_bone_rotation(part)
+        if any(rotation):
+            bone["rotation"] = [round_value(value) for value in rotation]
+        if is_box_mirrored(part):
+            bone["mirror"] = True
+        cubes = []
+        for box in part.boxes:
+            corner, size = get_cube_bounds(box, origins[part.name])
+            cube = {"origin": [round_value(value) for value in corner],
+                    "size": list(size),
+                    "uv": [box.tex_offset_u, box.tex_offset_v]}
+            if box.inflate != 0.:
+                cube["inflate"] = round_value(box.inflate)
+            cubes.append(cube)
+        bone["cubes"] = cubes
+        bones.append(bone)
+    description = {"identifier": "geometry." + model.name.lower(),
+                   "texture_width": model.texture_width,
+                   "texture_height": model.texture_height}
+    return {"format_version": FORMAT_VERSION,
+            "minecraft:geometry": [{"description": description, "bones": bones}]}
+
+
+def write_geometry(file, model) -> int:
+    """
+    Write the Bedrock geometry of a model to a stream.
+
+    Args:
+        file: An open text stream.
+        model: (model.Model) The model.
+
+    Returns:
+        The number of characters written.
+    """
+
+    text = json.dumps(get_geometry(model), indent=2) + "\n"
+    file.write(text)
+    return len(text)
@@ -0,0 +1,126 @@
+"""
+Blockbench project ('.bbmodel') from the model representation (see model.py).
+
+The project uses Blockbench's 'Modded Entity' format with box uv, so it
+opens with the same texture layout as the java class. Groups and cubes are
+placed in the same space as Bedrock bones (see bedrock.py).
+"""
+
+import json
+import uuid
+
+from MCExport.Exporter import bedrock
+
+
+# Version of the project format written.
+FORMAT_VERSION = "4.0"
+MODEL_FORMAT = "modded_entity"
+
+# Namespace of the uuids of groups and cubes. They are derived from the
+# names, so exporting the same model twice gives the same file.
+UUID_NAMESPACE = uuid.UUID("6f3c4b1e-52a4-4c1e-9a39-0d7c2b8e5a11")
+
+
+def get_box_faces(box, mirror: bool) -> dict:
+    """
+    The uv rectangles of the faces of a box in Minecraft's box uv layout,
+    computed the way Blockbench does for box uv cubes.
+
+    Args:
+        box: (model.Box) The box.
+        mirror: Whether the texture is mirrored.
+
+    Returns:
+        A dict mapping the face names to their uv rectangle [u1, v1, u2, v2].
+    """
+
+    w, h, d = box.width, box.height, box.depth
+    # face -> (u, v) of the first corner and the size of the rectangle.
+    layout = {"east": ([0, d], [d, h]),
+              "west": ([d + w, d], [d, h]),
+              "up": ([d + w, d], [-w, -d]),
+              "down": ([d + w * 2, 0], [-w, d]),
+              "south": ([d * 2 + w, d], [w, h]),
+              "north": ([d, d], [w, h])}
+    if mirror:
+        for start, size in layout.values():
+            start[0] += size[0]
+            size[0] = -size[0]
+        layout["east"], layout["west"] = layout["west"], layout["east"]
+    faces = {}
+    for face, (start, size) in layout.items():
+        u = box.tex_offset_u + start[0]
+        v = box.tex_offset_v + start[1]
+        faces[face] = {"uv": [u, v, u + size[0], v + size[1]], "texture": None}
+    return faces
+
+
+def get_project(model) -> dict:
+    """
+    Convert a model into a Blockbench project.
+
+    Args:
+        model: (model.Model) The model.
+
+    Returns:
+        The content of the '.bbmodel' file as dict.
+    """
+
+    origins = bedrock.get_bone_origins(model)
+    elements = []
+    groups = {}
+    outliner = []
+    for part, parent in model.iter_hierarchy():
+        origin = [bedrock.round_value(value) for value in origins[part.name]]
+        group = {"name": part.name,
+                 "origin": origin,
+                 "rotation": [bedrock.round_value(value) for value in bedrock.get_bone_rotation(part)],
+                 "uuid": str(uuid.uuid5(UUID_NAMESPACE, model.name + "/" + part.name)),
+                 "export": True,
+                 "isOpen": False,
+                 "visibility": True,
+                 "children": []}
+        mirror = bedrock.is_box_mirrored(part)
+        for i, box in enumerate(part.boxes):
+            corner, size = bedrock.get_cube_bounds(box, origins[part.name])
+            cube_uuid = str(uuid.uuid5(UUID_NAMESPACE, model.name + "/" + part.name + "/" + str(i)))
+            elements.append({"name": part.name if i == 0 else part.name + "_" + str(i),
+                             "type": "cube",
+                             "box_uv": True,
+                             "from": [bedrock.round_value(value) for value in corner],
+                             "to": [bedrock.round_value(value + extent) for value, extent in zip(corner, size)],
+                             "origin": origin,
+                             "inflate": bedrock.round_value(box.inflate),
+                             "uv_offset": [box.tex_offset_u, box.tex_offset_v],
+                             "mirror_uv": mirror,
+                             "faces": get_box_faces(box, mirror),
+                             "uuid": cube_uuid})
+            group["children"].append(cube_uuid)
+        groups[part.name] = group
+        if parent is None:
+            outliner.append(group)
+        else:
+            groups[parent.name]["children"].append(group)
+    return {"meta": {"format_version": FORMAT_VERSION, "model_format": MODEL_FORMAT, "box_uv": True},
+            "name": model.name,
+            "resolution": {"width": model.texture_width, "height": model.texture_height},
+            "elements": elements,
+            "outliner": outliner,
+            "textures": []}
+
+
+def write_project(file, model) -> int:
+    """
+    Write a model as Blockbench project to a stream.
+
+    Args:
+        file: An open text stream.
+        model: (model.Model) The model.
+
+    Returns:
+        The number of characters written.
+    """
+
+    text = json.dumps(get_project(model), indent=2) + "\n"
+    file.write(text)
+    return len(text)
@@ -0,0 +1,138 @@
+"""
+Persistent cache of the rendered java fragments of the exported objects.
+
+Every object is stored with a hash of everything the export reads from it
+(see function.get_object_hash). Objects whose hash did not change since the
+last export reuse their fragments, only the others are recomputed. The
+cache is stored as a json sidecar file and is discarded as a whole when the
+exporter version or the templates change.
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+from MCExport.Exporter import writer
+
+
+# Bump when the format of the cache file or the meaning of the hashes changes.
+CACHE_VERSION = 4
+
+# Default maximum number of objects kept in the cache.
+MAX_ENTRIES = 8192
+
+
+def get_cache_path(blend_filepath: str, out_filepath: str) -> str:
+    """
+    Path of the cache file. It is put next to the '.blend' file or, for
+    unsaved files, next to the exported file.
+    """
+
+    base = blend_filepath if blend_filepath else out_filepath
+    return base + ".mcexport_cache.json"
+
+
+class ExportCache:
+    """Least recently used map from object names to their hash and fragments.
+
+    The salt identifies the exporter version and templates the fragments
+    were rendered with. Entries written with another salt are never used.
+    """
+
+    def __init__(self, path: str, salt: str, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.salt = salt
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._modified = False
+
+    @classmethod
+    def load(cls, path: str, salt: str, max_entries: int = MAX_ENTRIES):
+        """
+        Load the cache from a file. A missing, unreadable or outdated file
+        gives an empty cache.
+        """
+
+        cache = cls(path, salt, max_entries)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return cache
+        if data.get("version") != CACHE_VERSION or data.get("salt") != salt:
+            cache._modified = True
+            return cache
+        for name, key, fragments in data.get("entries", [])[-max_entries:]:
+            cache._entries[name] = (key, tuple(fragments))
+        return cache
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, name: str, key: str):
+        """
+        Look up the fragments of an object.
+
+        Args:
+            name: Name of the object.
+            key: Current hash of the object.
+
+        Returns:
+            The cached fragments or None if the object is not cached or its
+            hash changed.
+        """
+
+        entry = self._entries.get(name)
+        if entry is None or entry[0] != key:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(name)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, name: str):
+        """
+        Look up the fragments of an object without checking its hash, for
+        callers which know the object did not change (see watch.py).
+
+        Returns:
+            The cached fragments or None if the object is not cached.
+        """
+
+        entry = self._entries.get(name)
+        if entry is None:
+            return None
+        self._entries.move_to_end(name)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, name: str, key: str, fragments):
+        """
+        Store the fragments of an object, evicting the least recently used
+        objects if the cache is full.
+        """
+
+        self._entries[name] = (key, tuple(fragments))
+        self._entries.move_to_end(name)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._modified = True
+
+    def save(self):
+        """
+        Write the cache file (atomically) if anything changed.
+        """
+
+        if not self._modified:
+            return
+        data = {"version": CACHE_VERSION,
+                "salt": self.salt,
+                "entries": [[name, key, list(fragments)] for name, (key, fragments) in self._entries.items()]}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        if not os.path.isdir(directory):
+            return
+        with writer.atomic_open(self.path) as file:
+            json.dump(data, file, separators=(",", ":"))
+        self._modified = False
@@ -0,0 +1,1111 @@
+"""
+Java code generation from the model representation (see model.py).
+
+Nothing in here touches blender, the generator only consumes Model, Part
+and Box objects.
+"""
+
+import hashlib
+import re
+
+from MCExport import bl_info
+from MCExport.Exporter import animdata
+from MCExport.Exporter import lod
+from MCExport.Exporter import occlusion
+from MCExport.Exporter import partdata
+from MCExport.Exporter import writer
+
+
+# The class is written in sections so it can be streamed into the file. The box
+# declarations, instantiations and render calls are written in between them.
+class_header_template = """import net.minecraft.client.model.ModelBase;
+import net.minecraft.client.model.ModelRenderer;
+import net.minecraft.entity.Entity;
+import net.minecraft.entity.EntityLivingBase;
+import net.minecraftforge.fml.relauncher.Side;
+import net.minecraftforge.fml.relauncher.SideOnly;
+{imports}
+@SideOnly(Side.CLIENT)
+class Model{modelName} extends ModelBase {{
+
+    private float partialTicks;
+{fields}
+"""
+
+class_constructor_template = """
+
+    public Model{modelName}() {{
+        this.textureWidth = {texWidth};
+        this.textureHeight = {texHeight};
+
+"""
+
+class_render_template = """{constructor}
+    }}
+
+    @Override
+    public void setLivingAnimations(EntityLivingBase entity, float limbSwing, float limbSwingAmount,
+            float partialTicks) {{
+        this.partialTicks = partialTicks;
+    }}
+
+    @Override
+    public void render(Entity entity, float limbSwing, float limbSwingAmount, float ageInTicks, float netHeadYaw, 
+            float headPitch, float scale) {{
+        this.setRotationAngles(limbSwing, limbSwingAmount, ageInTicks, netHeadYaw, headPitch, scale, entity);
+{render}
+"""
+
+class_footer_template = """
+    }}
+
+    public void setRotationAngles(float limbSwing, float limbSwingAmount, float ageInTicks, float netHeadYaw,
+            float headPitch, float scale, Entity entity) {{
+    }}
+{methods}}}
+"""
+
+box_declaration_template = """    public ModelRenderer {boxName};"""
+
+box_instantiation_template = """        this.{boxName} = new ModelRenderer(this, {texOffsetX}, {texOffsetY});
+{boxes}        this.{boxName}.setRotationPoint({rotatePointX}, {rotatePointY}, {rotatePointZ});
+        this.{boxName}.rotateAngleX = {rotateAngleX};
+        this.{boxName}.rotateAngleY = {rotateAngleY};
+        this.{boxName}.rotateAngleZ = {rotateAngleZ};
+        this.{boxName}.mirror = true;
+"""
+
+# The first box of a part uses the texture offset passed to the constructor.
+box_first_template = """        this.{boxName}.addBox({offsetX}, {offsetY}, {offsetZ}, {width}, {height}, {depth}, {scaleFactor});
+"""
+
+# Further boxes of a part sharing the rotation point of the first one.
+box_addition_template = """        this.{boxName}.setTextureOffset({texOffsetX}, {texOffsetY})
+                .addBox({offsetX}, {offsetY}, {offsetZ}, {width}, {height}, {depth}, {scaleFactor});
+"""
+
+# Boxes partly covered by other boxes are built from their visible faces only (see occlusion.py).
+culled_box_template = """        this.{boxName}.cubeList.add(new CulledBox(this.{boxName}, {texOffsetX}, {texOffsetY},
+                {offsetX}, {offsetY}, {offsetZ}, {width}, {height}, {depth}, {scaleFactor}, {hiddenFaces}));
+"""
+
+box_render_template = """        this.{boxName}.render(scale);"""
+
+# Children are rendered (and transformed) by their parent instead of render().
+box_child_template = """        this.{parentName}.addChild(this.{boxName});
+"""
+
+
+EMPTY_SECTIONS = {"imports": "", "fields": "", "constructor": "", "render": "", "methods": ""}
+
+
+def format_float(value: float) -> str:
+    """
+    Format a number as java float literal.
+    """
+
+    return str.format("{0:.6f}", value) + 'f'
+
+
+def get_box_parameters(box) -> dict:
+    """
+    Compute the values of a box filled into box_instantiation_template and
+    box_addition_template.
+    
+    Args:
+        box: (model.Box) The box.
+    
+    Returns:
+        A dict with the template parameters (as formatted strings).
+    """
+
+    return dict(texOffsetX=str(box.tex_offset_u),
+                texOffsetY=str(box.tex_offset_v),
+                offsetX=format_float(box.x),
+                offsetY=format_float(box.y),
+                offsetZ=format_float(box.z),
+                width=box.width, height=box.height, depth=box.depth,
+                scaleFactor=format_float(box.inflate) if box.inflate != 0. else '0f')
+
+
+def get_part_parameters(part) -> dict:
+    """
+    Compute the values filled into box_instantiation_template for a part.
+    The texture offset of the first box is passed to the constructor, all
+    further boxes are added with their own texture offset. Boxes with
+    hidden faces are built from their visible faces, boxes without any are
+    left out.
+    
+    Args:
+        part: (model.Part) Part consisting of one or more boxes.
+    
+    Returns:
+        A dict with the template parameters (as formatted strings).
+    """
+
+    boxes = []
+    for i, box in enumerate(part.boxes):
+        if box.hidden_faces == occlusion.ALL_FACES:
+            continue
+        if box.hidden_faces:
+            template = culled_box_template
+        elif i == 0:
+            template = box_first_template
+        else:
+            template = box_addition_template
+        boxes.append(template.format(boxName=part.name, hiddenFaces=box.hidden_faces, **get_box_parameters(box)))
+    return dict(get_box_parameters(part.boxes[0]),
+                boxName=part.name,
+                boxes="".join(boxes),
+                rotatePointX=format_float(part.pivot_x),
+                rotatePointY=format_float(part.pivot_y),
+                rotatePointZ=format_float(part.pivot_z),
+                rotateAngleX=format_float(part.angle_x),
+                rotateAngleY=format_float(part.angle_y),
+                rotateAngleZ=format_float(part.angle_z))
+
+
+def render_part_fragments(part, parent_name: str = None) -> (str, str, str):
+    """
+    Render the java code of a single part.
+    
+    Args:
+        part: (model.Part) The part.
+        parent_name: Name of the parent part or None for root parts.
+    
+    Returns:
+        The declaration, the instantiation and the render call of the part.
+        Children have no render call, their instantiation adds them to
+        their parent (which has to be instantiated before).
+    """
+
+    parameters = get_part_parameters(part)
+    if parent_name is not None:
+        return (box_declaration_template.format(**parameters) + "\n",
+                box_instantiation_template.format(**parameters)
+                + box_child_template.format(parentName=parent_name, boxName=part.name) + "\n",
+                "")
+    return (box_declaration_template.format(**parameters) + "\n",
+            box_instantiation_template.format(**parameters) + "\n",
+            box_render_template.format(**parameters) + "\n")
+
+
+def iter_model_class(model_name: str, tsu: int, tsv: int, fragments: list, sections: dict = None):
+    """
+    Generate the sections of the model class one after another.
+    
+    Args:
+        model_name: Name of the generated class (without the 'Model' prefix).
+        tsu: Texture width in pixels.
+        tsv: Texture height in pixels.
+        fragments: List of part fragments (see render_part_fragments).
+        sections: Optional additional code (e.g. from get_animation_sections)
+                  as dict with the keys 'imports', 'fields', 'constructor',
+                  'render' and 'methods'.
+    
+    Yields:
+        Strings which concatenated make up the '.java' file.
+    """
+
+    sections = dict(EMPTY_SECTIONS, **(sections if sections is not None else {}))
+    yield class_header_template.format(modelName=model_name, imports=sections["imports"],
+                                       fields=sections["fields"])
+    for declaration, _, _ in fragments:
+        yield declaration
+    yield class_constructor_template.format(modelName=model_name, texWidth=str(tsu), texHeight=str(tsv))
+    for _, instantiation, _ in fragments:
+        yield instantiation
+    yield class_render_template.format(constructor=sections["constructor"], render=sections["render"])
+    for _, _, render_call in fragments:
+        yield render_call
+    yield class_footer_template.format(methods=sections["methods"])
+
+
+def write_model(file, model, animation_resource: str = None, parts_resource: str = None, static_roots=None,
+                lod_distances=()) -> int:
+    """
+    Write the java class of a model to a stream.
+    
+    Args:
+        file: An open text stream.
+        model: (model.Model) The model.
+        animation_resource: Name of the binary animation resource read by
+                            the class. If None, the clips of the model are
+                            inlined.
+        parts_resource: Name of the binary model resource (see
+                        partdata.py) the class builds its parts from. If
+                        None, every box gets its own statements.
+        static_roots: Optional set of the names of the root parts rendered
+                      from a single display list (see
+                      merge.get_static_roots).
+        lod_distances: Ascending distances in blocks from which the levels
+                       of detail 1, 2, ... are used (see lod.py). Empty for
+                       a single level.
+    
+    Returns:
+        The number of characters written.
+    """
+
+    static_roots = static_roots or set()
+    if parts_resource is None:
+        fragments = []
+        for part, parent in model.iter_hierarchy():
+            fragment = render_part_fragments(part, parent.name if parent is not None else None)
+            fragments.append(fragment[:2] + ("",) if part.name in static_roots else fragment)
+        sections = EMPTY_SECTIONS
+        if static_roots:
+            sections = get_static_sections([part.name for part in model.parts if part.name in static_roots])
+        if any(0 < box.hidden_faces < occlusion.ALL_FACES for part in model.iter_parts() for box in part.boxes):
+            sections = merge_sections(sections, get_culling_sections())
+    else:
+        fragments = [TABLE_FRAGMENT]
+        # The loop building the boxes handles hidden faces for any model.
+        sections = merge_sections(get_table_sections(model, parts_resource, static_roots),
+                                  get_culling_sections(table=True))
+        if static_roots:
+            sections = merge_sections(sections, get_static_sections())
+    if lod_distances:
+        hidden_parts = None
+        if parts_resource is None:
+            levels = lod.get_hidden_levels(model, lod_distances, static_roots)
+            hidden_parts = lod.get_hidden_parts(model, levels, len(lod_distances) + 1)
+        # The level is selected before anything is rendered.
+        sections = merge_sections(get_lod_sections(lod_distances, hidden_parts), sections)
+    if model.clips:
+        sections = merge_sections(sections, get_animation_sections(
+            model.name, [part.name for part in model.iter_parts()], model.clips, animation_resource,
+            declare_parts=parts_resource is None))
+    return writer.write_sections(file, iter_model_class(model.name, model.texture_width,
+                                                        model.texture_height, fragments, sections))
+
+
+def get_template_salt() -> str:
+    """
+    Identify the exporter version and the part templates. Cached fragments
+    are only valid for the same salt.
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(bl_info["version"]).encode())
+    for template in (box_declaration_template, box_instantiation_template, box_first_template,
+                     box_addition_template, culled_box_template, box_render_template, box_child_template):
+        digest.update(template.encode() + b"\0")
+    return digest.hexdigest()
+
+
+# Channels applied by the generated animation code, their indices match
+# model.CHANNEL_NAMES. ModelRenderers have no scale, so the scale channels are
+# not exported.
+RUNTIME_CHANNELS = ("pivot_x", "pivot_y", "pivot_z", "angle_x", "angle_y", "angle_z")
+RUNTIME_FIELDS = ("rotationPointX", "rotationPointY", "rotationPointZ",
+                  "rotateAngleX", "rotateAngleY", "rotateAngleZ")
+
+# Number of float literals per line of inlined animation data.
+VALUES_PER_LINE = 8
+
+animation_imports_template = """{binaryImports}import java.util.Arrays;
+"""
+
+binary_imports_template = """import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.UncheckedIOException;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+"""
+
+animation_fields_template = """
+{clipConstants}
+    private static final int CHANNELS = {channelCount};
+    private static final int[] FRAME_COUNTS = {{{frameCounts}}};
+    // [clip][part * CHANNELS + channel][frame], null if the channel is not animated.
+    private static final float[][][] ANIMATIONS = new float[{clipCount}][{channelSlots}][];
+    // [clip][part * CHANNELS + channel][key], the frames of the values of reduced channels,
+    // null if the channel has a value for every frame.
+    private static final int[][][] KEYFRAMES = new int[{clipCount}][{channelSlots}][];
+    // part * CHANNELS + channel of the channels animated by any clip, all others keep their pose.
+    private static final int[] ANIMATED_SLOTS = {{{animatedSlots}}};
+
+    static {{
+        loadAnimations();
+    }}
+{partsField}
+    private float[] restPose;
+"""
+
+animation_parts_field_template = """
+    private ModelRenderer[] parts;"""
+
+clip_constant_template = """    public static final int {constantName} = {clipIndex};"""
+
+animation_constructor_template = """{partsAssignment}
+        this.restPose = new float[this.parts.length * CHANNELS];
+        for (int i = 0; i < this.parts.length; ++i) {{
+            ModelRenderer part = this.parts[i];
+            this.restPose[i * CHANNELS] = part.rotationPointX;
+            this.restPose[i * CHANNELS + 1] = part.rotationPointY;
+            this.restPose[i * CHANNELS + 2] = part.rotationPointZ;
+            this.restPose[i * CHANNELS + 3] = part.rotateAngleX;
+            this.restPose[i * CHANNELS + 4] = part.rotateAngleY;
+            this.restPose[i * CHANNELS + 5] = part.rotateAngleZ;
+        }}"""
+
+animation_parts_assignment_template = """
+        this.parts = new ModelRenderer[] {{{partList}}};"""
+
+animation_render_template = """        this.applyAnimation(entity);
+"""
+
+animation_methods_template = """
+    /**
+     * Implemented by entities using the animations of this model.
+     */
+    public interface IAnimated {{
+        /** Index of the current clip (one of the ANIMATION_ constants) or -1 for none. */
+        int getAnimationId();
+
+        /** Current frame (tick) of the clip. */
+        int getAnimationFrame();
+    }}
+
+    private void applyAnimation(Entity entity) {{
+        float[][] channels = null;
+        int[][] keyframes = null;
+        int frameCount = 1;
+        int frame = 0;
+        if (entity instanceof IAnimated) {{
+            IAnimated animated = (IAnimated) entity;
+            int clip = animated.getAnimationId();
+            if (clip >= 0 && clip < ANIMATIONS.length) {{
+                channels = ANIMATIONS[clip];
+                keyframes = KEYFRAMES[clip];
+                frameCount = Math.max(1, FRAME_COUNTS[clip]);
+                frame = animated.getAnimationFrame();
+            }}
+        }}
+        int current = Math.floorMod(frame, frameCount);
+        int next = current + 1 < frameCount ? current + 1 : 0;
+        float partialTicks = this.partialTicks;
+        ModelRenderer[] parts = this.parts;
+        float[] restPose = this.restPose;
+        // Runs every frame for every entity: only primitive array reads and field writes, nothing is allocated.
+        for (int slot : ANIMATED_SLOTS) {{
+            float[] values = channels != null ? channels[slot] : null;
+            float value;
+            if (values == null) {{
+                value = restPose[slot];
+            }} else if (keyframes[slot] == null) {{
+                float from = values[current];
+                value = from + (values[next] - from) * partialTicks;
+            }} else {{
+                value = getKeyframeValue(values, keyframes[slot], current, frameCount, partialTicks);
+            }}
+            ModelRenderer part = parts[slot / CHANNELS];
+            switch (slot % CHANNELS) {{
+                case 0: part.rotationPointX = value; break;
+                case 1: part.rotationPointY = value; break;
+                case 2: part.rotationPointZ = value; break;
+                case 3: part.rotateAngleX = value; break;
+                case 4: part.rotateAngleY = value; break;
+                default: part.rotateAngleZ = value; break;
+            }}
+        }}
+    }}
+
+    private static float getKeyframeValue(float[] values, int[] keys, int current, int frameCount,
+            float partialTicks) {{
+        // Interpolate between the last key frame at or before the current frame and the next one,
+        // the last key frame blends into the first one at the end of the clip.
+        int key = Arrays.binarySearch(keys, current);
+        if (key < 0) {{
+            key = -key - 2;
+        }}
+        boolean last = key + 1 == keys.length;
+        int nextFrame = last ? frameCount : keys[key + 1];
+        float nextValue = last ? values[0] : values[key + 1];
+        float t = (current - keys[key] + partialTicks) / (nextFrame - keys[key]);
+        return values[key] + (nextValue - values[key]) * t;
+    }}
+{loader}"""
+
+inline_loader_template = """
+    private static void loadAnimations() {{
+{channelAssignments}    }}
+"""
+
+inline_channel_template = """        ANIMATIONS[{clipIndex}][{channel}] = new float[] {{
+{values}
+        }};
+"""
+
+inline_keyframes_template = """        KEYFRAMES[{clipIndex}][{channel}] = new int[] {{
+{keys}
+        }};
+"""
+
+binary_loader_template = """
+    private static void loadAnimations() {{
+        byte[] data;
+        try (InputStream stream = Model{modelName}.class.getResourceAsStream("{resource}")) {{
+            if (stream == null) {{
+                throw new IllegalStateException("Missing animation resource {resource}");
+            }}
+            ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+            byte[] chunk = new byte[8192];
+            int length;
+            while ((length = stream.read(chunk)) > 0) {{
+                bytes.write(chunk, 0, length);
+            }}
+            data = bytes.toByteArray();
+        }} catch (IOException e) {{
+            throw new UncheckedIOException(e);
+        }}
+        ByteBuffer buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN);
+        if (buffer.getInt() != 0x4158434D || buffer.getShort() != {version}) {{
+            throw new IllegalStateException("Invalid animation resource {resource}");
+        }}
+        buffer.getShort();
+        int partCount = buffer.getShort() & 0xFFFF;
+        int clipCount = buffer.getShort() & 0xFFFF;
+        if (partCount != {partCount} || clipCount != ANIMATIONS.length) {{
+            throw new IllegalStateException("Animation resource {resource} does not match the model");
+        }}
+        for (int clip = 0; clip < clipCount; ++clip) {{
+            buffer.getInt();
+            int channelCount = buffer.getShort() & 0xFFFF;
+            buffer.getShort();
+            for (int i = 0; i < channelCount; ++i) {{
+                int part = buffer.getShort() & 0xFFFF;
+                int channel = buffer.get() & 0xFF;
+                int encoding = buffer.get() & 0xFF;
+                int count = buffer.getInt();
+                int offset = buffer.getInt();
+                float scale = buffer.getFloat();
+                float bias = buffer.getFloat();
+                float[] values = new float[count];
+                int[] keys = null;
+                if ((encoding & 0x80) != 0) {{
+                    ByteBuffer keyData = ByteBuffer.wrap(data, offset, data.length - offset).slice()
+                            .order(ByteOrder.LITTLE_ENDIAN);
+                    keys = new int[count];
+                    for (int j = 0; j < count; ++j) {{
+                        keys[j] = keyData.getShort() & 0xFFFF;
+                    }}
+                    offset += (2 * count + 3) & ~3;
+                    encoding &= 0x7F;
+                }}
+                ByteBuffer payload = ByteBuffer.wrap(data, offset, data.length - offset).slice()
+                        .order(ByteOrder.LITTLE_ENDIAN);
+                if (encoding == 0) {{
+                    payload.asFloatBuffer().get(values);
+                }} else {{
+                    short[] stored = new short[count];
+                    payload.asShortBuffer().get(stored);
+                    for (int j = 0; j < count; ++j) {{
+                        values[j] = stored[j] * scale + bias;
+                    }}
+                }}
+                if (channel < CHANNELS) {{
+                    ANIMATIONS[clip][part * CHANNELS + channel] = values;
+                    KEYFRAMES[clip][part * CHANNELS + channel] = keys;
+                }}
+            }}
+        }}
+    }}
+"""
+
+
+def get_clip_constant_name(clip_name: str) -> str:
+    """
+    Name of the java constant holding the index of a clip, e.g. 'walk fast'
+    becomes 'ANIMATION_WALK_FAST'.
+    """
+
+    return "ANIMATION_" + re.sub(r"[^0-9A-Za-z]+", "_", clip_name).strip("_").upper()
+
+
+def format_list(items: list, indent: str, per_line: int = 6) -> str:
+    """
+    Join items with commas, starting a new (indented) line every per_line
+    items.
+    """
+
+    lines = [", ".join(items[i:i + per_line]) for i in range(0, len(items), per_line)]
+    return (",\n" + indent).join(lines)
+
+
+def format_float_array(values) -> str:
+    """
+    Format numbers as the lines of a java float array literal.
+    """
+
+    return "            " + format_list([format_float(value) for value in values], "            ",
+                                            VALUES_PER_LINE)
+
+
+def format_int_array(values) -> str:
+    """
+    Format numbers as the lines of a java int array literal.
+    """
+
+    return "            " + format_list([str(value) for value in values], "            ", 2 * VALUES_PER_LINE)
+
+
+def get_animation_sections(model_name: str, part_names: list, clips: list, resource: str = None,
+                           declare_parts: bool = True) -> dict:
+    """
+    Generate the code that plays back baked animations.
+    The generated class gets a nested interface IAnimated which entities
+    implement to tell the model which clip and frame to render. Every
+    frame, the rotation points and angles animated by any of the clips are
+    interpolated between the current and the next frame of the clip, or
+    between the surrounding key frames for channels reduced by
+    reduce.reduce_clips. Channels no clip animates are left alone, so
+    setRotationAngles can still move them.
+    
+    Args:
+        model_name: Name of the generated class (without the 'Model' prefix).
+        part_names: Names of the parts in the order of the generated code.
+        clips: List of model.Clips.
+        resource: Name of the binary animation resource (see animdata.py)
+                  relative to the class. If None, the animation data is
+                  inlined as java literals.
+        declare_parts: Whether the array 'parts' holding the
+                       ModelRenderers in the order of part_names is
+                       declared and filled here. Otherwise the class has it
+                       already (see get_table_sections).
+    
+    Returns:
+        The sections to pass to iter_model_class.
+    """
+
+    animated_slots = sorted({part * len(RUNTIME_CHANNELS) + channel
+                             for _, part, channel, _, _ in animdata.iter_channels(part_names, clips, RUNTIME_CHANNELS)})
+    clip_constants = "\n".join(clip_constant_template.format(constantName=get_clip_constant_name(clip.name),
+                                                             clipIndex=clip.index)
+                               for clip in clips)
+    fields = animation_fields_template.format(clipConstants=clip_constants,
+                                              channelCount=len(RUNTIME_CHANNELS),
+                                              frameCounts=", ".join(str(clip.frame_count) for clip in clips),
+                                              clipCount=len(clips),
+                                              partsField=animation_parts_field_template if declare_parts else "",
+                                              channelSlots=len(part_names) * len(RUNTIME_CHANNELS),
+                                              animatedSlots=format_list([str(slot) for slot in animated_slots],
+                                                                        "            ", 2 * VALUES_PER_LINE))
+    parts_assignment = ""
+    if declare_parts:
+        parts_assignment = animation_parts_assignment_template.format(
+            partList=format_list(["this." + name for name in part_names], "                "))
+    constructor = animation_constructor_template.format(partsAssignment=parts_assignment)
+
+    if resource is None:
+        assignments = []
+        for clip, part, channel, values, keyframes in animdata.iter_channels(part_names, clips, RUNTIME_CHANNELS):
+            slot = part * len(RUNTIME_CHANNELS) + channel
+            assignments.append(inline_channel_template.format(clipIndex=clip.index, channel=slot,
+                                                              values=format_float_array(values)))
+            if keyframes is not None:
+                assignments.append(inline_keyframes_template.format(clipIndex=clip.index, channel=slot,
+                                                                    keys=format_int_array(keyframes)))
+        loader = inline_loader_template.format(channelAssignments="".join(assignments))
+    else:
+        loader = binary_loader_template.format(modelName=model_name, resource=resource,
+                                               version=animdata.VERSION, partCount=len(part_names))
+
+    binary_imports = binary_imports_template if resource is not None else ""
+    return {"imports": animation_imports_template.format(binaryImports=binary_imports),
+            "fields": fields,
+            "constructor": constructor,
+            "render": animation_render_template,
+            "methods": animation_methods_template.format(loader=loader)}
+
+
+# Table construction: the parts and boxes are read from a binary resource (see partdata.py) and
+# the ModelRenderers are built in a loop, so the size of the class does not depend on the model.
+table_imports_template = """import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.UncheckedIOException;
+import java.nio.ByteBuffer;
+import java.nio.ByteOrder;
+import java.nio.charset.StandardCharsets;
+"""
+
+table_fields_template = """
+    // The parts in the order of the resource, parents before their children.
+    private static final String[] PART_NAMES = new String[{partCount}];
+    private static final int[] PART_PARENTS = new int[{partCount}];
+    private static final int[] PART_BOX_COUNTS = new int[{partCount}];
+    private static final boolean[] PART_MIRRORED = new boolean[{partCount}];
+    // The level of detail from which a part is hidden, 0 if it is always shown.
+    private static final int[] PART_LOD_LEVELS = new int[{partCount}];
+    // [part * 6]: rotation point x, y, z and rotation angles x, y, z.
+    private static final float[] PART_POSES = new float[{partCount} * 6];
+    // [box * 6]: texture offset u, v, width, height, depth and hidden faces.
+    private static final int[] BOX_INTS = new int[{boxCount} * 6];
+    // [box * 4]: offset x, y, z and scale factor.
+    private static final float[] BOX_FLOATS = new float[{boxCount} * 4];
+    private static final int[] ROOTS = new int[{rootCount}];
+    private static final int[] STATIC_ROOTS = new int[{staticRootCount}];
+
+    static {{
+        loadParts();
+    }}
+
+    public final ModelRenderer[] parts;
+"""
+
+table_constructor_code = """        this.parts = new ModelRenderer[PART_PARENTS.length];
+        for (int i = 0, box = 0; i < this.parts.length; ++i) {
+            ModelRenderer part = new ModelRenderer(this);
+            for (int end = box + PART_BOX_COUNTS[i]; box < end; ++box) {
+                int hiddenFaces = BOX_INTS[box * 6 + 5];
+                if (hiddenFaces == 0) {
+                    part.setTextureOffset(BOX_INTS[box * 6], BOX_INTS[box * 6 + 1])
+                            .addBox(BOX_FLOATS[box * 4], BOX_FLOATS[box * 4 + 1], BOX_FLOATS[box * 4 + 2],
+                                    BOX_INTS[box * 6 + 2], BOX_INTS[box * 6 + 3], BOX_INTS[box * 6 + 4],
+                                    BOX_FLOATS[box * 4 + 3]);
+                } else if (hiddenFaces != ALL_FACES) {
+                    part.cubeList.add(new CulledBox(part, BOX_INTS[box * 6], BOX_INTS[box * 6 + 1],
+                            BOX_FLOATS[box * 4], BOX_FLOATS[box * 4 + 1], BOX_FLOATS[box * 4 + 2],
+                            BOX_INTS[box * 6 + 2], BOX_INTS[box * 6 + 3], BOX_INTS[box * 6 + 4],
+                            BOX_FLOATS[box * 4 + 3], hiddenFaces));
+                }
+            }
+            part.setRotationPoint(PART_POSES[i * 6], PART_POSES[i * 6 + 1], PART_POSES[i * 6 + 2]);
+            part.rotateAngleX = PART_POSES[i * 6 + 3];
+            part.rotateAngleY = PART_POSES[i * 6 + 4];
+            part.rotateAngleZ = PART_POSES[i * 6 + 5];
+            part.mirror = PART_MIRRORED[i];
+            if (PART_PARENTS[i] >= 0) {
+                this.parts[PART_PARENTS[i]].addChild(part);
+            }
+            this.parts[i] = part;
+        }
+"""
+
+table_render_code = """        for (int root : ROOTS) {
+            this.parts[root].render(scale);
+        }
+"""
+
+# The loops building and rendering the parts take the place of the fragments of the parts.
+TABLE_FRAGMENT = ("", table_constructor_code, table_render_code)
+
+table_methods_template = """
+    /**
+     * The ModelRenderer of a part by the name of its blender object, null if there is none.
+     */
+    public ModelRenderer getPart(String name) {{
+        for (int i = 0; i < PART_NAMES.length; ++i) {{
+            if (PART_NAMES[i].equals(name)) {{
+                return this.parts[i];
+            }}
+        }}
+        return null;
+    }}
+
+    private static void loadParts() {{
+        byte[] data;
+        try (InputStream stream = Model{modelName}.class.getResourceAsStream("{resource}")) {{
+            if (stream == null) {{
+                throw new IllegalStateException("Missing model resource {resource}");
+            }}
+            ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+            byte[] chunk = new byte[8192];
+            int length;
+            while ((length = stream.read(chunk)) > 0) {{
+                bytes.write(chunk, 0, length);
+            }}
+            data = bytes.toByteArray();
+        }} catch (IOException e) {{
+            throw new UncheckedIOException(e);
+        }}
+        ByteBuffer buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN);
+        if (buffer.getInt() != 0x5058434D || buffer.getShort() != {version}) {{
+            throw new IllegalStateException("Invalid model resource {resource}");
+        }}
+        buffer.getShort();
+        int boxCount = BOX_FLOATS.length / 4;
+        if (buffer.getInt() != PART_PARENTS.length || buffer.getInt() != boxCount) {{
+            throw new IllegalStateException("Model resource {resource} does not match the model");
+        }}
+        int[] flags = new int[PART_PARENTS.length];
+        for (int i = 0; i < PART_PARENTS.length; ++i) {{
+            PART_PARENTS[i] = buffer.getInt();
+            PART_BOX_COUNTS[i] = buffer.getInt();
+            flags[i] = buffer.getInt();
+            PART_MIRRORED[i] = (flags[i] & 1) != 0;
+            PART_LOD_LEVELS[i] = flags[i] >>> 8 & 0xFF;
+            for (int j = 0; j < 6; ++j) {{
+                PART_POSES[i * 6 + j] = buffer.getFloat();
+            }}
+        }}
+        for (int box = 0; box < boxCount; ++box) {{
+            BOX_INTS[box * 6] = buffer.getShort() & 0xFFFF;
+            BOX_INTS[box * 6 + 1] = buffer.getShort() & 0xFFFF;
+            BOX_FLOATS[box * 4] = buffer.getFloat();
+            BOX_FLOATS[box * 4 + 1] = buffer.getFloat();
+            BOX_FLOATS[box * 4 + 2] = buffer.getFloat();
+            BOX_INTS[box * 6 + 2] = buffer.getShort() & 0xFFFF;
+            BOX_INTS[box * 6 + 3] = buffer.getShort() & 0xFFFF;
+            BOX_INTS[box * 6 + 4] = buffer.getShort() & 0xFFFF;
+            BOX_INTS[box * 6 + 5] = buffer.getShort() & 0xFFFF;
+            BOX_FLOATS[box * 4 + 3] = buffer.getFloat();
+        }}
+        for (int i = 0, root = 0, staticRoot = 0; i < PART_NAMES.length; ++i) {{
+            byte[] name = new byte[buffer.getShort() & 0xFFFF];
+            buffer.get(name);
+            PART_NAMES[i] = new String(name, StandardCharsets.UTF_8);
+            if (PART_PARENTS[i] < 0 && (flags[i] & 2) != 0) {{
+                STATIC_ROOTS[staticRoot++] = i;
+            }} else if (PART_PARENTS[i] < 0) {{
+                ROOTS[root++] = i;
+            }}
+        }}
+    }}
+"""
+
+
+def get_table_sections(model, resource: str, static_roots=()) -> dict:
+    """
+    Generate the code reading the parts of a model from a binary resource
+    (see partdata.py). Together with TABLE_FRAGMENT, which builds and
+    renders them in loops, it replaces the fragments of the parts. The
+    parts are kept in the public array 'parts', getPart looks them up by
+    name.
+    
+    Args:
+        model: (model.Model) The model.
+        resource: Name of the binary model resource relative to the class.
+        static_roots: Names of the root parts rendered from a display list
+                      (see get_static_sections), which are flagged in the
+                      resource.
+    
+    Returns:
+        The sections to pass to iter_model_class.
+    """
+
+    fields = table_fields_template.format(partCount=sum(1 for _ in model.iter_parts()),
+                                          boxCount=model.get_box_count(),
+                                          rootCount=sum(1 for part in model.parts if part.name not in static_roots),
+                                          staticRootCount=sum(1 for part in model.parts if part.name in static_roots))
+    return {"imports": table_imports_template,
+            "fields": fields,
+            "methods": table_methods_template.format(modelName=model.name, resource=resource,
+                                                     version=partdata.VERSION)}
+
+
+def merge_sections(*sections) -> dict:
+    """
+    Concatenate the sections of several code generators, dropping repeated
+    import lines.
+    """
+
+    merged = dict(EMPTY_SECTIONS)
+    for section in sections:
+        for key, code in section.items():
+            merged[key] += code
+    imports = []
+    for line in merged["imports"].splitlines(True):
+        if line not in imports:
+            imports.append(line)
+    merged["imports"] = "".join(imports)
+    return merged
+
+
+# Static parts: the parts no clip animates are recorded into a single display list on the first
+# frame and replayed with one call afterwards.
+static_imports_template = """import net.minecraft.client.renderer.GLAllocation;
+import net.minecraft.client.renderer.GlStateManager;
+import net.minecraftforge.fml.common.ObfuscationReflectionHelper;
+import org.lwjgl.opengl.GL11;
+"""
+
+static_fields_template = """
+    // The root parts which are never animated, rendered from a single display list.
+    private ModelRenderer[] staticParts;
+    private int staticList = -1;
+    private float staticListScale;
+"""
+
+static_constructor_template = """
+        this.staticParts = new ModelRenderer[] {{{partList}}};
+"""
+
+# With the table construction the static roots are read from the resource.
+static_table_constructor_code = """
+        this.staticParts = new ModelRenderer[STATIC_ROOTS.length];
+        for (int i = 0; i < STATIC_ROOTS.length; ++i) {
+            this.staticParts[i] = this.parts[STATIC_ROOTS[i]];
+        }
+"""
+
+static_render_code = """        this.renderStaticParts(scale);
+"""
+
+static_methods_code = """
+    private void renderStaticParts(float scale) {
+        if (this.staticList >= 0 && this.staticListScale == scale) {
+            GlStateManager.callList(this.staticList);
+            return;
+        }
+        if (this.staticList >= 0) {
+            // The recorded list replays the lists the parts compiled at the old scale.
+            GLAllocation.deleteDisplayLists(this.staticList);
+            for (ModelRenderer part : this.staticParts) {
+                deleteDisplayLists(part);
+            }
+        }
+        // The parts compile their own display lists when they are rendered for the first time, which
+        // cannot happen while another list is recorded. So they are rendered once before recording.
+        for (ModelRenderer part : this.staticParts) {
+            part.render(scale);
+        }
+        this.staticList = GLAllocation.generateDisplayLists(1);
+        GlStateManager.glNewList(this.staticList, GL11.GL_COMPILE);
+        for (ModelRenderer part : this.staticParts) {
+            part.render(scale);
+        }
+        GlStateManager.glEndList();
+        this.staticListScale = scale;
+    }
+
+    // Free the display lists of a part and its children, they are compiled again on the next render.
+    private static void deleteDisplayLists(ModelRenderer part) {
+        boolean compiled = ObfuscationReflectionHelper.getPrivateValue(ModelRenderer.class, part, "field_78812_q", "compiled");
+        if (compiled) {
+            int displayList = ObfuscationReflectionHelper.getPrivateValue(ModelRenderer.class, part, "field_78811_r", "displayList");
+            GLAllocation.deleteDisplayLists(displayList);
+            ObfuscationReflectionHelper.setPrivateValue(ModelRenderer.class, part, false, "field_78812_q", "compiled");
+        }
+        if (part.childModels != null) {
+            for (ModelRenderer child : part.childModels) {
+                deleteDisplayLists(child);
+            }
+        }
+    }
+"""
+
+
+def get_static_sections(part_names: list = None) -> dict:
+    """
+    Generate the code rendering the static root parts (see
+    merge.get_static_roots) from a single display list. Their render calls
+    have to be left out of the fragments.
+    
+    Args:
+        part_names: Names of the static root parts in the order of the
+                    class, or None if they are read from the model resource
+                    (see get_table_sections).
+    
+    Returns:
+        The sections to pass to iter_model_class.
+    """
+
+    if part_names is None:
+        constructor = static_table_constructor_code
+    else:
+        constructor = static_constructor_template.format(
+            partList=format_list(["this." + name for name in part_names], "                "))
+    return {"imports": static_imports_template,
+            "fields": static_fields_template,
+            "constructor": constructor,
+            "render": static_render_code,
+            "methods": static_methods_code}
+
+
+# Hidden face culling: boxes partly covered by other boxes are built from their visible faces
+# (see occlusion.py). The faces are created like in ModelBox, in the same order and with the same
+# texture layout.
+culling_imports_template = """import net.minecraft.client.model.ModelBox;
+import net.minecraft.client.model.PositionTextureVertex;
+import net.minecraft.client.model.TexturedQuad;
+import net.minecraft.client.renderer.BufferBuilder;
+"""
+
+culling_methods_template = """
+    /**
+     * A box without the faces covered by other boxes. The bits of hiddenFaces stand for the faces
+     * towards +x, -x, -y, +y, -z and +z.
+     */
+    private static class CulledBox extends ModelBox {{
+
+        private final TexturedQuad[] quads;
+
+        CulledBox(ModelRenderer renderer, int texU, int texV, float x, float y, float z, int dx, int dy, int dz,
+                float delta, int hiddenFaces) {{
+            super(renderer, texU, texV, x, y, z, dx, dy, dz, delta);
+            float x2 = x + dx + delta;
+            float y2 = y + dy + delta;
+            float z2 = z + dz + delta;
+            x -= delta;
+            y -= delta;
+            z -= delta;
+            if (renderer.mirror) {{
+                // ModelBox swaps the x coordinates of mirrored boxes, and with them their +x and -x faces.
+                float swap = x2;
+                x2 = x;
+                x = swap;
+                hiddenFaces = hiddenFaces & ~3 | (hiddenFaces & 1) << 1 | (hiddenFaces & 2) >> 1;
+            }}
+            PositionTextureVertex v000 = new PositionTextureVertex(x, y, z, 0f, 0f);
+            PositionTextureVertex v100 = new PositionTextureVertex(x2, y, z, 0f, 8f);
+            PositionTextureVertex v110 = new PositionTextureVertex(x2, y2, z, 8f, 8f);
+            PositionTextureVertex v010 = new PositionTextureVertex(x, y2, z, 8f, 0f);
+            PositionTextureVertex v001 = new PositionTextureVertex(x, y, z2, 0f, 0f);
+            PositionTextureVertex v101 = new PositionTextureVertex(x2, y, z2, 0f, 8f);
+            PositionTextureVertex v111 = new PositionTextureVertex(x2, y2, z2, 8f, 8f);
+            PositionTextureVertex v011 = new PositionTextureVertex(x, y2, z2, 8f, 0f);
+            float width = renderer.textureWidth;
+            float height = renderer.textureHeight;
+            TexturedQuad[] faces = {{
+                    new TexturedQuad(new PositionTextureVertex[] {{v101, v100, v110, v111}},
+                            texU + dz + dx, texV + dz, texU + dz + dx + dz, texV + dz + dy, width, height),
+                    new TexturedQuad(new PositionTextureVertex[] {{v000, v001, v011, v010}},
+                            texU, texV + dz, texU + dz, texV + dz + dy, width, height),
+                    new TexturedQuad(new PositionTextureVertex[] {{v101, v001, v000, v100}},
+                            texU + dz, texV, texU + dz + dx, texV + dz, width, height),
+                    new TexturedQuad(new PositionTextureVertex[] {{v110, v010, v011, v111}},
+                            texU + dz + dx, texV + dz, texU + dz + dx + dx, texV, width, height),
+                    new TexturedQuad(new PositionTextureVertex[] {{v100, v000, v010, v110}},
+                            texU + dz, texV + dz, texU + dz + dx, texV + dz + dy, width, height),
+                    new TexturedQuad(new PositionTextureVertex[] {{v001, v101, v111, v011}},
+                            texU + dz + dx + dz, texV + dz, texU + dz + dx + dz + dx, texV + dz + dy, width, height)}};
+            this.quads = new TexturedQuad[{faceCount} - Integer.bitCount(hiddenFaces)];
+            for (int i = 0, quad = 0; i < faces.length; ++i) {{
+                if ((hiddenFaces & 1 << i) == 0) {{
+                    if (renderer.mirror) {{
+                        faces[i].flipFace();
+                    }}
+                    this.quads[quad++] = faces[i];
+                }}
+            }}
+        }}
+
+        @Override
+        public void render(BufferBuilder buffer, float scale) {{
+            for (TexturedQuad quad : this.quads) {{
+                quad.draw(buffer, scale);
+            }}
+        }}
+    }}
+"""
+
+# With the table construction boxes without any visible face are skipped by the loop.
+culling_table_fields_template = """
+    private static final int ALL_FACES = {allFaces};
+"""
+
+
+def get_culling_sections(table: bool = False) -> dict:
+    """
+    Generate the class building boxes from their visible faces, used for
+    the boxes with hidden faces (see occlusion.cull_hidden_faces).
+    
+    Args:
+        table: Whether the boxes are built from the model resource (see
+               get_table_sections).
+    
+    Returns:
+        The sections to pass to iter_model_class.
+    """
+
+    return {"imports": culling_imports_template,
+            "fields": culling_table_fields_template.format(allFaces=occlusion.ALL_FACES) if table else "",
+            "methods": culling_methods_template.format(faceCount=len(occlusion.FACES))}
+
+
+# Levels of detail: the parts too small to be seen at the distance of the entity are hidden (see
+# lod.py). Their ModelRenderers are switched off only when the level changes.
+lod_imports_template = """import net.minecraft.client.Minecraft;
+"""
+
+lod_fields_template = """
+    // Distances in blocks from which the levels of detail 1, 2, ... are used.
+    private static final double[] LOD_DISTANCES = {{{distances}}};
+    // The parts hidden at every level of detail, their children are hidden along with them.
+    private ModelRenderer[][] lodHiddenParts;
+    private int lodLevel;
+"""
+
+lod_constructor_template = """
+        this.lodHiddenParts = new ModelRenderer[][] {{
+                {levels}}};
+"""
+
+# With the table construction the levels of the parts are read from the resource.
+lod_table_imports_template = """import java.util.ArrayList;
+import java.util.List;
+"""
+
+lod_table_constructor_code = """
+        this.lodHiddenParts = new ModelRenderer[LOD_DISTANCES.length + 1][];
+        for (int level = 0; level < this.lodHiddenParts.length; ++level) {
+            List<ModelRenderer> hidden = new ArrayList<>();
+            for (int i = 0; i < this.parts.length; ++i) {
+                int parent = PART_PARENTS[i];
+                if (PART_LOD_LEVELS[i] != 0 && PART_LOD_LEVELS[i] <= level
+                        && (parent < 0 || PART_LOD_LEVELS[parent] == 0 || PART_LOD_LEVELS[parent] > level)) {
+                    hidden.add(this.parts[i]);
+                }
+            }
+            this.lodHiddenParts[level] = hidden.toArray(new ModelRenderer[0]);
+        }
+"""
+
+lod_render_code = """        this.selectLevelOfDetail(entity);
+"""
+
+lod_methods_code = """
+    /**
+     * Hide the parts too small to be seen at the distance of the entity to the camera.
+     */
+    private void selectLevelOfDetail(Entity entity) {
+        Entity camera = Minecraft.getMinecraft().getRenderViewEntity();
+        double distanceSq = entity != null && camera != null ? entity.getDistanceSq(camera) : 0.;
+        int level = 0;
+        while (level < LOD_DISTANCES.length && distanceSq >= LOD_DISTANCES[level] * LOD_DISTANCES[level]) {
+            ++level;
+        }
+        if (level != this.lodLevel) {
+            for (ModelRenderer part : this.lodHiddenParts[this.lodLevel]) {
+                part.showModel = true;
+            }
+            for (ModelRenderer part : this.lodHiddenParts[level]) {
+                part.showModel = false;
+            }
+            this.lodLevel = level;
+        }
+    }
+"""
+
+
+def get_lod_sections(distances, hidden_parts: list = None) -> dict:
+    """
+    Generate the code switching between the levels of detail of a model.
+    
+    Args:
+        distances: Ascending distances in blocks from which the levels of
+                   detail 1, 2, ... are used.
+        hidden_parts: Names of the parts hidden at every level (see
+                      lod.get_hidden_parts), or None if the levels are read
+                      from the model resource (see get_table_sections).
+    
+    Returns:
+        The sections to pass to iter_model_class.
+    """
+
+    if hidden_parts is None:
+        imports = lod_imports_template + lod_table_imports_template
+        constructor = lod_table_constructor_code
+    else:
+        imports = lod_imports_template
+        constructor = lod_constructor_template.format(levels=",\n                ".join(
+            "{" + format_list(["this." + name for name in names], "                 ") + "}"
+            for names in hidden_parts))
+    return {"imports": imports,
+            "fields": lod_fields_template.format(distances=", ".join(repr(float(distance)) for distance in distances)),
+            "constructor": constructor,
+            "render": lod_render_code,
+            "methods": lod_methods_code}
@@ -0,0 +1,110 @@
+"""
+Output formats of the exporter.
+
+Every format is a backend serializing the model representation (see
+model.py) into a file, so the scene is read once no matter how many
+formats are written. A new format only needs a function writing a
+model.Model to a stream and an entry in BACKENDS.
+"""
+
+import os
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from MCExport.Exporter import bedrock
+from MCExport.Exporter import blockbench
+from MCExport.Exporter import codegen
+from MCExport.Exporter import profiling
+from MCExport.Exporter import writer
+
+
+Backend = namedtuple("Backend", ["label", "extension", "write"])
+Backend.__doc__ = """
+An output format: its name in the user interface, the extension of its
+files (replacing '.java') and a function write(file, model, **options)
+writing a model.Model into an open text stream. Options a format does not
+know are ignored.
+"""
+
+
+def write_java(file, model, animation_resource: str = None, parts_resource: str = None, static_roots=None,
+               lod_distances=()) -> int:
+    return codegen.write_model(file, model, animation_resource, parts_resource, static_roots, lod_distances)
+
+
+def write_bedrock(file, model, **options) -> int:
+    return bedrock.write_geometry(file, model)
+
+
+def write_blockbench(file, model, **options) -> int:
+    return blockbench.write_project(file, model)
+
+
+BACKENDS = OrderedDict([
+    ("JAVA", Backend("Java class (Forge)", ".java", write_java)),
+    ("BEDROCK", Backend("Bedrock geometry", ".geo.json", write_bedrock)),
+    ("BLOCKBENCH", Backend("Blockbench project", ".bbmodel", write_blockbench)),
+])
+
+DEFAULT_FORMATS = ("JAVA",)
+
+
+def get_output_path(filepath: str, format_name: str) -> str:
+    """
+    Path of the file of a format, next to the '.java' file.
+
+    Args:
+        filepath: Path of the exported '.java' file.
+        format_name: Key of the format in BACKENDS.
+    """
+
+    base, extension = os.path.splitext(filepath)
+    if extension != ".java":
+        base = filepath
+    return base + BACKENDS[format_name].extension
+
+
+def write_formats(files, model, filepath: str, format_names, workers: int = 0, **options) -> dict:
+    """
+    Write a model in several formats at once, each file in a thread of its
+    own. The files are opened in an ExitStack through writer.atomic_open,
+    so they are only replaced when the stack is closed without an error.
+
+    Args:
+        files: The contextlib.ExitStack the files are opened in.
+        model: (model.Model) The model.
+        filepath: Path of the exported '.java' file, the other files are put
+                  next to it (see get_output_path).
+        format_names: Keys of the formats in BACKENDS.
+        workers: Number of threads (<= 0: one per format).
+        options: Keyword arguments passed to the backends, e.g. the names
+                 of the resources read by the java class (see write_java).
+
+    Returns:
+        A dict mapping the format names to the paths written.
+    """
+
+    format_names = [name for name in BACKENDS if name in format_names]
+    paths = OrderedDict((name, get_output_path(filepath, name)) for name in format_names)
+    streams = {name: files.enter_context(writer.atomic_open(path)) for name, path in paths.items()}
+
+    def write(name):
+        BACKENDS[name].write(streams[name], model, **options)
+        # Sync in the thread as well, so the disk writes of the formats overlap.
+        with profiling.phase("file write"):
+            streams[name].flush()
+            os.fsync(streams[name].fileno())
+
+    if workers <= 0:
+        workers = len(format_names)
+    if profiling.get_active() is not None:
+        # The phases of a profile are booked on a single stack.
+        workers = 1
+    if workers <= 1:
+        for name in format_names:
+            write(name)
+    else:
+        with ThreadPoolExecutor(workers) as executor:
+            for future in [executor.submit(write, name) for name in format_names]:
+                future.result()
+    return paths
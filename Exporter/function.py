@@ -1,5 +1,31 @@
+import contextlib
+import hashlib
+import json
 import math
+import os
+import struct
+import sys
+from array import array
 import bpy
+import numpy as np
+
+from MCExport.Exporter import animation
+from MCExport.Exporter import animdata
+from MCExport.Exporter import bake
+from MCExport.Exporter import cache
+from MCExport.Exporter import codegen
+from MCExport.Exporter import formats
+from MCExport.Exporter import geometry
+from MCExport.Exporter import lod
+from MCExport.Exporter import merge
+from MCExport.Exporter import model
+from MCExport.Exporter import occlusion
+from MCExport.Exporter import parallel
+from MCExport.Exporter import partdata
+from MCExport.Exporter import profiling
+from MCExport.Exporter import reduce
+from MCExport.Exporter import steps
+from MCExport.Exporter import writer
 
 
 def get_rounded_int(number: float) -> int:
@@ -103,18 +129,10 @@ def get_min_vertex(obj: bpy.types.Object) -> (float, float, float):
     """
 
     mesh: bpy.types.Mesh = obj.data
-    vertex_list = mesh.vertices
-    vx_min: float = None
-    vy_min: float = None
-    vz_min: float = None
-    for vert in vertex_list:
-        if(vx_min == None or vert.co.x < vx_min):
-            vx_min = vert.co.x
-        if(vy_min == None or vert.co.y < vy_min):
-            vy_min = vert.co.y
-        if(vz_min == None or vert.co.z > vz_min):
-            vz_min = vert.co.z
-    return vx_min, vy_min, vz_min
+    if len(mesh.vertices) == 0:
+        return None, None, None
+    vx_min, vy_min, vz_min = geometry.get_min_vertices([mesh])[0]
+    return float(vx_min), float(vy_min), float(vz_min)
 
 
 def get_min_uv(obj: bpy.types.Object) -> (float, float):
@@ -134,38 +152,74 @@ def get_min_uv(obj: bpy.types.Object) -> (float, float):
     """
 
     mesh: bpy.types.Mesh = obj.data
-    u_min = 1.
-    v_max = 0.
-    # Check if the active texture is not none.
-    if(mesh.uv_layers.active is not None):
-        for uv in mesh.uv_layers.active.data:
-            if(uv.uv[0] < u_min):
-                u_min = uv.uv[0]
-            if(uv.uv[1] > v_max):
-                v_max = uv.uv[1]
-        return u_min, 1-v_max
-    else:
-        return 0., 0.
+    u_min, v_min = geometry.get_min_uvs([mesh])[0]
+    return float(u_min), float(v_min)
 
 
 def get_active_texture() -> bpy.types.Image:
     active_image: bpy.types.Image = None
+    # There is no screen when blender runs in background mode.
+    if bpy.context.screen is None:
+        return None
     for area in bpy.context.screen.areas:
         if area.type == 'IMAGE_EDITOR':
             active_image = area.spaces.active.image
     return active_image
 
 
-def get_texture_size() -> (int, int):
+def get_material_texture() -> bpy.types.Image:
     """
-    Get the size of the texture at position <which> in pixels.
+    Find the texture of the model through the materials of its meshes.
+    This does not depend on the user interface and therefore also works
+    when blender runs in background mode.
+    
+    Returns:
+        The image of the first 'Image Texture' node found in the materials
+        of the mesh objects, None if there is none.
+    """
+
+    for obj in bpy.data.objects:
+        if obj.type != "MESH":
+            continue
+        for slot in obj.material_slots:
+            material: bpy.types.Material = slot.material
+            if material is None or not material.use_nodes:
+                continue
+            for node in material.node_tree.nodes:
+                if node.type == 'TEX_IMAGE' and node.image is not None and node.image.size[0] > 0:
+                    return node.image
+    return None
+
+
+def get_texture_size(texture_size: (int, int) = None) -> (int, int):
+    """
+    Get the size of the texture of the model in pixels.
+    The texture shown in the 'UV Editor' is preferred. If there is none
+    (e.g. in background mode) the texture is looked up in the materials.
+    
+    Args:
+        texture_size: Optional width and height overriding the lookup.
     
     Returns:
         Two integers representing the width and height of the texture
-        at position <which> or 0,0 if it does not exist.
+        or 0,0 if it does not exist.
+    
+    Raises:
+        ValueError: In background mode, if none of the materials has a
+                    texture. Any other image in the file could belong to
+                    something else, so the size has to be given instead.
     """
 
+    if texture_size is not None:
+        return int(texture_size[0]), int(texture_size[1])
     texture: bpy.types.Image = get_active_texture()
+    if texture is None:
+        texture = get_material_texture()
+    if texture is None and bpy.app.background:
+        names = [obj.name for obj in bpy.data.objects if obj.type == "MESH"]
+        raise ValueError("No 'Image Texture' found in the materials of "+", ".join(names[:5])
+                         + (" and "+str(len(names) - 5)+" more objects" if len(names) > 5 else "")
+                         + ", the texture size has to be given (--texture-size)")
     if texture is not None:
         return texture.size[0], texture.size[1]
     else:
@@ -188,20 +242,8 @@ def get_animation_frame_range(obj_list, animation_name):
         does not exist.
     """
 
-    out_maxframe = 0
-    for obj in obj_list:
-        if obj.type == "MESH":
-            if obj.animation_data == None:
-                print("Warning: Object has no animation data set!")
-                continue
-            if len(obj.animation_data.nla_tracks) == 0:
-                print("Warning: Object has no nla-track set!")
-                continue
-            for anim in obj.animation_data.nla_tracks:
-                if (anim.name == animation_name) and (anim.strips[0].action_frame_end > out_maxframe):
-                    out_maxframe = anim.strips[0].action_frame_end
-                    break
-    return out_maxframe
+    clip = animation.get_animation_index(obj_list).get(animation_name)
+    return clip.max_frame if clip is not None else 0
 
 
 #def getObjectMap(obj_list):
@@ -218,37 +260,24 @@ def get_animation_map(obj_list):
     """
     Construct a map, mapping the names of animations to an index and their
     max frame.
+    
+    Returns:
+        A dict mapping the animation names to animation.AnimationClips
+        (index, max frame, object names, strips per object).
     """
 
-    out_map = {}
-    cur_index = 0
-    for obj in obj_list:
-        if obj.type == "MESH":
-            if obj.animation_data == None:
-                print("Warning: Object has no animation data set!")
-                continue
-            if len(obj.animation_data.nla_tracks) == 0:
-                print("Warning: Object has no nla-track set!")
-                continue
-            for anim in obj.animation_data.nla_tracks:
-                temp_name = anim.name
-                if not (temp_name in out_map):
-                    temp_max_frame = get_animation_frame_range(obj_list, temp_name)
-                    out_map[temp_name] = (cur_index,temp_max_frame,[obj.name])
-                    cur_index += 1
-                else:
-                    out_map[temp_name][2].append(obj.name)
-    return out_map
+    return animation.get_animation_index(obj_list)
 
 
-def get_animation_data(obj, animation_name, max_frame):
+def get_animation_data(obj, animation_name, max_frame, channels=bake.TRANSFORM_CHANNELS):
     """
     Grab the animation data for translation, rotation and scale.
     Usage in blender:
         The general idea is to set the actions initially so blender does
         display the animation as you want it to be. After that, the
         'NLA Editor' is used to build tracks out of them with the name
-        of the animation. For starters only one strip per track is permitted.
+        of the animation. A track can consist of several strips, frames
+        between them hold the end of the previous strip.
         If checking an option 'Export animations' it
         will always be necessary to construct an animation called 'idle'!
         RenderModel object will only check for animation and frame in
@@ -275,222 +304,436 @@ def get_animation_data(obj, animation_name, max_frame):
         animation_name: The name of the animation to extract.
         max_frame: The maximum frame to be extracted. Can be found
                    by calling above function.
+        channels: The channels to extract as (data path, array index)
+                  tuples, any subset of bake.TRANSFORM_CHANNELS.
     
     Returns:
-        A list object whose index corresponds to the values
-        of locations, rotations and scales at an index that corresponds
-        to the frame or None if the object has no animation data.
-        A char sequence indicating what type of data are stored:
-            'l'-loc, 'lr'-locrot, 'lrs'-locrotscale or 'n' if none.
-        The nine lists correspond to:
-        0: locX
-        1: locY
-        2: locZ
-        3: rotX
-        4: rotY
-        5: rotZ
-        6: scaX
-        7: scaY
-        8: scaZ.
+        A dict mapping every animated channel to a float32 array whose
+        index corresponds to the frame or None if the object has no
+        animation data. The channels are:
+            ('location', 0..2): locX, locY, locZ
+            ('rotation_euler', 0..2): rotX, rotY, rotZ
+            ('scale', 0..2): scaX, scaY, scaZ
+        Channels that are not animated in the action are left out.
         
         Example:
-            anims[1][10] corresponds to the 10-th frame (last index
-            10) of the y-location (first index 1) of the model.
+            anims[('location', 1)][10] corresponds to the 10-th frame
+            of the y-location of the model.
     """
 
-    if (obj.animation_data == None) or (len(obj.animation_data.nla_tracks < 1)):
+    if (obj.animation_data == None) or (len(obj.animation_data.nla_tracks) < 1):
         print("Warning: No animation tracks found in object!")
         return None
-    anims = obj.animation_data.nla_tracks
-    out_animation = None
-    out_type = 'n'
-    for anim in anims:
+    for anim in obj.animation_data.nla_tracks:
         if(anim.name == animation_name):
-            action = anim.strips[0].action
-            if(len(action.fcurves) < 3):
+            defaults = get_rest_channels(obj)
+            out_animation = bake.bake_strips(animation.get_strip_refs(anim), range(int(max_frame)),
+                                             channels, defaults)
+            if len(out_animation) == 0:
                 print("Warning: No properties captured!")
                 return None
-            if len(action.fcurves) == 9:
-                # All properties captured.
-                out_animation = [[],[],[],[],[],[],[],[],[]]
-                out_type = 'lrs'
-                for frame in range(max_frame):
-                    out_animation[0].append(action.fcurves[0].evaluate(frame))
-                    out_animation[1].append(action.fcurves[1].evaluate(frame))
-                    out_animation[2].append(action.fcurves[2].evaluate(frame))
-                    out_animation[3].append(action.fcurves[3].evaluate(frame))
-                    out_animation[4].append(action.fcurves[4].evaluate(frame))
-                    out_animation[5].append(action.fcurves[5].evaluate(frame))
-                    out_animation[6].append(action.fcurves[6].evaluate(frame))
-                    out_animation[7].append(action.fcurves[7].evaluate(frame))
-                    out_animation[8].append(action.fcurves[8].evaluate(frame))
-            elif len(action.fcurves) == 6:
-                # Location and rotation.
-                out_animation = [[],[],[],[],[],[]]
-                out_type = 'lr'
-                for frame in range(max_frame):
-                    out_animation[0].append(action.fcurves[0].evaluate(frame))
-                    out_animation[1].append(action.fcurves[1].evaluate(frame))
-                    out_animation[2].append(action.fcurves[2].evaluate(frame))
-                    out_animation[3].append(action.fcurves[3].evaluate(frame))
-                    out_animation[4].append(action.fcurves[4].evaluate(frame))
-                    out_animation[5].append(action.fcurves[5].evaluate(frame))
-            elif len(action.fcurves) == 3:
-                # Location only.
-                out_animation = [[],[],[]]
-                out_type = 'l'
-                for frame in range(max_frame):
-                    out_animation[0].append(action.fcurves[0].evaluate(frame))
-                    out_animation[1].append(action.fcurves[1].evaluate(frame))
-                    out_animation[2].append(action.fcurves[2].evaluate(frame))
-            break
-    return out_animation, out_type
-
-
-class_file_template = """import net.minecraft.client.model.ModelBase;
-import net.minecraft.client.model.ModelRenderer;
-import net.minecraft.entity.Entity;
-import net.minecraft.entity.EntityLivingBase;
-import net.minecraftforge.fml.relauncher.Side;
-import net.minecraftforge.fml.relauncher.SideOnly;
-
-@SideOnly(Side.CLIENT)
-class Model{modelName} extends ModelBase {{
-
-    private float partialTicks;
-
-{boxDeclarations}
-
-    public Model{modelName}() {{
-        this.textureWidth = {texWidth};
-        this.textureHeight = {texHeight};
-
-{boxInstantiations}
-    }}
-
-    @Override
-    public void setLivingAnimations(EntityLivingBase entity, float limbSwing, float limbSwingAmount,
-            float partialTicks) {{
-        this.partialTicks = partialTicks;
-    }}
-
-    @Override
-    public void render(Entity entity, float limbSwing, float limbSwingAmount, float ageInTicks, float netHeadYaw, 
-            float headPitch, float scale) {{
-        this.setRotationAngles(limbSwing, limbSwingAmount, ageInTicks, netHeadYaw, headPitch, scale, entity);
-
-{boxRenderCalls}
-    }}
-
-    public void setRotationAngles(float limbSwing, float limbSwingAmount, float ageInTicks, float netHeadYaw,
-            float headPitch, float scale, Entity entity) {{
-    }}
-}}
-"""
-
-box_declaration_template = """    public ModelRenderer {boxName};"""
-
-box_instantiation_template = """        this.{boxName} = new ModelRenderer(this, {texOffsetX}, {texOffsetY});
-        this.{boxName}.addBox({offsetX}, {offsetY}, {offsetZ}, {width}, {height}, {depth}, {scaleFactor});
-        this.{boxName}.setRotationPoint({rotatePointX}, {rotatePointY}, {rotatePointZ});
-        this.{boxName}.rotateAngleX = {rotateAngleX};
-        this.{boxName}.rotateAngleY = {rotateAngleY};
-        this.{boxName}.rotateAngleZ = {rotateAngleZ};
-        this.{boxName}.mirror = true;
-"""
-
-box_render_template = """        this.{boxName}.render(scale);"""
-
-
-def write_objects(file):
+            return out_animation
+    return None
+
+
+def get_python_executable() -> str:
     """
-    Write the current mesh to a '.java' file which can be used
-    in Minecraft directly to render the model.
-    Minecraft uses a ModelRenderer object to hold the necessary
-    information to render a mesh consisting of cubes. At construction,
-    the texture offset is provided which is used to determine the
-    uv-coordinates of the mesh in-game.
-    An arbitrary amount of cubes can be added to the ModelRenderer
-    object, however, they are always rotated together as only
-    the ModelRenderer has a rotation point (position of the mesh).
-    Because of that, this function does construct one ModelRenderer
-    object for every cube mesh individually.
-    Minecraft cube objects have the following properties:
-    - Offset of the cube's minimum vertex from the rotation
-      point.
-    - Dimensions of the cube.
+    Path of the python interpreter for worker processes. Before 2.91
+    blender reports itself as sys.executable.
+    """
+
+    return getattr(bpy.app, "binary_path_python", None) or sys.executable
+
+
+def iter_bake_tracks(index: dict, objects: dict, workers: int = 0):
+    """
+    Bake the tracks of all animation clips step by step (see steps.py).
+    Actions which can be evaluated without blender are copied once and
+    their tracks are baked by worker processes (see parallel.py), the
+    others are baked in place.
     
     Args:
-        file: An open stream object.
-        animations: Boolean indicating if animations shall also be extracted.
+        index: The animation index (see animation.get_animation_index).
+        objects: Dict mapping object names to objects.
+        workers: Number of worker processes (0: one per CPU core).
+    
+    Returns:
+        A dict mapping (clip name, object name) to the baked channels in
+        the format of get_animation_data, None for tracks without animated
+        channels.
+    """
+
+    total = len({(name, obj_name) for name, clip in index.items() for obj_name in clip.objects})
+    actions = {}
+    jobs = []
+    job_keys = []
+    out_baked = {}
+    for name, clip in index.items():
+        for obj_name in clip.objects:
+            if (name, obj_name) in out_baked:
+                continue
+            obj = objects[obj_name]
+            # Like get_animation_data the first track of the clip is baked.
+            track = next(track for track in obj.animation_data.nla_tracks if track.name == name)
+            strips = animation.get_strip_refs(track)
+            defaults = get_rest_channels(obj)
+            portable_strips = []
+            for strip in strips:
+                key = strip.action.as_pointer()
+                if key not in actions:
+                    actions[key] = bake.read_action(strip.action)
+                if actions[key] is None:
+                    break
+                portable_strips.append(strip._replace(action=actions[key]))
+            if len(portable_strips) == len(strips):
+                out_baked[(name, obj_name)] = None
+                jobs.append(parallel.BakeJob(portable_strips, int(clip.max_frame), bake.TRANSFORM_CHANNELS,
+                                             defaults))
+                job_keys.append((name, obj_name))
+            else:
+                out_baked[(name, obj_name)] = bake.bake_strips(strips, range(int(clip.max_frame)),
+                                                               bake.TRANSFORM_CHANNELS, defaults)
+                yield (len(out_baked) - len(jobs)) / total
+    done = total - len(jobs)
+    for baked, key in zip(parallel.iter_jobs(jobs, workers, get_python_executable()), job_keys):
+        out_baked[key] = baked
+        done += 1
+        yield done / total
+    for key, baked in out_baked.items():
+        if not baked:
+            print("Warning: No properties captured!")
+            out_baked[key] = None
+    return out_baked
+
+
+def get_rest_channels(obj: bpy.types.Object) -> dict:
+    """
+    Get the current transform of an object as dict mapping the channels of
+    bake.TRANSFORM_CHANNELS to their values.
     """
 
-    tsu, tsv = get_texture_size()
+    out_channels = {("location", i): obj.location[i] for i in range(3)}
+    out_channels.update({("rotation_euler", i): obj.rotation_euler[i] for i in range(3)})
+    out_channels.update({("scale", i): obj.scale[i] for i in range(3)})
+    return out_channels
 
-    box_declarations: str = ""
-    box_instantiations: str = ""
-    box_render_calls: str = ""
-    for obj in bpy.data.objects:
-        if(obj.type == "MESH"):
-            lx, ly, lz = get_location(obj)
-            rx, ry, rz = get_rotation(obj)
-            sx, sy, sz = get_scale(obj)
-            dx, dy, dz = get_dimensions(obj)
-            vx_min, vy_min, vz_min = get_min_vertex(obj)
-            u_min, v_min = get_min_uv(obj)
-
-            tex_off_x = str(int(u_min * tsu + 0.5))
-            tex_off_y = str(int(v_min * tsv + 0.5))
-            offset_x = str.format("{0:.6f}", vx_min * sx) + 'f'
-            offset_y = str.format("{0:.6f}", -vz_min * sz) + 'f'
-            offset_z = str.format("{0:.6f}", ly) + 'f'
-            box_width = dx
-            box_height = dz
-            box_depth = dy
-            box_rotate_point_x = str.format("{0:.6f}", lx) + 'f'
-            box_rotate_point_y = str.format("{0:.6f}", 24.-lz) + 'f'
-            box_rotate_point_z = str.format("{0:.6f}", ly) + 'f'
-            box_rotate_angle_x = str.format("{0:.6f}", rx) + 'f'
-            box_rotate_angle_y = str.format("{0:.6f}", -rz) + 'f'
-            box_rotate_angle_z = str.format("{0:.6f}", ry) + 'f'
-
-            box_declarations += box_declaration_template.format(boxName=obj.name) + "\n"
-            box_instantiations += box_instantiation_template.format(boxName=obj.name,
-                                                                    texOffsetX=tex_off_x, texOffsetY=tex_off_y,
-                                                                    offsetX=offset_x, offsetY=offset_y,
-                                                                    offsetZ=offset_z, width=box_width,
-                                                                    height=box_height, depth=box_depth,
-                                                                    scaleFactor='0f',
-                                                                    rotatePointX=box_rotate_point_x,
-                                                                    rotatePointY=box_rotate_point_y,
-                                                                    rotatePointZ=box_rotate_point_z,
-                                                                    rotateAngleX=box_rotate_angle_x,
-                                                                    rotateAngleY=box_rotate_angle_y,
-                                                                    rotateAngleZ=box_rotate_angle_z) + "\n"
-            box_render_calls += box_render_template.format(boxName=obj.name) + "\n"
-
-    model_class: str = class_file_template.format(modelName="ModelName",
-                                                  texWidth=str(tsu),
-                                                  texHeight=str(tsv),
-                                                  boxDeclarations=box_declarations,
-                                                  boxInstantiations=box_instantiations,
-                                                  boxRenderCalls=box_render_calls)
-
-    file.write(model_class)
-
-
-def write_animrenderclass(stream, animation_name, animation_data):
-    """
-    Write the animation to a stream.
-    """
-
-    stream.write(
-        '    class '+str(animation_name)+'AnimationRenderer implements IAnimationRenderer {\n'\
-        +'        '\
-        +'    }')
-
-
-def write_objects_anim(file):
+
+def get_exported_parent(obj: bpy.types.Object):
+    """
+    Get the parent of an object if it is exported as well (i.e. it is a
+    mesh), else None.
+    """
+
+    parent = obj.parent
+    return parent if parent is not None and parent.type == "MESH" else None
+
+
+@profiling.timed("scene scan")
+def get_mesh_objects() -> list:
+    """
+    List the mesh objects of the scene, each of them is exported as a box.
+    Parents are listed before their children, otherwise the order of
+    bpy.data.objects is kept.
+    """
+
+    mesh_objects = [obj for obj in bpy.data.objects if obj.type == "MESH"]
+    children = {}
+    roots = []
+    for obj in mesh_objects:
+        parent = get_exported_parent(obj)
+        if parent is None:
+            roots.append(obj)
+        else:
+            children.setdefault(parent.name, []).append(obj)
+    out_objects = []
+    stack = list(reversed(roots))
+    while stack:
+        obj = stack.pop()
+        out_objects.append(obj)
+        stack.extend(reversed(children.get(obj.name, [])))
+    return out_objects
+
+
+def get_parent_offset(obj: bpy.types.Object) -> np.ndarray:
+    """
+    Get the matrix mapping the location and rotation of a parented object
+    into the space it is exported in: the space of its parent's rotation
+    point if the parent is exported as well (Minecraft only passes the
+    location and rotation on to children, so the parent's scale is left
+    out), otherwise the world space.
+    
+    Args:
+        obj: (bpy_types.Object) Blender object with a parent.
+    
+    Returns:
+        A 4x4 numpy array.
+    """
+
+    parent_matrix = np.array(obj.parent.matrix_world)
+    offset = parent_matrix @ np.array(obj.matrix_parent_inverse)
+    if get_exported_parent(obj) is not None:
+        parent_matrix[:3, :3] /= np.linalg.norm(parent_matrix[:3, :3], axis=0)
+        offset = np.linalg.inv(parent_matrix) @ offset
+    return offset
+
+
+def get_local_transform(obj: bpy.types.Object) -> ((float, float, float), (float, float, float)):
+    """
+    Get the location and rotation of an object relative to its exported
+    parent (or the world if it has none).
+    
+    Args:
+        obj: (bpy_types.Object) Blender object.
+    
+    Returns:
+        The location and the rotation around x, y and z axes.
+    """
+
+    if obj.parent is None:
+        return get_location(obj), get_rotation(obj)
+    offset = get_parent_offset(obj)
+    if np.allclose(offset, np.eye(4)):
+        return get_location(obj), get_rotation(obj)
+    rest = {channel: np.array([value]) for channel, value in get_rest_channels(obj).items()}
+    moved = bake.transform_channels(rest, offset, rest)
+    return (tuple(float(moved[channel][0]) for channel in bake.LOCATION_CHANNELS),
+            tuple(float(moved[channel][0]) for channel in bake.ROTATION_CHANNELS))
+
+
+def get_pivot_and_angles(obj: bpy.types.Object) -> ((float, float, float), (float, float, float)):
+    """
+    Get the rotation point and angles of an object in Minecraft space.
+    Blender's z axis points up while Minecraft's y axis points down, the
+    rotation point of root parts is shifted by 24 so the model stands on
+    the ground. The rotation points of children are relative to their
+    parent.
+    
+    Args:
+        obj: (bpy_types.Object) Blender object.
+    
+    Returns:
+        The rotation point and the rotation angles.
+    """
+
+    (lx, ly, lz), (rx, ry, rz) = get_local_transform(obj)
+    ground = 24. if get_exported_parent(obj) is None else 0.
+    return (lx, ground-lz, ly), (rx, -rz, ry)
+
+
+def get_part(obj: bpy.types.Object, min_vertex, min_uv, tsu: int, tsv: int) -> model.Part:
+    """
+    Convert a mesh object into a part of the model representation.
+    
+    Args:
+        obj: (bpy_types.Object) Blender mesh-object.
+        min_vertex: The minimum vertex of the mesh (see get_min_vertex).
+        min_uv: The minimum uv coordinates of the mesh (see get_min_uv).
+        tsu: Texture width in pixels.
+        tsv: Texture height in pixels.
+    
+    Returns:
+        A model.Part holding a single box.
+    """
+
+    sx, sy, sz = get_scale(obj)
+    dx, dy, dz = get_dimensions(obj)
+    vx_min, vy_min, vz_min = min_vertex
+    u_min, v_min = min_uv
+
+    box = model.Box(int(u_min * tsu + 0.5), int(v_min * tsv + 0.5),
+                    vx_min * sx, -vz_min * sz, vy_min * sy,
+                    dx, dz, dy)
+    pivot, angles = get_pivot_and_angles(obj)
+    return model.Part(obj.name, pivot, angles, [box])
+
+
+def get_model(model_name="ModelName", texture_size=None, merge_boxes=False, clips=None) -> model.Model:
+    """
+    Convert the mesh objects of the scene into the model representation.
+    
+    Args:
+        model_name: Name of the generated class (without the 'Model' prefix).
+        texture_size: Optional texture width and height in pixels.
+        merge_boxes: Boolean specifying if parts sharing their rotation point,
+                     rotation and animation are merged (see
+                     merge.merge_parts).
+        clips: Optional list of model.Clips of the model (see get_clips).
+    
+    Returns:
+        A model.Model with one part per mesh object or group of merged
+        objects. Parts of parented objects are children of their parent's
+        part.
+    """
+
+    tsu, tsv = get_texture_size(texture_size)
+    mesh_objects = get_mesh_objects()
+    profiling.count("objects", len(mesh_objects))
+    # Extract the vertex and uv data of all meshes in one go.
+    mesh_data = geometry.MeshData()
+    rows = mesh_data.add([obj.data for obj in mesh_objects])
+    parts = {}
+    roots = []
+    for obj, row in zip(mesh_objects, rows):
+        parts[obj.name] = part = get_part(obj, mesh_data.min_vertices[row], mesh_data.min_uvs[row], tsu, tsv)
+        parent = get_exported_parent(obj)
+        if parent is None:
+            roots.append(part)
+        else:
+            parts[parent.name].children.append(part)
+    if merge_boxes:
+        roots = merge.merge_parts(roots, clips)
+        for part in parts.values():
+            part.children[:] = merge.merge_parts(part.children, clips)
+    out_model = model.Model(model_name, tsu, tsv, roots, clips)
+    if merge_boxes:
+        part_count = sum(1 for _ in out_model.iter_parts())
+        print("Merged "+str(len(mesh_objects))+" boxes into "+str(part_count)+" ModelRenderers ("
+              + str(len(mesh_objects) - part_count)+" eliminated)")
+    return out_model
+
+
+# Conversion of the baked blender channels into Minecraft channels:
+# blender channel -> (Minecraft channel, factor, offset).
+CHANNEL_MAP = {("location", 0): ("pivot_x", 1., 0.),
+               ("location", 1): ("pivot_z", 1., 0.),
+               ("location", 2): ("pivot_y", -1., 24.),
+               ("rotation_euler", 0): ("angle_x", 1., 0.),
+               ("rotation_euler", 1): ("angle_z", 1., 0.),
+               ("rotation_euler", 2): ("angle_y", -1., 0.),
+               ("scale", 0): ("scale_x", 1., 0.),
+               ("scale", 1): ("scale_z", 1., 0.),
+               ("scale", 2): ("scale_y", 1., 0.)}
+
+# Channels whose values stay within this distance from the rest pose are
+# not exported, the generated class falls back to the rest pose.
+REST_TOLERANCE = 1e-5
+
+
+def get_clips(obj_list, workers: int = 0) -> list:
+    """
+    Bake all animation clips of the scene into the model representation.
+    
+    Args:
+        obj_list: List of all objects in the scene.
+                  (Generally: bpy.data.objects)
+        workers: Number of processes baking the tracks (0: one per CPU
+                 core, see iter_bake_tracks).
+    
+    Returns:
+        List of model.Clips ordered by their index, holding one track per
+        animated object with its channels in Minecraft space (relative to
+        the parent for parented objects). Channels which do not move away
+        from the rest pose are left out.
+    """
+
+    return steps.run(iter_clips(obj_list, workers))
+
+
+def iter_clips(obj_list, workers: int = 0):
+    """
+    Step-wise version of get_clips (see steps.py).
+    """
+
+    objects = {obj.name: obj for obj in obj_list}
+    index = animation.get_animation_index(obj_list)
+    baked_tracks = yield from steps.scale(iter_bake_tracks(index, objects, workers), 0., 0.9)
+    out_clips = []
+    for name, clip in index.items():
+        tracks = []
+        for obj_name in clip.objects:
+            obj = objects[obj_name]
+            baked = baked_tracks[(name, obj_name)]
+            if baked is None:
+                continue
+            if obj.parent is not None and baked:
+                offset = get_parent_offset(obj)
+                if not np.allclose(offset, np.eye(4)):
+                    baked = bake.transform_channels(baked, offset, get_rest_channels(obj))
+            is_root = get_exported_parent(obj) is None
+            pivot, angles = get_pivot_and_angles(obj)
+            rest = dict(zip(model.PIVOT_CHANNELS + model.ANGLE_CHANNELS, pivot + angles))
+            track = model.Track(obj_name)
+            for channel, values in baked.items():
+                target, factor, offset = CHANNEL_MAP[channel]
+                if not is_root:
+                    # Only the rotation points of root parts are shifted onto the ground.
+                    offset = 0.
+                converted = (values * np.float32(factor) + np.float32(offset)).astype(np.float32)
+                if target in rest and np.abs(converted - rest[target]).max() <= REST_TOLERANCE:
+                    continue
+                track.set_channel(target, array("f", converted.tobytes()))
+            if track.channels:
+                tracks.append(track)
+        out_clips.append(model.Clip(name, clip.index, clip.max_frame, tracks))
+        profiling.count("frames", clip.max_frame)
+        yield 0.9 + 0.1 * len(out_clips) / len(index)
+    return out_clips
+
+
+def get_object_hash(obj: bpy.types.Object, tsu: int, tsv: int, mesh_data=None) -> str:
+    """
+    Hash everything the export of a mesh object depends on: its transform
+    (relative to its parent), the mesh (name, vertices and uv coordinates)
+    and the texture size.
+    
+    Args:
+        obj: (bpy_types.Object) Blender mesh-object.
+        tsu: Texture width in pixels.
+        tsv: Texture height in pixels.
+        mesh_data: Optional geometry.MeshData the digest of the mesh is
+                   taken from (hashed once for all objects sharing it).
+    
+    Returns:
+        The hash as hex string.
+    """
+
+    if mesh_data is None:
+        mesh_data = geometry.MeshData()
+    digest = hashlib.blake2b(digest_size=16)
+    pivot, angles = get_pivot_and_angles(obj)
+    digest.update(struct.pack("<12d2i", *pivot, *angles, *get_scale(obj), *obj.dimensions, tsu, tsv))
+    parent = get_exported_parent(obj)
+    digest.update(parent.name.encode() + b"\0" if parent is not None else b"no parent\0")
+    digest.update(obj.name.encode() + b"\0")
+    digest.update(mesh_data.get_digest(obj.data))
+    return digest.hexdigest()
+
+
+def get_object_groups(mesh_objects: list, clips=None, merge_boxes: bool = False) -> list:
+    """
+    Group the mesh objects into the ModelRenderers of the generated class.
+    
+    Args:
+        mesh_objects: List of mesh objects (see get_mesh_objects).
+        clips: Optional list of model.Clips animating the objects.
+        merge_boxes: Boolean specifying if objects sharing their rotation
+                     point, rotation and animation are merged into a single
+                     ModelRenderer (see merge.py). Otherwise every object
+                     gets its own one.
+    
+    Returns:
+        A list of lists of objects, the first object of a group names the
+        ModelRenderer.
+    """
+
+    if not merge_boxes:
+        return [[obj] for obj in mesh_objects]
+    signatures = merge.get_animation_signatures(clips) if clips else {}
+    parent_names = {get_exported_parent(obj).name for obj in mesh_objects if get_exported_parent(obj) is not None}
+    keys = []
+    for obj in mesh_objects:
+        if obj.name in parent_names:
+            # Parents are never merged, their children refer to them by name.
+            keys.append(("parent", obj.name))
+        else:
+            parent = get_exported_parent(obj)
+            keys.append(merge.get_group_key(*get_pivot_and_angles(obj), signatures.get(obj.name))
+                        + (parent.name if parent is not None else None,))
+    return merge.group_items(mesh_objects, keys)
+
+
+def write_objects(file, model_name="ModelName", texture_size=None, export_cache=None, clips=None,
+                  animation_resource=None, merge_boxes=False, changed=None, split_static=False):
     """
     Write the current mesh to a '.java' file which can be used
     in Minecraft directly to render the model.
@@ -502,92 +745,124 @@ def write_objects_anim(file):
     object, however, they are always rotated together as only
     the ModelRenderer has a rotation point (position of the mesh).
     Because of that, this function does construct one ModelRenderer
-    object for every cube mesh individually.
+    object for every cube mesh individually, unless merge_boxes is set:
+    then cubes with the same rotation point, rotation and animation share
+    a single ModelRenderer.
     Minecraft cube objects have the following properties:
     - Offset of the cube's minimum vertex from the rotation
       point.
     - Dimensions of the cube.
+    The class is streamed into the file section by section, only the
+    fragments of the boxes are kept in memory.
+    If a cache is given, objects that did not change since the last
+    export reuse their cached fragments.
     
     Args:
         file: An open stream object.
-        animations: Boolean indicating if animations shall also be extracted.
-    """
-
-    tsu, tsv = get_texture_size(0)
-    animap = get_animation_map(bpy.data.objects)
-    print(animap)
-
-    # Package imports plus class boilerplate.
-    file.write(
-        'package net.x.package;\n\n'\
-        +'import net.minecraft.client.model.ModelBase;\n'\
-        +'import net.minecraft.client.model.ModelRenderer;\n'\
-        +'import net.minecraft.entity.Entity;\n'\
-        +'import net.minecraftforge.fml.relauncher.Side;\n'\
-        +'import net.minecraftforge.fml.relauncher.SideOnly;\n\n'\
-        +'@SideOnly(Side.CLIENT)\n'\
-        +'class ModelName extends ModelBase\n'\
-        +'{\n')
-    # Animation interface used to render animation frames.
-    file.write(
-        '    private interface IAnimationRenderer {\n'\
-        +'        public void render(Entity entity, float p_78088_2_, float p_78088_3_, float p_78088_4_, float p_78088_5_, float p_78088_6_, float p_78088_7_);\n'\
-        +'    }\n'\
-        +'    \n')
-    # Partial ticks need to be saved for later use.
-    file.write('    private float partialTicks;\n')
-
-    for obj in bpy.data.objects:
-        if(obj.type == "MESH"):
-            file.write('    public ModelRenderer '+obj.name+';\n')
+        model_name: Name of the generated class (without the 'Model' prefix).
+        texture_size: Optional texture width and height in pixels.
+        export_cache: Optional cache.ExportCache holding the fragments of
+                      the last export.
+        clips: Optional list of model.Clips to play back (see get_clips).
+        animation_resource: Name of the binary animation resource read by
+                            the class. If None, the clips are inlined.
+        merge_boxes: Boolean specifying if cubes are merged into shared
+                     ModelRenderers (see get_object_groups).
+        changed: Optional set of the names of the objects which changed
+                 since export_cache was last filled with the same texture
+                 size. The other objects take their fragments from the
+                 cache without being hashed. Ignored if merge_boxes is set,
+                 as the groups may have changed as well.
+        split_static: Boolean specifying if the root ModelRenderers that no
+                      clip moves are rendered from a single display list
+                      (see merge.get_static_roots).
+    
+    Returns:
+        The number of characters written.
+    """
 
-    file.write('\n'\
-            +'    public ModelName()\n'\
-            +'    {\n'\
-            +'        this.textureWidth = '+str(tsu)+';\n'\
-            +'        this.textureHeight = '+str(tsv)+';\n')
+    return steps.run(iter_write_objects(file, model_name, texture_size, export_cache, clips, animation_resource,
+                                        merge_boxes, changed, split_static))
 
-    for obj in bpy.data.objects:
-        if(obj.type == "MESH"):
-            lx, ly, lz = get_location(obj)
-            rx, ry, rz, rmode = get_rotation(obj)
-            sx, sy, sz = get_scale(obj)
-            dx, dy, dz = get_dimensions(obj)
-            vx_min, vy_min, vz_min = get_min_vertex(obj)
-            u_min, v_min = get_min_uv(obj)
-
-            file.write(
-                    '        this.'+obj.name+' = new ModelRenderer(this,'+str(int(u_min*tsu+0.5))+','+str(int(v_min*tsv+0.5))+');\n'\
-                    +'        this.'+obj.name+'.addBox('+str.format("{0:.6f}",vx_min*sx)+'f,'+str.format("{0:.6f}",-vz_min*sz)+'f,'+str.format("{0:.6f}",vy_min*sy)+'f,'+str(dx)+','+str(dz)+','+str(dy)+',0f);\n'\
-                    +'        this.'+obj.name+'.setRotationPoint('+str.format("{0:.6f}",lx)+'f,'+str.format("{0:.6f}",24.-lz)+'f,'+str.format("{0:.6f}",ly)+'f);\n'\
-                    +'        this.'+obj.name+'.rotateAngleX = '+str.format("{0:.6f}",rx)+'f;\n'\
-                    +'        this.'+obj.name+'.rotateAngleY = '+str.format("{0:.6f}",-rz)+'f;\n'\
-                    +'        this.'+obj.name+'.rotateAngleZ = '+str.format("{0:.6f}",ry)+'f;\n'\
-#                    +'        this.'+obj.name+'.setTextureSize('+str(tsu)+','+str(tsv)+');\n'\
-                    +'        this.'+obj.name+'.mirror = true;\n')
-
-    file.write(
-            '    }\n\n'\
-            +'    public void setLivingAnimations(EntityLivingBase entity, float p_78086_2_, float p_78086_3_, float p_78086_4_)\n'\
-            +'    {\n'\
-            +'        this.partialTicks = p_78086_4_;\n'\
-            +'    }\n'\
-            +'    \n'\
-            +'    public void render(Entity entity, float p_78088_2_, float p_78088_3_, float p_78088_4_, float p_78088_5_, float p_78088_6_, float p_78088_7_)\n'\
-            +'    {\n'\
-            +'        this.setRotationAngles(p_78088_2_, p_78088_3_, p_78088_4_, p_78088_5_, p_78088_6_, p_78088_7_, entity);\n')
-    for obj in bpy.data.objects:
-        if(obj.type == "MESH"):
-            file.write('        this.'+obj.name+'.render(p_78088_7_);\n')
-    file.write(
-            '    }\n\n'\
-            +'    public void setRotationAngles(float p_78087_1_, float p_78087_2_, float p_78087_3_, float p_78087_4_, float p_78087_5_, float p_78087_6_, Entity p_78087_7_)\n'\
-            +'    {\n'\
-            +'    }\n'\
-            +'}\n')
 
+def iter_write_objects(file, model_name="ModelName", texture_size=None, export_cache=None, clips=None,
+                       animation_resource=None, merge_boxes=False, changed=None, split_static=False):
+    """
+    Step-wise version of write_objects (see steps.py).
+    """
 
-def write_data(context, filepath, export_anim):
+    tsu, tsv = get_texture_size(texture_size)
+
+    mesh_objects = get_mesh_objects()
+    profiling.count("objects", len(mesh_objects))
+    groups = get_object_groups(mesh_objects, clips, merge_boxes)
+    if merge_boxes:
+        print("Merged "+str(len(mesh_objects))+" boxes into "+str(len(groups))+" ModelRenderers ("
+              + str(len(mesh_objects) - len(groups))+" eliminated)")
+    # Mesh data is computed once per mesh, linked duplicates only add their transform.
+    mesh_data = geometry.MeshData()
+    fragments = [None] * len(groups)
+    keys = [None] * len(groups)
+    # Share of the progress taken by hashing the objects.
+    hashing = 0.5 if export_cache is not None else 0.
+    if export_cache is not None:
+        if merge_boxes:
+            changed = None
+        for i, group in enumerate(groups):
+            if changed is not None and group[0].name not in changed:
+                fragments[i] = export_cache.peek(group[0].name)
+                if fragments[i] is not None:
+                    continue
+            keys[i] = get_object_hash(group[0], tsu, tsv, mesh_data)
+            if len(group) > 1:
+                # A merged ModelRenderer changes whenever one of its objects does.
+                keys[i] += "".join("+" + get_object_hash(obj, tsu, tsv, mesh_data) for obj in group[1:])
+            fragments[i] = export_cache.get(group[0].name, keys[i])
+            yield hashing * (i + 1) / len(groups)
+    dirty = [i for i, fragment in enumerate(fragments) if fragment is None]
+
+    # Extract the vertex and uv data of all (changed) meshes in one go.
+    dirty_objects = [obj for i in dirty for obj in groups[i]]
+    rows = iter(mesh_data.add([obj.data for obj in dirty_objects]))
+    for n, i in enumerate(dirty, 1):
+        parts = []
+        for obj in groups[i]:
+            row = next(rows)
+            parts.append(get_part(obj, mesh_data.min_vertices[row], mesh_data.min_uvs[row], tsu, tsv))
+        part = parts[0]
+        for other in parts[1:]:
+            part.boxes.extend(other.boxes)
+        parent = get_exported_parent(groups[i][0])
+        fragments[i] = codegen.render_part_fragments(part, parent.name if parent is not None else None)
+        if export_cache is not None:
+            export_cache.put(groups[i][0].name, keys[i], fragments[i])
+        yield hashing + (1. - hashing) * n / len(dirty)
+    if mesh_data.lookups:
+        print(mesh_data.get_report())
+
+    sections = codegen.EMPTY_SECTIONS
+    if split_static:
+        parents = {obj.name: get_exported_parent(obj).name if get_exported_parent(obj) is not None else None
+                   for obj in mesh_objects}
+        static_roots = merge.get_static_roots(parents, clips)
+        static_groups = [i for i, group in enumerate(groups) if group[0].name in static_roots]
+        for i in static_groups:
+            # Static parts are rendered by renderStaticParts instead.
+            fragments[i] = tuple(fragments[i][:2]) + ("",)
+        if static_groups:
+            sections = codegen.get_static_sections([groups[i][0].name for i in static_groups])
+        print(str(len(static_groups))+" of "+str(len(groups))+" ModelRenderers are static")
+    if clips is not None:
+        sections = codegen.merge_sections(sections, codegen.get_animation_sections(
+            model_name, [group[0].name for group in groups], clips, animation_resource))
+    return writer.write_sections(file, codegen.iter_model_class(model_name, tsu, tsv, fragments, sections))
+
+
+def write_data(context, filepath, export_anim, model_name="ModelName", texture_size=None, use_cache=False,
+               animation_format="INLINE", keyframe_tolerances=(reduce.PIVOT_TOLERANCE, reduce.ANGLE_TOLERANCE),
+               merge_boxes=False, profile=None, bake_workers=0, export_cache=None, changed=None,
+               output_formats=formats.DEFAULT_FORMATS, construction="CODE", split_static=False,
+               cull_faces=False, lod_distances=()):
     """
     Write the current mesh to file.
     
@@ -595,16 +870,186 @@ def write_data(context, filepath, export_anim):
         context: The current blender context.
         filepath: String containing the path to the out-file.
         export_anim: Boolean specifying if animations are to be exported.
+        model_name: Name of the generated class (without the 'Model' prefix).
+        texture_size: Optional texture width and height in pixels. Looked up
+                      in the scene if not given.
+        use_cache: Boolean specifying if unchanged objects are taken from the
+                   cache file of the last export.
+        animation_format: How animations are stored: 'INLINE' as java
+                          literals, 'FLOAT32' or 'INT16' in a binary
+                          resource next to the out-file, which has to be
+                          put into the resources in the package of the
+                          class.
+        keyframe_tolerances: Tuple of the maximum error of the rotation
+                             points (pixels) and angles (radians) allowed
+                             when dropping baked frames (see reduce.py), or
+                             None to keep every frame.
+        merge_boxes: Boolean specifying if cubes sharing their rotation
+                     point, rotation and animation are merged into a single
+                     ModelRenderer.
+        profile: Optional profiling.Profile recording the phases of the
+                 export. It is also written as json file next to the
+                 out-file ('<name>.profile.json').
+        bake_workers: Number of processes baking the animations (0: one
+                      per CPU core).
+        export_cache: Optional cache.ExportCache kept by the caller, used
+                      instead of the cache file (use_cache is ignored).
+        changed: Optional set of the names of the objects which changed
+                 since export_cache was last filled (see write_objects).
+        output_formats: Keys of the written formats in formats.BACKENDS.
+                        The files of other formats than 'JAVA' are put next
+                        to the out-file. With other formats the scene is
+                        converted into a model.Model once and all files are
+                        written from it at the same time, the export cache
+                        is not used then.
+        construction: How the java class builds its ModelRenderers: 'CODE'
+                      with statements for every box, 'TABLE' in a loop
+                      from a binary resource next to the out-file (see
+                      partdata.py), which has to be put into the resources
+                      in the package of the class like the animation
+                      resource. The export cache is not used for 'TABLE'.
+        split_static: Boolean specifying if the parts no animation moves
+                      are rendered from a single display list (see
+                      merge.get_static_roots).
+        cull_faces: Boolean specifying if the faces of boxes covered by
+                    other boxes are left out of the java class (see
+                    occlusion.py). The export cache is not used then.
+        lod_distances: Ascending distances in blocks from which the java
+                       class hides more and more of the small parts (see
+                       lod.py). Empty for a single level of detail. The
+                       export cache is not used with levels of detail.
     """
 
-    if(bpy.context.active_object.mode != "OBJECT"):
-        bpy.ops.object.mode_set(mode='OBJECT')
-    out = open(filepath, "w")
-    if export_anim:
-        write_objects_anim(out)
-    else:
-        write_objects(out)
-    out.close()
+    return steps.run(iter_write_data(context, filepath, export_anim, model_name, texture_size, use_cache,
+                                     animation_format, keyframe_tolerances, merge_boxes, profile, bake_workers,
+                                     export_cache, changed, output_formats, construction, split_static,
+                                     cull_faces, lod_distances))
+
+
+def iter_write_data(context, filepath, export_anim, model_name="ModelName", texture_size=None, use_cache=False,
+                    animation_format="INLINE", keyframe_tolerances=(reduce.PIVOT_TOLERANCE, reduce.ANGLE_TOLERANCE),
+                    merge_boxes=False, profile=None, bake_workers=0, export_cache=None, changed=None,
+                    output_formats=formats.DEFAULT_FORMATS, construction="CODE", split_static=False,
+                    cull_faces=False, lod_distances=()):
+    """
+    Step-wise version of write_data (see steps.py), used by the modal
+    export. The files are only replaced when the generator finishes, if it
+    is closed before, the files of the last export are left untouched.
+    """
+
+    with profiling.activate(profile):
+        yield from _iter_write_data(context, filepath, export_anim, model_name, texture_size, use_cache,
+                                    animation_format, keyframe_tolerances, merge_boxes, bake_workers, export_cache,
+                                    changed, output_formats, construction, split_static, cull_faces,
+                                    lod_distances)
+    if profile is not None:
+        print(profile.get_summary())
+        with writer.atomic_open(os.path.splitext(filepath)[0] + ".profile.json") as out:
+            json.dump(profile.to_dict(), out, indent=1)
+            out.write("\n")
 
     return {'FINISHED'}
 
+
+def _iter_write_data(context, filepath, export_anim, model_name, texture_size, use_cache, animation_format,
+                     keyframe_tolerances, merge_boxes, bake_workers, export_cache, changed, output_formats,
+                     construction, split_static, cull_faces, lod_distances):
+    """
+    The export itself, see iter_write_data.
+    """
+
+    active_object = context.active_object
+    if(active_object is not None and active_object.mode != "OBJECT"):
+        bpy.ops.object.mode_set(mode='OBJECT')
+    # Only a java class with statements for every box is rendered from cached fragments. Culling
+    # and levels of detail look at all boxes at once, so they need the whole model.
+    java_only = set(output_formats) == {"JAVA"} and construction == "CODE" and not cull_faces and not lod_distances
+    if not java_only:
+        export_cache = None
+    cache_file = export_cache is None and use_cache and java_only
+    if cache_file:
+        export_cache = cache.ExportCache.load(cache.get_cache_path(bpy.data.filepath, filepath),
+                                              codegen.get_template_salt())
+    # Share of the progress taken by the animations.
+    baking = 0.5 if export_anim else 0.
+    clips = None
+    if export_anim:
+        with profiling.phase("animation bake"):
+            clips = yield from steps.scale(iter_clips(bpy.data.objects, bake_workers), 0., baking * 0.9)
+    if clips and keyframe_tolerances is not None:
+        with profiling.phase("keyframe reduction"):
+            reduced = reduce.reduce_clips(clips, *keyframe_tolerances)
+        for name, before, after in reduced:
+            ratio = before / after if after else 1.
+            print("Animation '"+name+"': "+str(before)+" -> "+str(after)+" samples ("+format(ratio, ".1f")+"x)")
+        yield baking
+    animation_resource = None
+    resource_path = None
+    if export_anim and animation_format != "INLINE" and "JAVA" in output_formats:
+        animation_resource = "Model" + model_name + ".mcanim"
+        resource_path = os.path.join(os.path.dirname(os.path.abspath(filepath)), animation_resource)
+    parts_resource = None
+    parts_path = None
+    if construction == "TABLE" and "JAVA" in output_formats:
+        parts_resource = "Model" + model_name + ".mcmodel"
+        parts_path = os.path.join(os.path.dirname(os.path.abspath(filepath)), parts_resource)
+    encoding = animdata.ENCODING_INT16 if animation_format == "INT16" else animdata.ENCODING_FLOAT32
+    paths = [filepath]
+    # The files are only replaced once the export has finished successfully. The exit stack
+    # replaces the resource right before the class, so the class never refers to a missing or
+    # outdated resource.
+    # Writing the files is booked by writer.atomic_open and writer.write_sections.
+    with contextlib.ExitStack() as files:
+        if not java_only:
+            # All formats are written from the same model, the scene is only read once.
+            with profiling.phase("scene scan"):
+                export_model = get_model(model_name, texture_size, merge_boxes, clips)
+            static_roots = set()
+            if split_static:
+                static_roots = merge.get_static_roots(export_model.get_parent_names(), clips)
+                print(str(len(static_roots))+" of "+str(len(export_model.get_parent_names()))
+                      + " ModelRenderers are static")
+            hidden_levels = None
+            if lod_distances:
+                hidden_levels = lod.get_hidden_levels(export_model, lod_distances, static_roots)
+                print(lod.get_report(hidden_levels, lod_distances))
+            if cull_faces:
+                # Parts hidden at some level of detail must not hide the faces of parts still shown.
+                with profiling.phase("face culling"):
+                    print(occlusion.get_report(*occlusion.cull_hidden_faces(export_model, clips, hidden_levels)))
+            yield baking + (1. - baking) * 0.5
+            with profiling.phase("code generation"):
+                paths = list(formats.write_formats(files, export_model, filepath, output_formats,
+                                                   animation_resource=animation_resource,
+                                                   parts_resource=parts_resource,
+                                                   static_roots=static_roots,
+                                                   lod_distances=lod_distances).values())
+                # The resources are built in memory, their buffered writes are flushed by atomic_open.
+                if parts_path is not None:
+                    partdata.write_part_data(files.enter_context(writer.atomic_open(parts_path, "wb")),
+                                             export_model, static_roots, lod_distances)
+                    paths.append(parts_path)
+                if resource_path is not None:
+                    animdata.write_animation_data(files.enter_context(writer.atomic_open(resource_path, "wb")),
+                                                  [part.name for part in export_model.iter_parts()], clips,
+                                                  encoding)
+        else:
+            out = files.enter_context(writer.atomic_open(filepath))
+            if resource_path is not None:
+                part_names = [group[0].name for group in get_object_groups(get_mesh_objects(), clips, merge_boxes)]
+                with profiling.phase("code generation"):
+                    animdata.write_animation_data(files.enter_context(writer.atomic_open(resource_path, "wb")),
+                                                  part_names, clips, encoding)
+                yield baking
+            with profiling.phase("code generation"):
+                yield from steps.scale(iter_write_objects(out, model_name, texture_size, export_cache, clips,
+                                                          animation_resource, merge_boxes, changed, split_static),
+                                       baking, 1.)
+    if resource_path is not None:
+        paths.append(resource_path)
+    for path in paths:
+        profiling.count("bytes written", os.path.getsize(path))
+    if cache_file:
+        export_cache.save()
+    if export_cache is not None:
+        print("Export cache: "+str(export_cache.hits)+" hits, "+str(export_cache.misses)+" misses")
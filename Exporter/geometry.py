@@ -0,0 +1,227 @@
+"""
+Bulk extraction of mesh data.
+
+Vertex coordinates and uv coordinates are copied into flat numpy buffers
+with 'foreach_get' instead of iterating over the blender collections in
+python. The data of several meshes is concatenated into a single array so
+the minima and maxima of all objects are found in one reduction.
+"""
+
+import hashlib
+
+import numpy as np
+
+from MCExport.Exporter import profiling
+
+
+@profiling.timed("geometry extraction")
+def get_vertex_coordinates(mesh) -> np.ndarray:
+    """
+    Copy the vertex coordinates of a mesh into a numpy array.
+    
+    Args:
+        mesh: (bpy.types.Mesh) Blender mesh.
+    
+    Returns:
+        Array of shape (number of vertices, 3).
+    """
+
+    coordinates = np.empty(len(mesh.vertices)*3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", coordinates)
+    return coordinates.reshape(-1, 3)
+
+
+@profiling.timed("uv extraction")
+def get_uv_coordinates(mesh) -> np.ndarray:
+    """
+    Copy the coordinates of the active uv layer of a mesh into a numpy array.
+    
+    Args:
+        mesh: (bpy.types.Mesh) Blender mesh.
+    
+    Returns:
+        Array of shape (number of loops, 2) or None if the mesh has no
+        active uv layer.
+    """
+
+    uv_layer = mesh.uv_layers.active
+    if uv_layer is None:
+        return None
+    coordinates = np.empty(len(uv_layer.data)*2, dtype=np.float32)
+    uv_layer.data.foreach_get("uv", coordinates)
+    return coordinates.reshape(-1, 2)
+
+
+def _get_segment_bounds(collections, attribute: str, width: int) -> (np.ndarray, np.ndarray):
+    """
+    Read an attribute of several blender collections into one concatenated
+    buffer and reduce it per collection.
+    
+    Args:
+        collections: List of blender collections (e.g. mesh.vertices) or None.
+        attribute: Name of the attribute passed to 'foreach_get'.
+        width: Number of floats per element of the attribute.
+    
+    Returns:
+        Two arrays of shape (len(collections), width) holding the minimum
+        and maximum per collection. Rows of empty collections (or None)
+        are NaN.
+    """
+
+    counts = np.array([len(c) if c is not None else 0 for c in collections], dtype=np.int64)
+    offsets = np.zeros(len(counts)+1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    buffer = np.empty(offsets[-1]*width, dtype=np.float32)
+    for collection, start, end in zip(collections, offsets[:-1], offsets[1:]):
+        if start != end:
+            collection.foreach_get(attribute, buffer[start*width:end*width])
+    buffer = buffer.reshape(-1, width)
+
+    mins = np.full((len(counts), width), np.nan)
+    maxs = np.full((len(counts), width), np.nan)
+    filled = counts > 0
+    if filled.any():
+        starts = offsets[:-1][filled]
+        mins[filled] = np.minimum.reduceat(buffer, starts, axis=0)
+        maxs[filled] = np.maximum.reduceat(buffer, starts, axis=0)
+    return mins, maxs
+
+
+@profiling.timed("geometry extraction")
+def get_vertex_bounds(meshes) -> (np.ndarray, np.ndarray):
+    """
+    Find the bounding boxes of several meshes at once.
+    
+    Args:
+        meshes: List of blender meshes.
+    
+    Returns:
+        Two arrays of shape (len(meshes), 3) holding the minimum and the
+        maximum vertex coordinates of each mesh (NaN for empty meshes).
+    """
+
+    return _get_segment_bounds([mesh.vertices for mesh in meshes], "co", 3)
+
+
+@profiling.timed("uv extraction")
+def get_uv_bounds(meshes) -> (np.ndarray, np.ndarray):
+    """
+    Find the bounds of the active uv layers of several meshes at once.
+    
+    Args:
+        meshes: List of blender meshes.
+    
+    Returns:
+        Two arrays of shape (len(meshes), 2) holding the minimum and the
+        maximum uv coordinates of each mesh (NaN for meshes without
+        active uv layer or without loops).
+    """
+
+    layers = [mesh.uv_layers.active for mesh in meshes]
+    return _get_segment_bounds([layer.data if layer is not None else None for layer in layers], "uv", 2)
+
+
+def get_min_vertices(meshes) -> np.ndarray:
+    """
+    Minimum vertices in the sense of function.get_min_vertex for several
+    meshes at once: smallest x and y and largest z coordinate.
+    
+    Returns:
+        Array of shape (len(meshes), 3).
+    """
+
+    mins, maxs = get_vertex_bounds(meshes)
+    return np.column_stack((mins[:, 0], mins[:, 1], maxs[:, 2]))
+
+
+def get_min_uvs(meshes) -> np.ndarray:
+    """
+    Texture offsets in the sense of function.get_min_uv for several meshes
+    at once: smallest u and 1 - largest v coordinate.
+    
+    Returns:
+        Array of shape (len(meshes), 2). Meshes without active uv layer
+        get 0,0.
+    """
+
+    has_uv = np.array([mesh.uv_layers.active is not None for mesh in meshes], dtype=bool)
+    mins, maxs = get_uv_bounds(meshes)
+    # Same starting values as the per loop search: u <= 1 and v >= 0.
+    u_min = np.fmin(mins[:, 0], 1.)
+    v_max = np.fmax(maxs[:, 1], 0.)
+    return np.where(has_uv[:, None], np.column_stack((u_min, 1.-v_max)), 0.)
+
+
+class MeshData:
+    """Mesh-intrinsic export data, computed once per mesh datablock.
+
+    Objects linking the same mesh (e.g. repeated legs or tiles) share its
+    minimum vertex, texture offset and content digest, only their object
+    transform is applied on top by the caller.
+
+    Attributes:
+        min_vertices: List of minimum vertices (see get_min_vertices), one
+                      per row.
+        min_uvs: List of texture offsets (see get_min_uvs), one per row.
+        lookups: Number of meshes asked for.
+        misses: Number of lookups the data had to be computed for.
+    """
+
+    def __init__(self):
+        self.min_vertices = []
+        self.min_uvs = []
+        self.lookups = 0
+        self.misses = 0
+        self._rows = {}
+        self._digests = {}
+
+    def add(self, meshes) -> list:
+        """
+        Look up several meshes, the data of unknown meshes is extracted in
+        one go.
+
+        Returns:
+            The row of every mesh in min_vertices and min_uvs.
+        """
+
+        keys = [mesh.as_pointer() for mesh in meshes]
+        new_meshes = {}
+        for key, mesh in zip(keys, meshes):
+            if key not in self._rows:
+                new_meshes.setdefault(key, mesh)
+        self.lookups += len(keys)
+        self.misses += len(new_meshes)
+        if new_meshes:
+            if profiling.get_active() is not None:
+                profiling.count("meshes", len(new_meshes))
+                profiling.count("vertices", sum(len(mesh.vertices) for mesh in new_meshes.values()))
+            self.min_vertices.extend(get_min_vertices(list(new_meshes.values())).tolist())
+            self.min_uvs.extend(get_min_uvs(list(new_meshes.values())).tolist())
+            for key in new_meshes:
+                self._rows[key] = len(self._rows)
+        return [self._rows[key] for key in keys]
+
+    def get_digest(self, mesh) -> bytes:
+        """
+        Digest of the name, vertex coordinates and uv coordinates of a mesh.
+        """
+
+        key = mesh.as_pointer()
+        self.lookups += 1
+        digest = self._digests.get(key)
+        if digest is None:
+            self.misses += 1
+            hasher = hashlib.blake2b(mesh.name.encode() + b"\0", digest_size=16)
+            hasher.update(get_vertex_coordinates(mesh).tobytes())
+            uvs = get_uv_coordinates(mesh)
+            hasher.update(uvs.tobytes() if uvs is not None else b"no uv")
+            digest = self._digests[key] = hasher.digest()
+        return digest
+
+    @property
+    def hit_rate(self) -> float:
+        return 1. - self.misses / self.lookups if self.lookups else 0.
+
+    def get_report(self) -> str:
+        return "Mesh data: {} lookups, {} computed (hit rate {:.0%})".format(self.lookups, self.misses,
+                                                                            self.hit_rate)
@@ -0,0 +1,158 @@
+"""
+Levels of detail.
+
+Far away, small boxes cover less than a pixel on screen but still cost a
+render call per ModelRenderer. The generated class can switch between
+levels of detail by the distance of the entity to the camera: level 0 is
+the full model, level n is used from the n-th distance on and hides all
+parts (with their children) whose boxes would be smaller than
+MIN_SCREEN_SIZE on screen at that distance. The size of a box is the size
+exported from its dimensions in blender (see function.get_dimensions).
+
+Only whole ModelRenderers are hidden: they compile all their boxes into a
+single display list, which cannot leave out single boxes. A part is
+therefore hidden by its largest box, small boxes merged into a part with
+a large one (see merge.py) are always rendered.
+"""
+
+import math
+
+
+# Screen the projected sizes are computed for: the height in pixels and the
+# vertical field of view of Minecraft's default settings.
+SCREEN_HEIGHT = 1080
+FIELD_OF_VIEW = math.radians(70.)
+
+# Parts smaller than this on screen (pixels) are hidden.
+MIN_SCREEN_SIZE = 2.
+
+# Size of a model pixel in blocks at the default render scale.
+PIXEL_SIZE = 1. / 16.
+
+# The level a part is hidden from is stored in a byte of its flags (see partdata.py).
+MAX_LEVELS = 255
+
+
+def parse_distances(text: str) -> tuple:
+    """
+    Parse the distances of the levels of detail from a comma separated list.
+
+    Args:
+        text: The distances in blocks, e.g. '24, 48'. Empty for a single
+              level.
+
+    Returns:
+        The distances as tuple of floats.
+
+    Raises:
+        ValueError: If the distances are not positive and ascending.
+    """
+
+    distances = tuple(float(value) for value in text.split(",") if value.strip())
+    if any(distance <= 0. for distance in distances) or list(distances) != sorted(set(distances)):
+        raise ValueError("The distances of the levels of detail have to be positive and ascending")
+    if len(distances) > MAX_LEVELS:
+        raise ValueError("At most "+str(MAX_LEVELS)+" distances are supported")
+    return distances
+
+
+def get_projected_size(size: float, distance: float) -> float:
+    """
+    The height on screen in pixels of something of the given size (in model
+    pixels) at a distance (in blocks).
+    """
+
+    return size * PIXEL_SIZE / distance * SCREEN_HEIGHT / (2. * math.tan(FIELD_OF_VIEW / 2.))
+
+
+def get_part_sizes(model_data) -> dict:
+    """
+    Compute the size of the largest box of every part and its children.
+
+    Args:
+        model_data: (model.Model) The model.
+
+    Returns:
+        A dict mapping the part names to the largest extent of a box in
+        pixels.
+    """
+
+    sizes = {}
+    hierarchy = list(model_data.iter_hierarchy())
+    for part, _ in hierarchy:
+        sizes[part.name] = max((max(box.width, box.height, box.depth) + 2. * box.inflate for box in part.boxes),
+                               default=0.)
+    # Children come after their parents, so the sizes are passed up in reverse.
+    for part, parent in reversed(hierarchy):
+        if parent is not None:
+            sizes[parent.name] = max(sizes[parent.name], sizes[part.name])
+    return sizes
+
+
+def get_hidden_levels(model_data, distances, static_roots=()) -> dict:
+    """
+    Find the level of detail from which every part is hidden. The parts
+    below static roots (see merge.get_static_roots) are always shown, they
+    are rendered from a single display list anyway.
+
+    Args:
+        model_data: (model.Model) The model.
+        distances: Ascending distances in blocks from which the levels of
+                   detail 1, 2, ... are used.
+        static_roots: Names of the static root parts.
+
+    Returns:
+        A dict mapping the part names to the first level they are hidden
+        at, 0 if they are always shown.
+    """
+
+    sizes = get_part_sizes(model_data)
+    roots = {}
+    levels = {}
+    for part, parent in model_data.iter_hierarchy():
+        roots[part.name] = roots[parent.name] if parent is not None else part.name
+        if roots[part.name] in static_roots:
+            levels[part.name] = 0
+        else:
+            levels[part.name] = next((level for level, distance in enumerate(distances, 1)
+                                      if get_projected_size(sizes[part.name], distance) < MIN_SCREEN_SIZE), 0)
+    return levels
+
+
+def get_hidden_parts(model_data, levels: dict, level_count: int) -> list:
+    """
+    List the parts to hide at every level of detail. Children of hidden
+    parts are hidden along with them and are not listed.
+
+    Args:
+        model_data: (model.Model) The model.
+        levels: The first level every part is hidden at (see
+                get_hidden_levels).
+        level_count: Number of levels including the full model.
+
+    Returns:
+        A list holding the names of the hidden parts of every level.
+    """
+
+    hidden = [[] for _ in range(level_count)]
+    for part, parent in model_data.iter_hierarchy():
+        first = levels[part.name]
+        if first == 0:
+            continue
+        # Up to the level its parent is hidden at, the part has to be hidden by itself.
+        last = levels[parent.name] if parent is not None and levels[parent.name] != 0 else level_count
+        for level in range(first, last):
+            hidden[level].append(part.name)
+    return hidden
+
+
+def get_report(levels: dict, distances) -> str:
+    """
+    Summarize the parts hidden at every level of detail (see
+    get_hidden_levels).
+    """
+
+    return "\n".join("Level of detail "+str(level)+" (from "+format(distance, "g")+" blocks): "
+                     + str(sum(1 for first in levels.values() if 0 < first <= level))+" of "+str(len(levels))
+                     + " ModelRenderers hidden"
+                     for level, distance in enumerate(distances, 1))
@@ -0,0 +1,147 @@
+"""
+Merging of boxes into shared ModelRenderers.
+
+Every ModelRenderer costs a matrix push, transform and pop per entity and
+frame. Boxes with the same rotation point and rotation which are animated
+the same way (or not at all) can be added to a single ModelRenderer
+instead, the offsets of the boxes from the rotation point stay the same.
+"""
+
+import hashlib
+
+from MCExport.Exporter import model
+
+
+# Rotation points and angles are compared at the precision they are written
+# to the java file with (see codegen.format_float).
+PRECISION = 6
+
+
+def get_animation_signatures(clips: list) -> dict:
+    """
+    Identify the animation of every animated part.
+
+    Args:
+        clips: List of model.Clips.
+
+    Returns:
+        A dict mapping part names to a digest of their tracks in all clips.
+        Parts with the same digest move identically.
+    """
+
+    digests = {}
+    for clip in clips:
+        for track in clip.tracks:
+            digest = digests.get(track.part)
+            if digest is None:
+                digest = digests[track.part] = hashlib.blake2b(digest_size=16)
+            digest.update(str(clip.index).encode() + b"\0")
+            for name in sorted(track.channels):
+                digest.update(name.encode() + b"\0" + track.channels[name].tobytes())
+                keyframes = track.keyframes.get(name)
+                if keyframes is not None:
+                    digest.update(b"\0" + keyframes.tobytes())
+    return {name: digest.digest() for name, digest in digests.items()}
+
+
+def get_moving_parts(clips=None) -> set:
+    """
+    Find the parts whose rotation point or angles are animated by a clip.
+
+    Args:
+        clips: Optional list of model.Clips.
+
+    Returns:
+        A set with the names of the moving parts (their children move
+        along with them).
+    """
+
+    return {track.part for clip in clips or () for track in clip.tracks
+            if any(name in track.channels for name in model.PIVOT_CHANNELS + model.ANGLE_CHANNELS)}
+
+
+def get_static_roots(parents: dict, clips=None) -> set:
+    """
+    Find the root parts that never move: neither they nor any part below
+    them have their rotation point or angles animated by a clip. They can
+    be rendered from a single display list (see codegen.get_static_sections).
+
+    Args:
+        parents: Dict mapping the names of all parts to the name of their
+                 parent, None for root parts.
+        clips: Optional list of model.Clips.
+
+    Returns:
+        A set with the names of the static root parts.
+    """
+
+    moving = set()
+    for root in get_moving_parts(clips):
+        if root not in parents:
+            continue
+        while parents[root] is not None:
+            root = parents[root]
+        moving.add(root)
+    return {name for name, parent in parents.items() if parent is None and name not in moving}
+
+
+def get_group_key(pivot, angles, signature=None) -> tuple:
+    """
+    Key of a box; boxes with equal keys can share a ModelRenderer.
+
+    Args:
+        pivot: Rotation point in Minecraft space.
+        angles: Rotation angles in Minecraft space.
+        signature: Animation signature (see get_animation_signatures) or
+                   None if not animated.
+    """
+
+    # Adding 0. turns -0. into 0.
+    return tuple(round(value, PRECISION) + 0. for value in tuple(pivot) + tuple(angles)) + (signature,)
+
+
+def group_items(items: list, keys: list) -> list:
+    """
+    Group items by their keys, keeping the order of the first item of every
+    group and of the items within a group.
+
+    Returns:
+        A list of lists of items.
+    """
+
+    groups = {}
+    for item, key in zip(items, keys):
+        groups.setdefault(key, []).append(item)
+    return list(groups.values())
+
+
+def merge_parts(parts: list, clips=None) -> list:
+    """
+    Merge parts without children which share their rotation point,
+    rotation and animation. The merged part is named after the first part
+    of its group.
+
+    Args:
+        parts: List of model.Parts.
+        clips: Optional list of model.Clips animating the parts.
+
+    Returns:
+        The list of merged parts. The input parts are not modified.
+    """
+
+    signatures = get_animation_signatures(clips) if clips else {}
+    keys = []
+    for i, part in enumerate(parts):
+        if part.children:
+            # Parents are never merged, their children depend on their name.
+            keys.append(("parent", i))
+        else:
+            keys.append(get_group_key(part.pivot, part.angles, signatures.get(part.name)) + (part.mirror,))
+    out_parts = []
+    for group in group_items(parts, keys):
+        if len(group) == 1:
+            out_parts.append(group[0])
+            continue
+        out_parts.append(model.Part(group[0].name, group[0].pivot, group[0].angles,
+                                    [box for part in group for box in part.boxes], group[0].mirror))
+    return out_parts
@@ -0,0 +1,199 @@
+"""
+Intermediate representation of an exported model.
+
+The classes in here describe a Minecraft model without any reference to
+blender: parts (ModelRenderers) with their rotation point and angles, the
+boxes of every part and the baked animation channels. All values are in
+Minecraft space already (y pointing down, angles in the Minecraft order).
+function.get_model fills it from the blender scene and codegen turns it
+into java code, so everything in between can be tested and profiled
+without blender.
+"""
+
+from array import array
+
+
+# Names of the animation channels of a part, in Minecraft space.
+PIVOT_CHANNELS = ("pivot_x", "pivot_y", "pivot_z")
+ANGLE_CHANNELS = ("angle_x", "angle_y", "angle_z")
+SCALE_CHANNELS = ("scale_x", "scale_y", "scale_z")
+CHANNEL_NAMES = PIVOT_CHANNELS + ANGLE_CHANNELS + SCALE_CHANNELS
+
+
+class Box:
+    """A cube added to a part (ModelRenderer.addBox).
+
+    Attributes:
+        tex_offset_u, tex_offset_v: Texture offset in pixels.
+        x, y, z: Offset of the minimum corner from the part's rotation point.
+        width, height, depth: Integer size of the box.
+        inflate: Scale factor growing the box in all directions.
+        hidden_faces: Bits of the faces covered by other boxes, which are
+                      not rendered (see occlusion.FACES).
+    """
+
+    __slots__ = ("tex_offset_u", "tex_offset_v", "x", "y", "z", "width", "height", "depth", "inflate",
+                 "hidden_faces")
+
+    def __init__(self, tex_offset_u: int, tex_offset_v: int, x: float, y: float, z: float,
+                 width: int, height: int, depth: int, inflate: float = 0., hidden_faces: int = 0):
+        self.tex_offset_u = tex_offset_u
+        self.tex_offset_v = tex_offset_v
+        self.x = x
+        self.y = y
+        self.z = z
+        self.width = width
+        self.height = height
+        self.depth = depth
+        self.inflate = inflate
+        self.hidden_faces = hidden_faces
+
+    def __repr__(self):
+        return "Box(({}, {}), ({}, {}, {}), ({}, {}, {}))".format(
+            self.tex_offset_u, self.tex_offset_v, self.x, self.y, self.z, self.width, self.height, self.depth)
+
+
+class Part:
+    """A ModelRenderer: boxes sharing a rotation point and rotation.
+
+    Attributes:
+        name: Name of the java field.
+        pivot_x, pivot_y, pivot_z: Rotation point.
+        angle_x, angle_y, angle_z: Rotation angles in radians.
+        mirror: Whether the texture is mirrored.
+        boxes: List of Boxes.
+        children: List of child Parts.
+    """
+
+    __slots__ = ("name", "pivot_x", "pivot_y", "pivot_z", "angle_x", "angle_y", "angle_z", "mirror",
+                 "boxes", "children")
+
+    def __init__(self, name: str, pivot=(0., 0., 0.), angles=(0., 0., 0.), boxes=None, mirror: bool = True):
+        self.name = name
+        self.pivot_x, self.pivot_y, self.pivot_z = pivot
+        self.angle_x, self.angle_y, self.angle_z = angles
+        self.mirror = mirror
+        self.boxes = boxes if boxes is not None else []
+        self.children = []
+
+    @property
+    def pivot(self) -> (float, float, float):
+        return self.pivot_x, self.pivot_y, self.pivot_z
+
+    @property
+    def angles(self) -> (float, float, float):
+        return self.angle_x, self.angle_y, self.angle_z
+
+    def __repr__(self):
+        return "Part({!r}, {}, {}, {} boxes)".format(self.name, self.pivot, self.angles, len(self.boxes))
+
+
+class Track:
+    """The animation of a single part within a clip.
+
+    Attributes:
+        part: Name of the animated part.
+        channels: Dict mapping channel names (see CHANNEL_NAMES) to
+                  array('f') holding one value per frame, or one value per
+                  key frame for reduced channels.
+        keyframes: Dict mapping the names of reduced channels to array('H')
+                   holding the (ascending) frames of their values.
+    """
+
+    __slots__ = ("part", "channels", "keyframes")
+
+    def __init__(self, part: str, channels=None):
+        self.part = part
+        self.channels = {}
+        self.keyframes = {}
+        if channels is not None:
+            for name, values in channels.items():
+                self.set_channel(name, values)
+
+    def set_channel(self, name: str, values, keyframes=None):
+        """
+        Set the values of a channel. If keyframes is given the values belong
+        to these frames only and are interpolated linearly in between.
+        """
+
+        if name not in CHANNEL_NAMES:
+            raise ValueError("Unknown animation channel '"+name+"'")
+        self.channels[name] = values if isinstance(values, array) else array("f", values)
+        if keyframes is None:
+            self.keyframes.pop(name, None)
+        else:
+            if len(keyframes) != len(values):
+                raise ValueError("Channel '"+name+"' needs one key frame per value")
+            self.keyframes[name] = keyframes if isinstance(keyframes, array) else array("H", keyframes)
+
+
+class Clip:
+    """A named animation.
+
+    Attributes:
+        name: Name of the clip (the NLA track name).
+        index: Index of the clip in the generated code.
+        frame_count: Number of frames.
+        tracks: List of Tracks, one per animated part.
+    """
+
+    __slots__ = ("name", "index", "frame_count", "tracks")
+
+    def __init__(self, name: str, index: int, frame_count: int, tracks=None):
+        self.name = name
+        self.index = index
+        self.frame_count = frame_count
+        self.tracks = tracks if tracks is not None else []
+
+
+class Model:
+    """A complete model.
+
+    Attributes:
+        name: Name of the generated class (without the 'Model' prefix).
+        texture_width, texture_height: Texture size in pixels.
+        parts: List of the root Parts.
+        clips: List of Clips ordered by their index.
+    """
+
+    __slots__ = ("name", "texture_width", "texture_height", "parts", "clips")
+
+    def __init__(self, name: str, texture_width: int, texture_height: int, parts=None, clips=None):
+        self.name = name
+        self.texture_width = texture_width
+        self.texture_height = texture_height
+        self.parts = parts if parts is not None else []
+        self.clips = clips if clips is not None else []
+
+    def iter_parts(self):
+        """
+        Iterate over all parts, parents before their children.
+        """
+
+        for part, _ in self.iter_hierarchy():
+            yield part
+
+    def iter_hierarchy(self):
+        """
+        Iterate over all parts, parents before their children.
+
+        Yields:
+            Tuples (part, parent part or None for root parts).
+        """
+
+        stack = [(part, None) for part in reversed(self.parts)]
+        while stack:
+            part, parent = stack.pop()
+            yield part, parent
+            stack.extend((child, part) for child in reversed(part.children))
+
+    def get_parent_names(self) -> dict:
+        """
+        Map the names of all parts to the name of their parent, None for
+        root parts.
+        """
+
+        return {part.name: parent.name if parent is not None else None for part, parent in self.iter_hierarchy()}
+
+    def get_box_count(self) -> int:
+        return sum(len(part.boxes) for part in self.iter_parts())
@@ -0,0 +1,305 @@
+"""
+Hidden face culling.
+
+ModelRenderer.addBox always renders all six faces of a box, even where a
+face lies flat against a neighbouring box or the whole box is buried in
+other boxes. The analysis in here finds the faces which are covered by
+other boxes in every pose of the model and stores them in
+model.Box.hidden_faces; the generated class builds these boxes from the
+remaining quads only (see codegen.culled_box_template) and leaves out
+boxes without any visible face.
+
+Two boxes can only hide each other if they never move relative to each
+other and face the same way: they have to belong to the same rigid group
+(their parts are moved by the same animated part, or not at all) and their
+parts must have the same rotation in model space. The boxes of such a group
+are axis aligned boxes in a common frame, where touching boxes are found
+with a spatial hash instead of comparing every pair. With levels of detail
+(see lod.py) a box only covers the boxes it is shown together with.
+"""
+
+import itertools
+import math
+from collections import defaultdict
+
+from MCExport.Exporter import merge
+
+
+# The faces of a box in the order of the bits of model.Box.hidden_faces, as
+# (axis, direction) in the space of the box's part.
+FACES = ((0, 1), (0, -1), (1, -1), (1, 1), (2, -1), (2, 1))
+ALL_FACES = (1 << len(FACES)) - 1
+
+# Every face is a quad.
+VERTICES_PER_FACE = 4
+
+# Distance in pixels up to which faces are considered touching.
+TOLERANCE = 1e-4
+
+# Parts whose rotation matrices are equal at this precision face the same way.
+ROTATION_PRECISION = 5
+
+# Boxes spanning more cells of the spatial hash are compared with all boxes instead.
+MAX_CELLS_PER_BOX = 64
+
+
+def get_rotation_matrix(angles) -> tuple:
+    """
+    The rotation matrix of a ModelRenderer, which rotates around z, y and x
+    in this order (see ModelRenderer.render).
+
+    Args:
+        angles: Rotation angles x, y and z in radians.
+
+    Returns:
+        The matrix as tuple of its rows.
+    """
+
+    cx, cy, cz = (math.cos(angle) for angle in angles)
+    sx, sy, sz = (math.sin(angle) for angle in angles)
+    # Rz * Ry * Rx
+    return ((cz * cy, cz * sy * sx - sz * cx, cz * sy * cx + sz * sx),
+            (sz * cy, sz * sy * sx + cz * cx, sz * sy * cx - cz * sx),
+            (-sy, cy * sx, cy * cx))
+
+
+def multiply(a, b) -> tuple:
+    return tuple(tuple(sum(a[i][k] * b[k][j] for k in range(3)) for j in range(3)) for i in range(3))
+
+
+def transform(matrix, vector) -> tuple:
+    return tuple(sum(matrix[i][k] * vector[k] for k in range(3)) for i in range(3))
+
+
+def get_part_transforms(model_data) -> dict:
+    """
+    Compute the rest pose of all parts in model space.
+
+    Args:
+        model_data: (model.Model) The model.
+
+    Returns:
+        A dict mapping the part names to their rotation matrix and their
+        rotation point in model space.
+    """
+
+    transforms = {}
+    for part, parent in model_data.iter_hierarchy():
+        rotation = get_rotation_matrix(part.angles)
+        if parent is None:
+            transforms[part.name] = (rotation, part.pivot)
+        else:
+            parent_rotation, parent_pivot = transforms[parent.name]
+            offset = transform(parent_rotation, part.pivot)
+            transforms[part.name] = (multiply(parent_rotation, rotation),
+                                     tuple(p + o for p, o in zip(parent_pivot, offset)))
+    return transforms
+
+
+def get_rigid_groups(model_data, clips=None) -> dict:
+    """
+    Assign the parts to the animated part moving them.
+
+    Args:
+        model_data: (model.Model) The model.
+        clips: Optional list of model.Clips.
+
+    Returns:
+        A dict mapping the part names to the name of the nearest moving part
+        above or at them, None for parts which are never moved.
+    """
+
+    moving = merge.get_moving_parts(clips)
+    groups = {}
+    for part, parent in model_data.iter_hierarchy():
+        if part.name in moving:
+            groups[part.name] = part.name
+        else:
+            groups[part.name] = groups[parent.name] if parent is not None else None
+    return groups
+
+
+def get_box_bounds(box, offset) -> (tuple, tuple):
+    """
+    The minimum and maximum corner of a box, moved by offset.
+    """
+
+    low = (box.x - box.inflate, box.y - box.inflate, box.z - box.inflate)
+    size = (box.width, box.height, box.depth)
+    return (tuple(o + l for o, l in zip(offset, low)),
+            tuple(o + l + s + 2. * box.inflate for o, l, s in zip(offset, low, size)))
+
+
+def find_neighbours(bounds: list) -> list:
+    """
+    Find the boxes touching or overlapping each other. The boxes are sorted
+    into the cells of a uniform grid as large as a typical box, so every box
+    is only compared with the few boxes sharing a cell with it. Boxes much
+    larger than the cells are kept out of the grid and compared with every
+    box.
+
+    Args:
+        bounds: List of the minimum and maximum corners of the boxes.
+
+    Returns:
+        A list holding the set of the indices of the neighbours of every box.
+    """
+
+    extents = sorted(max(h - l for l, h in zip(low, high)) for low, high in bounds)
+    cell_size = max(extents[len(extents) // 2], 1.) if extents else 1.
+    cells = defaultdict(list)
+    oversized = []
+    for i, (low, high) in enumerate(bounds):
+        ranges = [range(math.floor((l - TOLERANCE) / cell_size), math.floor((h + TOLERANCE) / cell_size) + 1)
+                  for l, h in zip(low, high)]
+        if len(ranges[0]) * len(ranges[1]) * len(ranges[2]) > MAX_CELLS_PER_BOX:
+            oversized.append(i)
+            continue
+        for cell in itertools.product(*ranges):
+            cells[cell].append(i)
+    neighbours = [set() for _ in bounds]
+    candidates = [(members[n], members[n + 1:]) for members in cells.values() for n in range(len(members))]
+    candidates.extend((i, range(len(bounds))) for i in oversized)
+    for i, others in candidates:
+        low, high = bounds[i]
+        for j in others:
+            if j == i or j in neighbours[i]:
+                continue
+            other_low, other_high = bounds[j]
+            if all(other_low[axis] <= high[axis] + TOLERANCE and low[axis] <= other_high[axis] + TOLERANCE
+                   for axis in range(3)):
+                neighbours[i].add(j)
+                neighbours[j].add(i)
+    return neighbours
+
+
+def is_rectangle_covered(rectangle, covers: list) -> bool:
+    """
+    Check whether the union of some rectangles covers a rectangle. The
+    rectangle is split at the edges of the covering rectangles and the
+    center of every cell is tested.
+
+    Args:
+        rectangle: ((u1, v1), (u2, v2)) the rectangle to cover.
+        covers: List of the covering rectangles in the same form.
+    """
+
+    (u1, v1), (u2, v2) = rectangle
+    if not covers:
+        return False
+    us = sorted({u1, u2}.union(u for (cu1, _), (cu2, _) in covers for u in (cu1, cu2) if u1 < u < u2))
+    vs = sorted({v1, v2}.union(v for (_, cv1), (_, cv2) in covers for v in (cv1, cv2) if v1 < v < v2))
+    for ua, ub in zip(us, us[1:]):
+        u = (ua + ub) / 2.
+        for va, vb in zip(vs, vs[1:]):
+            v = (va + vb) / 2.
+            if not any(cu1 - TOLERANCE <= u <= cu2 + TOLERANCE and cv1 - TOLERANCE <= v <= cv2 + TOLERANCE
+                       for (cu1, cv1), (cu2, cv2) in covers):
+                return False
+    return True
+
+
+def is_shown_with(level: int, other_level: int) -> bool:
+    """
+    Check whether a box hidden from other_level on is shown at all levels of
+    detail a box hidden from level on is shown at (0 for boxes which are
+    always shown, see lod.get_hidden_levels).
+    """
+
+    return other_level == 0 or level != 0 and other_level >= level
+
+
+def get_hidden_faces(index: int, bounds: list, neighbours: list, levels: list = None) -> int:
+    """
+    Find the faces of a box covered by its neighbours. A face is covered
+    where the space right in front of it lies inside other boxes.
+
+    Args:
+        index: Index of the box in bounds.
+        bounds: List of the minimum and maximum corners of the boxes.
+        neighbours: Indices of the neighbours of every box (see
+                    find_neighbours).
+        levels: Optional list with the level of detail every box is hidden
+                from. Neighbours hidden before the box do not cover it.
+
+    Returns:
+        The hidden faces as bits in the order of FACES.
+    """
+
+    low, high = bounds[index]
+    hidden = 0
+    for bit, (axis, direction) in enumerate(FACES):
+        plane = high[axis] if direction > 0 else low[axis]
+        u_axis, v_axis = [other for other in range(3) if other != axis]
+        covers = []
+        for j in neighbours[index]:
+            if levels is not None and not is_shown_with(levels[index], levels[j]):
+                continue
+            other_low, other_high = bounds[j]
+            if direction > 0:
+                in_front = other_low[axis] <= plane + TOLERANCE < other_high[axis]
+            else:
+                in_front = other_low[axis] < plane - TOLERANCE <= other_high[axis]
+            cover = ((max(other_low[u_axis], low[u_axis]), max(other_low[v_axis], low[v_axis])),
+                     (min(other_high[u_axis], high[u_axis]), min(other_high[v_axis], high[v_axis])))
+            if in_front and cover[0][0] < cover[1][0] and cover[0][1] < cover[1][1]:
+                covers.append(cover)
+        if is_rectangle_covered(((low[u_axis], low[v_axis]), (high[u_axis], high[v_axis])), covers):
+            hidden |= 1 << bit
+    return hidden
+
+
+def cull_hidden_faces(model_data, clips=None, hidden_levels: dict = None) -> (int, int, int):
+    """
+    Set the hidden faces of all boxes of a model.
+
+    Args:
+        model_data: (model.Model) The model.
+        clips: Optional list of model.Clips moving the parts.
+        hidden_levels: Optional dict mapping the part names to the level of
+                       detail they are hidden from (see
+                       lod.get_hidden_levels). Boxes of parts hidden at a
+                       level do not cover the boxes still shown there.
+
+    Returns:
+        The number of hidden faces, the number of faces in total and the
+        number of boxes without any visible face.
+    """
+
+    transforms = get_part_transforms(model_data)
+    rigid_groups = get_rigid_groups(model_data, clips)
+    # Boxes which can hide each other, with their bounds in a frame shared by the group.
+    groups = defaultdict(list)
+    for part in model_data.iter_parts():
+        rotation, pivot = transforms[part.name]
+        key = (rigid_groups[part.name],
+               tuple(round(value, ROTATION_PRECISION) + 0. for row in rotation for value in row))
+        # The frame is the model space rotated back by the rotation of the part.
+        inverse = tuple(zip(*rotation))
+        offset = transform(inverse, pivot)
+        level = hidden_levels[part.name] if hidden_levels is not None else 0
+        for box in part.boxes:
+            groups[key].append((box, get_box_bounds(box, offset), level))
+    hidden_count = 0
+    hidden_boxes = 0
+    for boxes in groups.values():
+        bounds = [box_bounds for _, box_bounds, _ in boxes]
+        levels = [level for _, _, level in boxes] if hidden_levels is not None else None
+        neighbours = find_neighbours(bounds)
+        for i, (box, _, _) in enumerate(boxes):
+            box.hidden_faces = get_hidden_faces(i, bounds, neighbours, levels)
+            hidden_count += bin(box.hidden_faces).count("1")
+            hidden_boxes += box.hidden_faces == ALL_FACES
+    return hidden_count, model_data.get_box_count() * len(FACES), hidden_boxes
+
+
+def get_report(hidden_count: int, face_count: int, hidden_boxes: int) -> str:
+    """
+    Summarize the result of cull_hidden_faces.
+    """
+
+    saved = hidden_count * VERTICES_PER_FACE
+    total = face_count * VERTICES_PER_FACE
+    return ("Hidden faces: "+str(hidden_count)+" of "+str(face_count)+" faces culled, "+str(hidden_boxes)
+            + " boxes hidden entirely ("+str(saved)+" of "+str(total)+" vertices saved, "
+            + format(100. * saved / total if total else 0., ".1f")+"%)")
@@ -0,0 +1,122 @@
+"""
+Baking of animation tracks in worker processes.
+
+The fcurves of the actions are copied into plain numpy data (see
+bake.read_action) once in blender, the tracks are then baked by a pool of
+python processes with the same evaluation code as in blender's process.
+The results come back in the order of the jobs, so the export does not
+depend on which worker finished first.
+This module does not import blender, the workers only import bake.py.
+"""
+
+import multiprocessing
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from MCExport.Exporter import bake
+
+
+# Below this number of baked values (frames times channels of all jobs)
+# starting the worker processes takes longer than baking in place.
+MIN_PARALLEL_SAMPLES = 200000
+# Jobs handed to a worker at once, relative to an even split.
+CHUNKS_PER_WORKER = 4
+
+
+BakeJob = namedtuple("BakeJob", ["strips", "frame_count", "channels", "defaults"])
+BakeJob.__doc__ = """
+Everything needed to bake one NLA track (see bake.bake_strips): the
+StripRefs with ActionData instead of blender actions, the number of
+frames, the channels and the rest values of the object.
+"""
+
+
+def run_job(job: BakeJob) -> dict:
+    """
+    Bake a single track.
+    """
+
+    return bake.bake_strips(job.strips, range(job.frame_count), job.channels, job.defaults)
+
+
+def get_worker_count(workers: int = 0) -> int:
+    """
+    Number of worker processes, workers <= 0 means one per CPU core. More
+    workers than cores only add overhead.
+    """
+
+    cores = os.cpu_count() or 1
+    return min(workers, cores) if workers > 0 else cores
+
+
+def run_chunk(jobs: list) -> list:
+    """
+    Bake several tracks in a worker.
+    """
+
+    return [run_job(job) for job in jobs]
+
+
+def run_jobs(jobs: list, workers: int = 0, executable: str = None) -> list:
+    """
+    Bake several tracks, in parallel if it pays off.
+
+    Args:
+        jobs: List of BakeJobs.
+        workers: Number of worker processes (<= 0: one per CPU core).
+        executable: Python interpreter started for the workers. Defaults
+                    to sys.executable, which is not python in blender
+                    before 2.91.
+
+    Returns:
+        A list with the baked channels (see bake.bake_strips) of every
+        job, in the order of jobs.
+    """
+
+    return list(iter_jobs(jobs, workers, executable))
+
+
+def iter_jobs(jobs: list, workers: int = 0, executable: str = None):
+    """
+    Like run_jobs, but yield the baked channels of the jobs one by one.
+    Jobs which have not been started are dropped when the generator is
+    closed.
+    """
+
+    workers = min(get_worker_count(workers), len(jobs))
+    samples = sum(job.frame_count * len(job.channels) for job in jobs)
+    if workers <= 1 or samples < MIN_PARALLEL_SAMPLES:
+        for job in jobs:
+            yield run_job(job)
+        return
+
+    # Forked copies of blender are not safe, always start fresh interpreters.
+    context = multiprocessing.get_context("spawn")
+    if executable is not None:
+        context.set_executable(executable)
+    chunksize = max(1, len(jobs) // (workers * CHUNKS_PER_WORKER))
+    done = 0
+    error = None
+    executor = None
+    futures = []
+    try:
+        executor = ProcessPoolExecutor(workers, mp_context=context)
+        futures = [executor.submit(run_chunk, jobs[i:i+chunksize]) for i in range(0, len(jobs), chunksize)]
+        for future in futures:
+            for baked in future.result():
+                done += 1
+                yield baked
+    except (OSError, BrokenProcessPool) as e:
+        error = e
+    finally:
+        for future in futures:
+            future.cancel()
+        if executor is not None:
+            # When cancelled, the running chunks are left to finish in the background.
+            executor.shutdown(wait=done == len(jobs))
+    if error is not None:
+        print("Warning: Baking in worker processes failed ("+str(error)+"), baking in place!")
+        for job in jobs[done:]:
+            yield run_job(job)
@@ -0,0 +1,130 @@
+"""
+Binary model resource.
+
+For large models the statements instantiating every box make the
+constructor of the generated class exceed the 64KB method size limit of
+the JVM. With the table construction the parts and boxes are written into
+a compact binary file instead, which the generated class reads once per
+model type when it is loaded and builds its ModelRenderers from in a loop.
+
+Layout (little-endian):
+    Header:
+        magic           4 bytes  b"MCXP"
+        version         uint16
+        flags           uint16   (reserved, 0)
+        part count      uint32
+        box count       uint32
+    Per part (parents before their children):
+        parent          int32    index of the parent part, -1 for roots
+        box count       uint32
+        flags           uint32   FLAG_MIRROR, FLAG_STATIC and the level of
+                                 detail the part is hidden from in
+                                 bits 8 to 15 (see lod.py)
+        pivot           3 float32
+        angles          3 float32
+    Per box (in the order of the parts):
+        texture offset  2 uint16
+        offset          3 float32
+        size            3 uint16
+        hidden faces    uint16   (see occlusion.FACES)
+        inflate         float32
+    Per part:
+        name length     uint16
+        name            utf-8
+"""
+
+import struct
+
+from MCExport.Exporter import lod
+from MCExport.Exporter import model
+
+
+MAGIC = b"MCXP"
+VERSION = 1
+
+FLAG_MIRROR = 1
+# Set for root parts rendered from a display list (see merge.get_static_roots).
+FLAG_STATIC = 2
+LOD_LEVEL_SHIFT = 8
+
+HEADER = struct.Struct("<4sHHII")
+PART_ENTRY = struct.Struct("<iII6f")
+BOX_ENTRY = struct.Struct("<HHfffHHHHf")
+NAME_LENGTH = struct.Struct("<H")
+
+
+def write_part_data(file, model_data, static_roots=(), lod_distances=()) -> int:
+    """
+    Write the parts and boxes of a model into a binary stream.
+
+    Args:
+        file: An open binary stream.
+        model_data: (model.Model) The model.
+        static_roots: Names of the root parts flagged as static.
+        lod_distances: Distances of the levels of detail, the level every
+                       part is hidden from is stored in its flags.
+
+    Returns:
+        The number of bytes written.
+    """
+
+    hierarchy = list(model_data.iter_hierarchy())
+    indices = {part.name: i for i, (part, _) in enumerate(hierarchy)}
+    levels = lod.get_hidden_levels(model_data, lod_distances, static_roots) if lod_distances else {}
+    out = bytearray(HEADER.pack(MAGIC, VERSION, 0, len(hierarchy), model_data.get_box_count()))
+    for part, parent in hierarchy:
+        flags = (FLAG_MIRROR if part.mirror else 0) | (FLAG_STATIC if part.name in static_roots else 0)
+        flags |= levels.get(part.name, 0) << LOD_LEVEL_SHIFT
+        out += PART_ENTRY.pack(indices[parent.name] if parent is not None else -1, len(part.boxes), flags,
+                               *(part.pivot + part.angles))
+    for part, _ in hierarchy:
+        for box in part.boxes:
+            out += BOX_ENTRY.pack(box.tex_offset_u, box.tex_offset_v, box.x, box.y, box.z,
+                                  box.width, box.height, box.depth, box.hidden_faces, box.inflate)
+    for part, _ in hierarchy:
+        name = part.name.encode("utf-8")
+        out += NAME_LENGTH.pack(len(name)) + name
+    file.write(out)
+    return len(out)
+
+
+def read_part_data(data: bytes) -> model.Model:
+    """
+    Read a binary model resource, the inverse of write_part_data.
+
+    Args:
+        data: Content of the file.
+
+    Returns:
+        A model.Model without name and texture size.
+    """
+
+    magic, version, _, part_count, box_count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a model resource of version "+str(VERSION))
+    offset = HEADER.size
+    entries = []
+    for _ in range(part_count):
+        entries.append(PART_ENTRY.unpack_from(data, offset))
+        offset += PART_ENTRY.size
+    boxes = []
+    for _ in range(box_count):
+        u, v, x, y, z, width, height, depth, hidden_faces, inflate = BOX_ENTRY.unpack_from(data, offset)
+        boxes.append(model.Box(u, v, x, y, z, width, height, depth, inflate, hidden_faces))
+        offset += BOX_ENTRY.size
+    out_model = model.Model("", 0, 0)
+    parts = []
+    first_box = 0
+    for parent, count, flags, *pose in entries:
+        length, = NAME_LENGTH.unpack_from(data, offset)
+        offset += NAME_LENGTH.size
+        name = data[offset:offset + length].decode("utf-8")
+        offset += length
+        part = model.Part(name, pose[:3], pose[3:], boxes[first_box:first_box + count], bool(flags & FLAG_MIRROR))
+        first_box += count
+        parts.append(part)
+        if parent < 0:
+            out_model.parts.append(part)
+        else:
+            parts[parent].children.append(part)
+    return out_model
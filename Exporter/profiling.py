@@ -0,0 +1,259 @@
+"""
+Opt-in instrumentation of the export.
+
+While a Profile is activated (see activate), the export books the wall
+time of its phases (scene scan, geometry extraction, ...), counts the
+objects, vertices, frames and bytes it processed and records the peak
+memory allocated by python and numpy (via tracemalloc). Phases may be
+nested, every phase only gets the time spent in it minus the time of the
+phases nested in it, so the phase times add up to the total.
+Without an active profile phase and count do nothing.
+
+The modal export runs in time slices between which blender's interface
+runs. The profile is only resumed for the time slices (see resumed), so
+neither the time nor the allocations in between are booked.
+"""
+
+import functools
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+# Bump when the layout of the json profile changes.
+PROFILE_VERSION = 1
+
+# Name of the phase collecting the time outside of all other phases.
+OTHER_PHASE = "other"
+
+_active = None
+
+
+class Profile:
+    """Timings, counters and memory peaks of one export.
+
+    Attributes:
+        phases: Dict mapping phase names to dicts with the time in seconds
+                ('time'), the number of times the phase was entered
+                ('calls') and its peak of traced memory in bytes ('peak',
+                None if tracemalloc cannot reset its peak).
+        counters: Dict mapping counter names to integers.
+        total_time: Wall time of the profiled export in seconds.
+        peak_memory: Peak of traced memory in bytes (None if not traced).
+                     Memory is only traced while the profile runs, the
+                     memory still allocated when it is suspended is
+                     counted as allocated until it stops.
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self.phases = {}
+        self.counters = {}
+        self.total_time = 0.
+        self.peak_memory = None
+        self.trace_memory = trace_memory
+        self._stack = []
+        self._last = None
+        self._resumed = None
+        self._running = False
+        self._started_tracing = False
+        self._carried_memory = 0
+        self._stopped = False
+
+    def _book(self):
+        """
+        Book the time (and memory peak) since the last phase switch to the
+        innermost phase. Nothing is booked while the profile is suspended
+        (e.g. when the phases are left as the export is cancelled).
+        """
+
+        if not self._running:
+            return
+        now = time.perf_counter()
+        name = self._stack[-1] if self._stack else OTHER_PHASE
+        entry = self.phases.setdefault(name, {"time": 0., "calls": 0, "peak": None})
+        entry["time"] += now - self._last
+        self._last = now
+        if self.peak_memory is not None:
+            peak = self._carried_memory + tracemalloc.get_traced_memory()[1]
+            self.peak_memory = max(self.peak_memory, peak)
+            # Without reset_peak (python < 3.9) the peak cannot be split into phases.
+            if hasattr(tracemalloc, "reset_peak"):
+                entry["peak"] = max(entry["peak"] or 0, peak)
+                tracemalloc.reset_peak()
+
+    def enter(self, name: str):
+        self._book()
+        self._stack.append(name)
+        self.phases.setdefault(name, {"time": 0., "calls": 0, "peak": None})["calls"] += 1
+
+    def exit(self):
+        self._book()
+        self._stack.pop()
+
+    def is_suspended(self) -> bool:
+        """
+        Whether the profile was started and has not stopped, but does not
+        run right now.
+        """
+
+        return self._resumed is not None and not self._running and not self._stopped
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def start(self):
+        if self.trace_memory:
+            self.peak_memory = 0
+        self.resume()
+
+    def resume(self):
+        """
+        Continue the clocks (and memory tracing) of a suspended profile.
+        """
+
+        if self._running or self._stopped:
+            return
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+        self._resumed = self._last = time.perf_counter()
+        self._running = True
+
+    def suspend(self):
+        """
+        Stop the clocks (and memory tracing) until resume is called. The
+        phases entered stay entered.
+        """
+
+        if not self._running:
+            return
+        self._book()
+        self.total_time += self._last - self._resumed
+        if self._started_tracing:
+            # Stopping discards the traces, what is still allocated is carried over.
+            self._carried_memory += tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            self._started_tracing = False
+        self._running = False
+
+    def stop(self):
+        self.suspend()
+        self._stopped = True
+
+    def to_dict(self) -> dict:
+        return {"version": PROFILE_VERSION,
+                "total_time": self.total_time,
+                "peak_memory": self.peak_memory,
+                "phases": [dict(entry, name=name) for name, entry in self.phases.items()],
+                "counters": dict(self.counters)}
+
+    def get_summary(self, max_phases: int = 4) -> str:
+        """
+        One line summary: total time, the slowest phases, the counters and
+        the peak memory.
+        """
+
+        phases = sorted(self.phases.items(), key=lambda item: item[1]["time"], reverse=True)
+        out_items = ["{} {:.2f}s".format(name, entry["time"]) for name, entry in phases[:max_phases]]
+        summary = "Export took {:.2f}s ({})".format(self.total_time, ", ".join(out_items))
+        if self.counters:
+            summary += ", " + ", ".join("{} {}".format(value, name) for name, value in self.counters.items())
+        if self.peak_memory is not None:
+            summary += ", peak memory {:.1f} MiB".format(self.peak_memory / float(1 << 20))
+        return summary
+
+
+def get_active():
+    """
+    The active Profile or None.
+    """
+
+    return _active
+
+
+@contextmanager
+def activate(profile):
+    """
+    Profile everything within the with block. Does nothing if profile is
+    None.
+    """
+
+    global _active
+    if profile is None:
+        yield None
+        return
+    previous = _active
+    _active = profile
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _active = previous
+
+
+@contextmanager
+def resumed(profile):
+    """
+    Resume a suspended profile for the with block, a time slice of a step
+    generator (see steps.py) profiled with activate, and suspend it again
+    afterwards. Does nothing if profile is None.
+    """
+
+    global _active
+    previous = _active
+    if profile is not None and profile.is_suspended():
+        profile.resume()
+        _active = profile
+    try:
+        yield profile
+    finally:
+        if profile is not None:
+            profile.suspend()
+        _active = previous
+
+
+@contextmanager
+def phase(name: str):
+    """
+    Book the time spent in the with block to a phase of the active profile.
+    """
+
+    profile = _active
+    if profile is None:
+        yield
+        return
+    profile.enter(name)
+    try:
+        yield
+    finally:
+        profile.exit()
+
+
+def timed(name: str):
+    """
+    Decorator booking the calls of a function to a phase. Without an active
+    profile the function is called directly.
+    """
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _active is None:
+                return function(*args, **kwargs)
+            with phase(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name: str, value: int = 1):
+    """
+    Add to a counter of the active profile.
+    """
+
+    if _active is not None:
+        _active.count(name, value)
@@ -0,0 +1,216 @@
+"""
+Error-bounded keyframe reduction of baked animations.
+
+The generated class interpolates linearly between frames, so every sample
+which lies (within a tolerance) on the line between its neighbouring kept
+samples can be dropped. The reduction greedily extends every segment as
+far as a straight line from its first sample stays within the tolerance of
+all samples it skips. The first and the last frame are always kept.
+"""
+
+import math
+from array import array
+
+import numpy as np
+
+from MCExport.Exporter import model
+
+
+# Default tolerances per channel type: rotation points in pixels, angles in radians.
+PIVOT_TOLERANCE = 0.01
+ANGLE_TOLERANCE = 0.0005
+
+# Size in bytes of a key frame index and a value, used to decide whether a
+# reduced channel is actually smaller than the dense one.
+KEY_SIZE = 2
+VALUE_SIZE = 4
+
+# From this number of channels on, the channels are searched together with
+# numpy instead of one after another in plain python.
+VECTORIZE_MIN_CHANNELS = 32
+
+
+def _get_segment_end(values: list, start: int, tolerance: float) -> int:
+    """
+    Find the farthest sample that can be connected to the sample at start
+    by a straight line passing within tolerance of all samples in between.
+
+    The lines through the start sample which pass within tolerance of all
+    samples seen so far form a cone of slopes. A sample can end the segment
+    if the slope towards it lies within the cone of the samples before it,
+    the search stops once the cone is empty.
+    """
+
+    start_value = values[start]
+    lower = -math.inf
+    upper = math.inf
+    out_end = start + 1
+    for i in range(start + 1, len(values)):
+        distance = i - start
+        delta = values[i] - start_value
+        slope = delta / distance
+        if lower <= slope <= upper:
+            out_end = i
+        lower = max(lower, (delta - tolerance) / distance)
+        upper = min(upper, (delta + tolerance) / distance)
+        if lower > upper:
+            break
+    return out_end
+
+
+def _reduce_sequential(samples: np.ndarray, tolerance: float) -> list:
+    """
+    Reduce a single channel, returns the list of kept frames.
+    """
+
+    # Plain floats are a lot faster than numpy scalars in the loop.
+    values = samples.tolist()
+    out_keys = [0]
+    while out_keys[-1] < len(values) - 1:
+        out_keys.append(_get_segment_end(values, out_keys[-1], tolerance))
+    return out_keys
+
+
+def _reduce_vectorized(samples: np.ndarray, rows: np.ndarray, tolerances: np.ndarray) -> np.ndarray:
+    """
+    Reduce many channels (the given rows of samples) at once. Does the same
+    as _get_segment_end for all channels in lock step, every iteration
+    looks at the next sample of every channel.
+
+    Returns:
+        A boolean array of the shape of samples marking the kept frames of
+        the given rows.
+    """
+
+    channel_count = len(rows)
+    frame_count = samples.shape[1]
+    out_kept = np.zeros(samples.shape, dtype=bool)
+    out_kept[rows, 0] = True
+    start = np.zeros(channel_count, dtype=np.int64)
+    start_value = samples[rows, 0]
+    lower = np.full(channel_count, -np.inf)
+    upper = np.full(channel_count, np.inf)
+    end = np.ones(channel_count, dtype=np.int64)
+    i = np.ones(channel_count, dtype=np.int64)
+    while len(rows):
+        distance = i - start
+        delta = samples[rows, i] - start_value
+        slope = delta / distance
+        end = np.where((lower <= slope) & (slope <= upper), i, end)
+        lower = np.maximum(lower, (delta - tolerances) / distance)
+        upper = np.minimum(upper, (delta + tolerances) / distance)
+        stop = (lower > upper) | (i == frame_count - 1)
+        if stop.any():
+            out_kept[rows[stop], end[stop]] = True
+            finished = stop & (end == frame_count - 1)
+            # Channels whose segment ended start the next one at its end.
+            restart = stop & ~finished
+            start = np.where(restart, end, start)
+            i = np.where(restart, end, i)
+            start_value = np.where(restart, samples[rows, start], start_value)
+            lower = np.where(restart, -np.inf, lower)
+            upper = np.where(restart, np.inf, upper)
+            if finished.any():
+                active = ~finished
+                rows, start, start_value, lower, upper, end, i, tolerances = (
+                    values[active] for values in (rows, start, start_value, lower, upper, end, i, tolerances))
+        i = i + 1
+    return out_kept
+
+
+def reduce_channels(samples, tolerances) -> list:
+    """
+    Reduce the samples of channels of the same length.
+
+    Args:
+        samples: Array of the shape (channel count, frame count) holding one
+                 value per frame of every channel.
+        tolerances: Maximum absolute error of the linear interpolation
+                    between the kept samples at any frame, per channel.
+
+    Returns:
+        A list with one array('H') per channel holding the kept frames. The
+        first and the last frame are always kept.
+    """
+
+    samples = np.asarray(samples, dtype=np.float64)
+    tolerances = np.asarray(tolerances, dtype=np.float64)
+    channel_count, frame_count = samples.shape
+    if frame_count >= 1 << 16:
+        raise ValueError("Clips with more than 65535 frames can not be reduced")
+    if frame_count <= 2:
+        return [array("H", range(frame_count)) for _ in range(channel_count)]
+    out_keys = [array("H", (0, frame_count - 1)) for _ in range(channel_count)]
+    # Constant and linear channels are common, they need no search.
+    error = (samples[:, -1:] - samples[:, :1]) * np.linspace(0., 1., frame_count)
+    error += samples[:, :1]
+    error -= samples
+    np.abs(error, out=error)
+    rows = np.flatnonzero(error.max(axis=1) > tolerances)
+    del error
+    if len(rows) >= VECTORIZE_MIN_CHANNELS:
+        kept = _reduce_vectorized(samples, rows, tolerances[rows])
+        for row in rows:
+            out_keys[row] = array("H", np.flatnonzero(kept[row]).astype(np.uint16).tobytes())
+    else:
+        for row in rows:
+            out_keys[row] = array("H", _reduce_sequential(samples[row], tolerances[row]))
+    return out_keys
+
+
+def reduce_channel(values, tolerance: float) -> (array, array):
+    """
+    Reduce the samples of a channel.
+
+    Args:
+        values: One value per frame.
+        tolerance: Maximum absolute error of the linear interpolation
+                   between the kept samples at any frame.
+
+    Returns:
+        The kept frames as array('H') and their values as array('f').
+    """
+
+    samples = np.asarray(values, dtype=np.float32)
+    keys = reduce_channels(samples[np.newaxis], [tolerance])[0]
+    return keys, array("f", samples[np.asarray(keys)].tobytes())
+
+
+def reduce_clips(clips: list, pivot_tolerance: float = PIVOT_TOLERANCE,
+                 angle_tolerance: float = ANGLE_TOLERANCE) -> list:
+    """
+    Reduce the rotation point and angle channels (the ones exported to the
+    generated class) of all clips in place. Channels are only replaced by
+    their key frames if that is smaller than storing every frame.
+
+    Args:
+        clips: List of model.Clips whose channels hold one value per frame.
+        pivot_tolerance: Tolerance of the rotation point channels (pixels).
+        angle_tolerance: Tolerance of the angle channels (radians).
+
+    Returns:
+        A list of tuples (clip name, number of samples before, number of
+        samples after the reduction) with one entry per clip.
+    """
+
+    tolerances = dict.fromkeys(model.PIVOT_CHANNELS, pivot_tolerance)
+    tolerances.update(dict.fromkeys(model.ANGLE_CHANNELS, angle_tolerance))
+    out_stats = []
+    for clip in clips:
+        # Every channel with one value per frame is reduced, all of them in one go.
+        channels = [(track, name) for track in clip.tracks for name in tolerances
+                    if name in track.channels and name not in track.keyframes]
+        before = sum(len(values) for track in clip.tracks for name, values in track.channels.items()
+                     if name in tolerances)
+        after = before
+        if channels:
+            samples = np.empty((len(channels), clip.frame_count), dtype=np.float64)
+            for row, (track, name) in zip(samples, channels):
+                row[:] = np.frombuffer(track.channels[name], dtype=np.float32)
+            all_keys = reduce_channels(samples, [tolerances[name] for _, name in channels])
+            for (track, name), row, keys in zip(channels, samples, all_keys):
+                if len(keys) * (KEY_SIZE + VALUE_SIZE) < len(row) * VALUE_SIZE:
+                    track.set_channel(name, array("f", row[np.asarray(keys)].astype(np.float32).tobytes()), keys)
+                    after -= len(row) - len(keys)
+        out_stats.append((clip.name, before, after))
+    return out_stats
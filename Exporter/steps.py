@@ -0,0 +1,68 @@
+"""
+Step-wise execution of the export.
+
+The long running parts of the export are generators which yield their
+progress (a float from 0 to 1) after every small piece of work and return
+their result when they are done. function.write_data simply runs them to
+the end, the modal export operator runs them in time slices between the
+redraws of blender's user interface. Closing a generator cancels the work
+it has not done yet.
+"""
+
+import time
+
+
+def run(steps):
+    """
+    Run a step generator to its end.
+
+    Returns:
+        The value returned by the generator.
+    """
+
+    while True:
+        try:
+            next(steps)
+        except StopIteration as e:
+            return e.value
+
+
+def scale(steps, start: float, end: float):
+    """
+    Map the progress of a step generator onto the range start to end of
+    an enclosing one (use with 'yield from').
+
+    Returns:
+        The value returned by steps. steps is closed along with the
+        enclosing generator.
+    """
+
+    try:
+        while True:
+            try:
+                progress = next(steps)
+            except StopIteration as e:
+                return e.value
+            yield start + progress * (end - start)
+    finally:
+        steps.close()
+
+
+def advance(steps, budget: float) -> (bool, float, object):
+    """
+    Run a step generator for about budget seconds.
+
+    Returns:
+        Whether the generator finished, the last progress and the value it
+        returned (None if it did not finish).
+    """
+
+    stop = time.perf_counter() + budget
+    progress = 0.
+    while True:
+        try:
+            progress = next(steps)
+        except StopIteration as e:
+            return True, 1., e.value
+        if time.perf_counter() >= stop:
+            return False, progress, None
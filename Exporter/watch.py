@@ -0,0 +1,212 @@
+"""
+Watch mode: re-export the model whenever the scene changes.
+
+The export operator remembers the file and settings of the last export
+(see remember_export). While watching, a depsgraph_update_post handler
+collects the names of the mesh objects that changed, a timer waits until
+the edits have stopped for DEBOUNCE_INTERVAL seconds and then exports the
+model again. The fragments of the boxes are kept in memory between the
+exports, only the boxes of changed objects are hashed and rendered again
+(see function.write_objects).
+"""
+
+import time
+import traceback
+
+import bpy
+
+from MCExport.Exporter import cache
+from MCExport.Exporter import codegen
+from MCExport.Exporter import function
+
+
+# Seconds without changes before the model is exported again.
+DEBOUNCE_INTERVAL = 0.15
+
+_last_export = None
+_session = None
+
+
+class WatchSession:
+    """State of the watch mode between two exports.
+
+    Attributes:
+        settings: Dict with the filepath and the keyword arguments of
+                  function.write_data.
+        export_cache: In-memory cache.ExportCache with the fragments of
+                      the last export.
+        changed: Set of the names of the objects changed since the last
+                 export, None if everything has to be hashed again.
+        last_change: Time of the last change (time.perf_counter).
+        texture_size: Texture size of the last export.
+        objects: The exported objects and their parents (see
+                 get_exported_objects) when the scene was last checked.
+    """
+
+    def __init__(self, settings: dict):
+        self.settings = settings
+        self.export_cache = cache.ExportCache(None, codegen.get_template_salt())
+        self.changed = None
+        self.last_change = 0.
+        self.texture_size = None
+        self.objects = get_exported_objects()
+
+
+def remember_export(filepath: str, **settings):
+    """
+    Store the file and settings of a finished export, watch mode exports
+    with them.
+
+    Args:
+        filepath: Path of the exported '.java' file.
+        settings: Keyword arguments of function.write_data (except the
+                  profile and the cache).
+    """
+
+    global _last_export
+    _last_export = dict(settings, filepath=filepath)
+
+
+def get_last_export() -> dict:
+    """
+    The file and settings of the last export or None.
+    """
+
+    return _last_export
+
+
+def is_active() -> bool:
+    """
+    Whether watch mode is on. Loading another file removes the handler and
+    ends the watch mode as well.
+    """
+
+    return _session is not None and _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post
+
+
+def start():
+    """
+    Start watching with the settings of the last export. The model is
+    exported once right away to fill the cache.
+    """
+
+    global _session
+    stop()
+    _session = WatchSession(dict(_last_export))
+    bpy.app.handlers.depsgraph_update_post.append(_on_depsgraph_update)
+    bpy.app.timers.register(_on_timer, first_interval=DEBOUNCE_INTERVAL)
+
+
+def stop():
+    """
+    Stop watching. Pending changes are not exported anymore.
+    """
+
+    global _session
+    if _on_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(_on_depsgraph_update)
+    if bpy.app.timers.is_registered(_on_timer):
+        bpy.app.timers.unregister(_on_timer)
+    _session = None
+
+
+def get_exported_objects() -> dict:
+    """
+    Map the names of the exported mesh objects to the name of their
+    exported parent, None for roots (see function.get_mesh_objects). Adding,
+    removing, renaming or reparenting a box changes it.
+    """
+
+    out_objects = {}
+    for obj in bpy.data.objects:
+        if obj.type == "MESH":
+            parent = function.get_exported_parent(obj)
+            out_objects[obj.name] = parent.name if parent is not None else None
+    return out_objects
+
+
+def get_changed_objects(depsgraph) -> set:
+    """
+    Names of the mesh objects moved or reshaped by a depsgraph update. An
+    edited mesh changes all objects using it. Updates that touch nothing
+    exported (e.g. selecting an object) are ignored.
+
+    Args:
+        depsgraph: (bpy.types.Depsgraph) The updated dependency graph.
+
+    Returns:
+        A set of object names.
+    """
+
+    changed = set()
+    meshes = set()
+    for update in depsgraph.updates:
+        data = update.id.original
+        if isinstance(data, bpy.types.Object):
+            if data.type == "MESH" and (update.is_updated_transform or update.is_updated_geometry):
+                changed.add(data.name)
+        elif isinstance(data, bpy.types.Mesh) and update.is_updated_geometry:
+            meshes.add(data.name)
+    if meshes:
+        changed.update(obj.name for obj in bpy.data.objects if obj.type == "MESH" and obj.data.name in meshes)
+    return changed
+
+
+def _on_depsgraph_update(scene, depsgraph):
+    session = _session
+    if session is None:
+        return
+    changed = get_changed_objects(depsgraph)
+    objects = get_exported_objects()
+    if objects != session.objects:
+        # The hierarchy of the parts changed, everything is exported again.
+        session.objects = objects
+        session.changed = None
+    elif not changed:
+        return
+    elif session.changed is not None:
+        session.changed |= changed
+    session.last_change = time.perf_counter()
+    if not bpy.app.timers.is_registered(_on_timer):
+        bpy.app.timers.register(_on_timer, first_interval=DEBOUNCE_INTERVAL)
+
+
+def _on_timer():
+    session = _session
+    if session is None:
+        return None
+    wait = session.last_change + DEBOUNCE_INTERVAL - time.perf_counter()
+    if wait > 0.:
+        return wait
+    active_object = bpy.context.view_layer.objects.active
+    if active_object is not None and active_object.mode != "OBJECT":
+        # The mesh data is only updated when edit mode is left, which triggers another export.
+        return None
+    export(session)
+    return None
+
+
+def export(session: WatchSession):
+    """
+    Export the model with the settings of a watch session, reusing the
+    fragments of all objects that did not change.
+    """
+
+    start_time = time.perf_counter()
+    texture_size = function.get_texture_size(session.settings.get("texture_size"))
+    changed = session.changed if texture_size == session.texture_size else None
+    count = "all" if changed is None else str(len(changed))
+    session.changed = set()
+    session.export_cache.hits = session.export_cache.misses = 0
+    settings = dict(session.settings)
+    filepath = settings.pop("filepath")
+    try:
+        function.write_data(bpy.context, filepath, export_cache=session.export_cache, changed=changed, **settings)
+    except Exception:
+        traceback.print_exc()
+        # Hash everything again next time, the cache may be incomplete.
+        session.changed = None
+        return
+    session.texture_size = texture_size
+    print("Watch export: "+count+" changed objects, "
+          + format((time.perf_counter() - start_time) * 1000., ".0f")+" ms")
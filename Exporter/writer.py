@@ -0,0 +1,88 @@
+"""
+Output helpers for the exporter.
+
+Files are written to a temporary file in the target directory which is
+flushed to disk and renamed over the target only after everything has been
+written. An interrupted export therefore never leaves a truncated file
+behind. The content is streamed into the file piece by piece so the whole
+file never has to be held in memory.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+from MCExport.Exporter import profiling
+
+
+# Size of the write buffer of the output files.
+BUFFER_SIZE = 1 << 16
+
+
+@contextmanager
+def atomic_open(filepath: str, mode: str = "w", encoding: str = "utf-8"):
+    """
+    Open a file for writing which replaces filepath atomically on success.
+    The data is written to a temporary file in the same directory which is
+    fsynced and renamed over filepath when the with block is left without
+    an exception. Otherwise the temporary file is removed and filepath is
+    left untouched.
+
+    Args:
+        filepath: Path of the file to write.
+        mode: 'w' for text or 'wb' for binary files.
+        encoding: Encoding of text files.
+
+    Yields:
+        A buffered file object.
+    """
+
+    filepath = os.path.abspath(filepath)
+    directory, name = os.path.split(filepath)
+    fd, temp_path = tempfile.mkstemp(prefix="."+name+".", suffix=".tmp", dir=directory)
+    try:
+        # Keep the permissions of an existing file, mkstemp creates the file private.
+        if os.path.exists(filepath):
+            os.chmod(temp_path, os.stat(filepath).st_mode & 0o7777)
+        else:
+            os.chmod(temp_path, 0o644)
+        if "b" in mode:
+            file = os.fdopen(fd, mode, buffering=BUFFER_SIZE)
+        else:
+            file = os.fdopen(fd, mode, buffering=BUFFER_SIZE, encoding=encoding, newline="\n")
+        with file:
+            yield file
+            with profiling.phase("file write"):
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temp_path, filepath)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def write_sections(file, sections) -> int:
+    """
+    Write the strings yielded by a generator to a file.
+
+    Args:
+        file: An open text stream.
+        sections: Iterable of strings.
+
+    Returns:
+        The number of characters written.
+    """
+
+    count = 0
+    if profiling.get_active() is not None:
+        # Only the writing is booked here, generating the sections is up to the caller.
+        for section in sections:
+            with profiling.phase("file write"):
+                file.write(section)
+            count += len(section)
+        return count
+    for section in sections:
+        file.write(section)
+        count += len(section)
+    return count
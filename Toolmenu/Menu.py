@@ -1,8 +1,29 @@
+import contextlib
+import time
+
 import bpy
-import bmesh
-from bpy.props import BoolProperty, FloatVectorProperty, BoolVectorProperty, StringProperty
+from bpy.props import BoolProperty, FloatVectorProperty, BoolVectorProperty, StringProperty, EnumProperty, \
+    IntProperty, IntVectorProperty
+
+from MCExport.Exporter import watch
+from MCExport.Toolmenu import atlas, function
+
+
+@contextlib.contextmanager
+def object_mode(context):
+    """
+    Switch to object mode for the duration of the block (once for all
+    objects in edit mode) and back afterwards.
+    """
 
-from MCExport.Toolmenu import function
+    edit_mode = context.mode == 'EDIT_MESH'
+    if edit_mode:
+        bpy.ops.object.mode_set(mode='OBJECT')
+    try:
+        yield
+    finally:
+        if edit_mode:
+            bpy.ops.object.mode_set(mode='EDIT')
 
 
 class ToolsPanel(bpy.types.Panel):
@@ -18,7 +39,12 @@ class ToolsPanel(bpy.types.Panel):
     def draw(self, context):
         layout = self.layout
         layout.operator("button.addbox")
+        layout.operator("button.addboxes")
         layout.operator("button.unwrap")
+        layout.operator("button.unwrapselected")
+        layout.operator("button.pack")
+        layout.operator("button.watch", text="Stop watching" if watch.is_active() else "Watch export",
+                        depress=watch.is_active())
 
 
 class OBJECT_OT_addBoxButton(bpy.types.Operator):
@@ -55,28 +81,93 @@ class OBJECT_OT_addBoxButton(bpy.types.Operator):
         )
     
     def execute(self, context):
-        # Create the vertex and face arrays.
-        verts_loc, faces = function.create_box(1, 1, 1)
         # Create new mesh.
-        mesh = bpy.data.meshes.new("Box")
-        # Create new bmesh.
-        bm = bmesh.new()
-        # Put vertices into bmesh.
-        for v_co in verts_loc:
-            bm.verts.new(v_co)
-        bm.verts.ensure_lookup_table()
-        # Put faces into bmesh.
-        for f_idx in faces:
-            bm.faces.new([bm.verts[i] for i in f_idx])
-        # Update the mesh.
-        bm.to_mesh(mesh)
-        mesh.update()
+        mesh = function.create_box_mesh("Box", (2, 2, 2))
         # Add the mesh as an object into the scene with this utility module.
         from bpy_extras import object_utils
         object_utils.object_data_add(context, mesh, operator=self)
         return{'FINISHED'}
 
 
+class OBJECT_OT_addBoxesButton(bpy.types.Operator):
+    """Button that adds many boxes to the scene at once.
+    
+    The boxes are laid out on a grid, in a row or read from a csv file with
+    the columns dx, dy, dz, x, y, z and optionally u, v (texture offset).
+    Boxes with the same dimensions and uv layout share a mesh. If a texture
+    is active in the image editor the boxes are unwrapped for it.
+    """
+
+    bl_idname = "button.addboxes"
+    bl_label = "Add boxes"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    layout_mode = EnumProperty(
+        name="Layout",
+        items=(('GRID', "Grid", "Boxes of the same size on a regular grid"),
+               ('ARRAY', "Array", "A row of boxes of the same size"),
+               ('CSV', "CSV file", "Dimensions, locations and texture offsets from a csv file")),
+        default='GRID',
+        )
+    dimensions = IntVectorProperty(
+        name="Dimensions",
+        description="Dimensions of the boxes (grid and array)",
+        size=3,
+        min=1,
+        default=(2, 2, 2),
+        )
+    grid_counts = IntVectorProperty(
+        name="Counts",
+        description="Number of boxes in x, y and z direction",
+        size=3,
+        min=1,
+        default=(4, 4, 1),
+        )
+    spacing = FloatVectorProperty(
+        name="Spacing",
+        description="Gap between neighbouring boxes of the grid",
+        subtype='TRANSLATION',
+        default=(1., 1., 1.),
+        )
+    array_count = IntProperty(
+        name="Count",
+        description="Number of boxes in the array",
+        min=1,
+        default=8,
+        )
+    array_step = FloatVectorProperty(
+        name="Step",
+        description="Offset between neighbouring boxes of the array",
+        subtype='TRANSLATION',
+        default=(3., 0., 0.),
+        )
+    filepath = StringProperty(
+        name="CSV file",
+        subtype='FILE_PATH',
+        )
+
+    def execute(self, context):
+        start = time.time()
+        if self.layout_mode == 'GRID':
+            table = function.get_grid_table(self.grid_counts, self.dimensions, self.spacing)
+        elif self.layout_mode == 'ARRAY':
+            table = function.get_array_table(self.array_count, self.dimensions, self.array_step)
+        else:
+            try:
+                table = function.read_box_table(bpy.path.abspath(self.filepath))
+            except (OSError, ValueError) as e:
+                self.report({'ERROR'}, str(e))
+                return{'CANCELLED'}
+        active_image = OBJECT_OT_unwrapButton.get_active_texture_()
+        imagesize = None
+        if active_image is not None and active_image.size[0] > 0 and active_image.size[1] > 0:
+            imagesize = tuple(active_image.size)
+        objects, mesh_count = function.create_boxes(table, context.collection, imagesize)
+        self.report({'INFO'}, "Added {} boxes sharing {} meshes in {:.2f}s".format(
+            len(objects), mesh_count, time.time() - start))
+        return{'FINISHED'}
+
+
 class OBJECT_OT_unwrapButton(bpy.types.Operator):
     """
     Unwrap button that is used to unwrap the cube as done in MC.
@@ -105,3 +196,121 @@ class OBJECT_OT_unwrapButton(bpy.types.Operator):
             if area.type == 'IMAGE_EDITOR':
                 active_image = area.spaces.active.image
         return active_image
+
+
+class OBJECT_OT_unwrapSelectedButton(bpy.types.Operator):
+    """
+    Unwrap all selected boxes at once, each onto the top left corner of the
+    active texture. Works in object mode as well as in edit mode.
+    """
+
+    bl_idname = "button.unwrapselected"
+    bl_label = "Unwrap selected"
+
+    def execute(self, context):
+        active_image = OBJECT_OT_unwrapButton.get_active_texture_()
+        objects = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        with object_mode(context):
+            skipped = function.unwrap_boxes(objects, active_image.size)
+        if skipped:
+            self.report({'WARNING'}, "Skipped {} objects which are no boxes: {}".format(
+                len(skipped), ", ".join(obj.name for obj in skipped)))
+        else:
+            self.report({'INFO'}, "Unwrapped {} boxes".format(len(objects)))
+        return{'FINISHED'}
+
+    @classmethod
+    def poll(cls, context):
+        active_image = OBJECT_OT_unwrapButton.get_active_texture_()
+        return any(obj.type == 'MESH' for obj in context.selected_objects) \
+            and active_image is not None and active_image.size[0] > 0 and active_image.size[1] > 0
+
+
+class OBJECT_OT_watchButton(bpy.types.Operator):
+    """
+    Toggle the watch mode: re-export the model to the file of the last
+    export whenever the scene changes (see Exporter/watch.py).
+    """
+
+    bl_idname = "button.watch"
+    bl_label = "Watch export"
+
+    def execute(self, context):
+        if watch.is_active():
+            watch.stop()
+            self.report({'INFO'}, "Stopped watching")
+        else:
+            watch.start()
+            self.report({'INFO'}, "Watching, exporting to " + watch.get_last_export()["filepath"])
+        return{'FINISHED'}
+
+    @classmethod
+    def poll(cls, context):
+        return watch.is_active() or watch.get_last_export() is not None
+
+
+class OBJECT_OT_packButton(bpy.types.Operator):
+    """
+    Pack the texture areas of all boxes into the smallest possible texture.
+    Uses the selected boxes or all boxes of the scene if none is selected.
+    The uv layouts of the boxes are set accordingly and an image of the
+    packed size is shown in the image editors.
+    """
+
+    bl_idname = "button.pack"
+    bl_label = "Pack texture"
+
+    image_name = "Atlas"
+
+    def execute(self, context):
+        objects = [obj for obj in context.selected_objects if obj.type == 'MESH']
+        if not objects:
+            objects = [obj for obj in context.scene.objects if obj.type == 'MESH']
+        # Boxes sharing a mesh share their uv layout as well.
+        meshes = {}
+        for obj in objects:
+            if function.is_box(obj.data):
+                meshes.setdefault(obj.data.name, obj)
+        objects = list(meshes.values())
+        if not objects:
+            self.report({'WARNING'}, "There are no boxes to pack")
+            return{'CANCELLED'}
+        # The dimensions need to be integer-valued anyway (see the README).
+        dimensions = [tuple(int(d+0.499) for d in obj.dimensions) for obj in objects]
+        try:
+            size, positions, fill = atlas.pack_boxes(dimensions)
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
+            return{'CANCELLED'}
+        image = self.get_image_(size)
+        self.show_image_(image)
+        width, height = image.size
+        with object_mode(context):
+            function.unwrap_boxes(objects, (width, height), positions)
+        # The image might be larger than the packed size.
+        fill *= size[0] * size[1] / float(width * height)
+        self.report({'INFO'}, "Packed {} boxes into a {}x{} texture (fill {:.0%})".format(
+            len(objects), width, height, fill))
+        return{'FINISHED'}
+
+    @classmethod
+    def get_image_(cls, size):
+        """
+        The active image or the atlas image. Its canvas is enlarged if it
+        is smaller than the packed size, the painted pixels are kept.
+        """
+
+        image = OBJECT_OT_unwrapButton.get_active_texture_()
+        if image is None:
+            image = bpy.data.images.get(cls.image_name)
+        if image is None:
+            return bpy.data.images.new(cls.image_name, size[0], size[1])
+        if image.size[0] < size[0] or image.size[1] < size[1]:
+            function.grow_image(image, max(image.size[0], size[0]), max(image.size[1], size[1]))
+        return image
+
+    @classmethod
+    def show_image_(cls, image):
+        for area in bpy.context.screen.areas:
+            if area.type == 'IMAGE_EDITOR':
+                area.spaces.active.image = image
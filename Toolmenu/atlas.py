@@ -0,0 +1,180 @@
+"""
+Packing of the texture areas of boxes into a single texture.
+
+Every box needs a cross shaped area of its texture (see the uv layout in
+the README) which is covered by its bounding rectangle of
+2*(dx+dy) x (dy+dz) pixels. The rectangles are packed with a bottom-left
+skyline packer into the smallest power of two texture they fit in. Only the
+cross itself counts as used area of the texture.
+"""
+
+
+# Largest texture size that is tried.
+MAX_TEXTURE_SIZE = 8192
+
+
+def get_footprint(dimensions) -> (int, int):
+    """
+    Size of the texture area of a box.
+
+    Args:
+        dimensions: Integer dimensions dx, dy and dz of the box in blender
+                    space.
+
+    Returns:
+        Width and height of the area in pixels.
+    """
+
+    dx, dy, dz = dimensions
+    return 2 * (dx + dy), dy + dz
+
+
+def get_used_area(dimensions) -> int:
+    """
+    Number of pixels of the cross shaped texture area of a box (see
+    get_footprint for its bounding rectangle).
+    """
+
+    dx, dy, dz = dimensions
+    # Top and down faces above the four side faces.
+    return 2 * dx * dy + 2 * (dx + dy) * dz
+
+
+class Skyline:
+    """Bottom-left skyline packer for a fixed size texture.
+
+    The skyline is the list of segments (x, y, width) describing the lowest
+    free y (measured from the top of the texture) over every x.
+    """
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.segments = [(0, 0, width)]
+
+    def _get_position(self, index: int, width: int, height: int):
+        """
+        y position of a rectangle placed at the start of a segment or None
+        if it does not fit there.
+        """
+
+        x = self.segments[index][0]
+        if x + width > self.width:
+            return None
+        y = 0
+        remaining = width
+        while remaining > 0:
+            _, segment_y, segment_width = self.segments[index]
+            y = max(y, segment_y)
+            if y + height > self.height:
+                return None
+            remaining -= segment_width
+            index += 1
+        return y
+
+    def insert(self, width: int, height: int):
+        """
+        Place a rectangle as low (and then as far left) as possible.
+
+        Returns:
+            The position (x, y) of the rectangle's top left corner or None
+            if it does not fit anymore.
+        """
+
+        best = None
+        for i in range(len(self.segments)):
+            y = self._get_position(i, width, height)
+            if y is not None and (best is None or y < best[0]):
+                best = (y, i)
+        if best is None:
+            return None
+        y, index = best
+        x = self.segments[index][0]
+
+        # Replace the covered segments by the top of the new rectangle.
+        new_segments = self.segments[:index] + [(x, y + height, width)]
+        end = x + width
+        for segment_x, segment_y, segment_width in self.segments[index:]:
+            segment_end = segment_x + segment_width
+            if segment_end <= end:
+                continue
+            start = max(segment_x, end)
+            new_segments.append((start, segment_y, segment_end - start))
+        # Merge neighbouring segments of the same height.
+        self.segments = []
+        for segment in new_segments:
+            if self.segments and self.segments[-1][1] == segment[1]:
+                last = self.segments[-1]
+                self.segments[-1] = (last[0], last[1], last[2] + segment[2])
+            else:
+                self.segments.append(segment)
+        return x, y
+
+
+def pack(sizes: list, width: int, height: int):
+    """
+    Pack rectangles into a texture of the given size.
+
+    Args:
+        sizes: List of (width, height) tuples.
+        width, height: Size of the texture in pixels.
+
+    Returns:
+        A list with the (x, y) position of every rectangle (in the order of
+        sizes) or None if they do not fit.
+    """
+
+    skyline = Skyline(width, height)
+    # Placing large rectangles first wastes the least space.
+    order = sorted(range(len(sizes)), key=lambda i: (sizes[i][1], sizes[i][0]), reverse=True)
+    out_positions = [None] * len(sizes)
+    for i in order:
+        if sizes[i][0] == 0 or sizes[i][1] == 0:
+            out_positions[i] = (0, 0)
+            continue
+        position = skyline.insert(*sizes[i])
+        if position is None:
+            return None
+        out_positions[i] = position
+    return out_positions
+
+
+def get_texture_sizes(min_width: int, min_height: int, max_size: int = MAX_TEXTURE_SIZE):
+    """
+    List the power of two texture sizes of at least the given size,
+    smallest area first (and the squarer one first for equal areas).
+    """
+
+    widths = [1 << i for i in range(max_size.bit_length()) if (1 << i) >= min_width]
+    heights = [1 << i for i in range(max_size.bit_length()) if (1 << i) >= min_height]
+    sizes = [(width, height) for width in widths for height in heights]
+    return sorted(sizes, key=lambda size: (size[0] * size[1], abs(size[0] - size[1]), -size[0]))
+
+
+def pack_boxes(dimensions: list, max_size: int = MAX_TEXTURE_SIZE):
+    """
+    Pack the texture areas of boxes into the smallest power of two texture.
+
+    Args:
+        dimensions: List of the integer dimensions (dx, dy, dz) of the boxes.
+        max_size: Largest texture width and height.
+
+    Returns:
+        The texture size (width, height), the position (x, y) of the top
+        left corner of every box's area in pixels and the fill ratio (area
+        of the crosses / texture area, see get_used_area). Raises ValueError if the boxes do not fit into
+        the largest texture.
+    """
+
+    sizes = [get_footprint(dims) for dims in dimensions]
+    area = sum(width * height for width, height in sizes)
+    min_width = max([width for width, _ in sizes] + [1])
+    min_height = max([height for _, height in sizes] + [1])
+    for width, height in get_texture_sizes(min_width, min_height, max_size):
+        if width * height < area:
+            continue
+        positions = pack(sizes, width, height)
+        if positions is not None:
+            used = sum(get_used_area(dims) for dims in dimensions)
+            return (width, height), positions, used / float(width * height)
+    raise ValueError("The boxes do not fit into a "+str(max_size)+"x"+str(max_size)+" texture")
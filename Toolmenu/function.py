@@ -1,9 +1,183 @@
+import csv
+
 import bmesh
+import bpy
+import numpy as np
+
+
+# Texture area of every face of a box (in the face order of create_box) as
+# coefficients of the box dimensions (dx, dy, dz) in pixels: u and v (from
+# the top) of the area's top left corner and the area's width and height.
+FACE_AREAS = (
+    ((1, 1, 0), (0, 0, 0), (1, 0, 0), (0, 1, 0)),  # top
+    ((0, 1, 0), (0, 0, 0), (1, 0, 0), (0, 1, 0)),  # down
+    ((1, 1, 0), (0, 1, 0), (0, 1, 0), (0, 0, 1)),  # right
+    ((0, 1, 0), (0, 1, 0), (1, 0, 0), (0, 0, 1)),  # front
+    ((0, 0, 0), (0, 1, 0), (0, 1, 0), (0, 0, 1)),  # left
+    ((1, 2, 0), (0, 1, 0), (1, 0, 0), (0, 0, 1)),  # back
+)
+# Corner of the face's area (right, down) every loop of the face is put on.
+FACE_CORNERS = (
+    ((1, 1), (1, 0), (0, 0), (0, 1)),
+    ((1, 0), (0, 0), (0, 1), (1, 1)),
+    ((1, 1), (1, 0), (0, 0), (0, 1)),
+    ((1, 1), (1, 0), (0, 0), (0, 1)),
+    ((1, 1), (1, 0), (0, 0), (0, 1)),
+    ((0, 0), (0, 1), (1, 1), (1, 0)),
+)
+
+
+def get_corner_table() -> np.ndarray:
+    """
+    Combine FACE_AREAS and FACE_CORNERS into one table.
+
+    Returns:
+        Array of shape (24, 2, 3): for every loop of a box the coefficients
+        of (dx, dy, dz) giving its u and v (from the top) in pixels.
+    """
+
+    table = np.zeros((len(FACE_AREAS), 4, 2, 3))
+    for face, ((u, v, width, height), corners) in enumerate(zip(FACE_AREAS, FACE_CORNERS)):
+        for loop, (right, down) in enumerate(corners):
+            table[face, loop, 0] = np.add(u, np.multiply(right, width))
+            table[face, loop, 1] = np.add(v, np.multiply(down, height))
+    return table.reshape(-1, 2, 3)
+
+
+CORNER_TABLE = get_corner_table()
+
+
+def get_box_uvs(dimensions, imagesize, offsets) -> np.ndarray:
+    """
+    uv coordinates of the loops of many boxes at once.
+
+    Args:
+        dimensions: Array of shape (n, 3) with the box dimensions.
+        imagesize: Width and height of the texture in pixels.
+        offsets: Array of shape (n, 2) with the top left corners of the
+                 boxes' texture areas in pixels.
+
+    Returns:
+        Array of shape (n, 24, 2) with the uv coordinates of every loop.
+    """
+
+    pixels = np.einsum("lcd,nd->nlc", CORNER_TABLE, np.asarray(dimensions, dtype=np.float64))
+    pixels += np.asarray(offsets, dtype=np.float64)[:, None, :]
+    uvs = pixels / np.asarray(imagesize, dtype=np.float64)
+    uvs[:, :, 1] = 1. - uvs[:, :, 1]
+    return uvs
+
 
+def is_box(mesh) -> bool:
+    """
+    Check whether a mesh has the face layout of create_box (six quads).
+    """
+
+    if len(mesh.polygons) != len(FACE_AREAS) or len(mesh.loops) != 4*len(FACE_AREAS):
+        return False
+    loop_totals = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loop_totals)
+    return bool((loop_totals == 4).all())
+
+
+def unwrap_boxes(objects, imagesize, offsets=None) -> list:
+    """
+    Set the uv layouts of many boxes at once. Has to be called in object
+    mode, edit mode meshes overwrite the uv coordinates when left.
+
+    Args:
+        objects: List of box objects. Objects sharing a mesh are unwrapped
+                 by the first of them.
+        imagesize: Width and height of the texture in pixels.
+        offsets: Optional list with the top left corners of the boxes'
+                 texture areas in pixels (default: all at the top left
+                 corner of the texture).
+
+    Returns:
+        The list of objects which were skipped as they are no boxes.
+    """
+
+    if offsets is None:
+        offsets = [(0, 0)] * len(objects)
+    skipped = []
+    boxes = []
+    meshes = set()
+    for obj, offset in zip(objects, offsets):
+        if not is_box(obj.data):
+            skipped.append(obj)
+        elif obj.data.name not in meshes:
+            meshes.add(obj.data.name)
+            boxes.append((obj, offset))
+    if not boxes:
+        return skipped
+
+    uvs = get_box_uvs([obj.dimensions for obj, _ in boxes], imagesize, [offset for _, offset in boxes])
+    # The loops of every face follow each other, but the faces might not.
+    loop_starts = np.empty(len(FACE_AREAS), dtype=np.int32)
+    loop_indices = np.arange(4, dtype=np.int32)
+    for (obj, _), box_uvs in zip(boxes, uvs.astype(np.float32)):
+        mesh = obj.data
+        uv_layer = mesh.uv_layers.active or mesh.uv_layers.new()
+        mesh.polygons.foreach_get("loop_start", loop_starts)
+        order = (loop_starts[:, None] + loop_indices).ravel()
+        mesh_uvs = np.empty_like(box_uvs)
+        mesh_uvs[order] = box_uvs
+        uv_layer.data.foreach_set("uv", mesh_uvs.ravel())
+        mesh.update()
+    return skipped
+
+
+def grow_image(image, width: int, height: int):
+    """
+    Enlarge the canvas of an image without resampling it: the pixels stay
+    at the top left corner (where the uv layouts are measured from) and the
+    new area is transparent.
+
+    Args:
+        image: The blender image.
+        width, height: The new size in pixels, at least the current size.
+    """
+
+    old_width, old_height = image.size
+    # foreach_get/foreach_set of property arrays were added in blender 2.83.
+    fast_access = hasattr(image.pixels, "foreach_get")
+    if fast_access:
+        pixels = np.empty(old_width * old_height * 4, dtype=np.float32)
+        image.pixels.foreach_get(pixels)
+    else:
+        pixels = np.array(image.pixels[:], dtype=np.float32)
+    # Blender stores the rows from the bottom up.
+    grown = np.zeros((height, width, 4), dtype=np.float32)
+    grown[height - old_height:, :old_width] = pixels.reshape(old_height, old_width, 4)
+    # Only used to resize the buffer, its resampled pixels are overwritten.
+    image.scale(width, height)
+    if fast_access:
+        image.pixels.foreach_set(grown.ravel())
+    else:
+        image.pixels[:] = grown.ravel().tolist()
+    image.update()
+
+
+def set_uv(obj, imagesize, offset=(0, 0)):
+    """
+    Lay out the uv coordinates of a box as Minecraft expects them.
+    Works in edit mode as well as in object mode.
+    
+    Args:
+        obj: The box object.
+        imagesize: Width and height of the texture in pixels.
+        offset: Position of the top left corner of the box's texture area
+                in pixels (from the top left corner of the texture).
+    """
 
-def set_uv(obj, imagesize):
     mesh = obj.data
-    bm = bmesh.from_edit_mesh(mesh)
+    edit_mode = obj.mode == 'EDIT'
+    if edit_mode:
+        bm = bmesh.from_edit_mesh(mesh)
+    else:
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+    bm.faces.ensure_lookup_table()
     
     uv_layer = bm.loops.layers.uv.verify()
     # bm.faces.layers.tex.verify()  # currently blender needs both layers.
@@ -12,6 +186,8 @@ def set_uv(obj, imagesize):
     dy_u = obj.dimensions[1]/float(imagesize[0])
     dy_v = obj.dimensions[1]/float(imagesize[1])
     dz_v = obj.dimensions[2]/float(imagesize[1])
+    origin_u = offset[0]/float(imagesize[0])
+    origin_v = 1.-offset[1]/float(imagesize[1])
     offset_u = 0.
     offset_v = 1.
     right_offset = 0.
@@ -50,6 +226,9 @@ def set_uv(obj, imagesize):
             offset_v = 1.-dy_v
             right_offset = dx_u
             down_offset = dz_v
+        # Move the layout to the box's texture area.
+        offset_u += origin_u
+        offset_v -= 1.-origin_v
         n = 0
         for l in f.loops:
             luv = l[uv_layer]
@@ -95,7 +274,12 @@ def set_uv(obj, imagesize):
                     luv.uv[1] = offset_v
             n += 1
     
-    bmesh.update_edit_mesh(mesh)
+    if edit_mode:
+        bmesh.update_edit_mesh(mesh)
+    else:
+        bm.to_mesh(mesh)
+        bm.free()
+        mesh.update()
 
 
 def create_box(width, height, depth):
@@ -128,3 +312,139 @@ def create_box(width, height, depth):
     
     return verts, faces
 
+
+
+def get_grid_table(counts, dimensions, spacing=(0., 0., 0.)) -> list:
+    """
+    Parameters of boxes of the same size laid out on a regular grid.
+
+    Args:
+        counts: Number of boxes in x, y and z direction.
+        dimensions: Integer dimensions (dx, dy, dz) of the boxes.
+        spacing: Gap between neighbouring boxes.
+
+    Returns:
+        A list of (dimensions, location, texture offset) tuples.
+    """
+
+    dimensions = tuple(dimensions)
+    steps = [d + gap for d, gap in zip(dimensions, spacing)]
+    return [(dimensions, (i*steps[0], j*steps[1], k*steps[2]), (0, 0))
+            for k in range(counts[2]) for j in range(counts[1]) for i in range(counts[0])]
+
+
+def get_array_table(count: int, dimensions, step) -> list:
+    """
+    Parameters of a row of boxes of the same size, each moved by step from
+    the previous one.
+
+    Returns:
+        A list of (dimensions, location, texture offset) tuples.
+    """
+
+    dimensions = tuple(dimensions)
+    return [(dimensions, tuple(i*s for s in step), (0, 0)) for i in range(count)]
+
+
+def read_box_table(path: str) -> list:
+    """
+    Read box parameters from a csv file with the columns
+    dx, dy, dz, x, y, z and optionally u, v (texture offset in pixels).
+    Empty lines, lines starting with '#' and a header line (the first line
+    if it does not start with a number) are skipped. Empty u and v cells
+    default to 0.
+
+    Returns:
+        A list of (dimensions, location, texture offset) tuples.
+
+    Raises:
+        ValueError: If a line does not hold 6 or 8 columns, a cell is no
+                    number or one of the first 6 cells is empty. The
+                    message names the line.
+    """
+
+    table = []
+    first_line = True
+    with open(path, newline="") as f:
+        for line, row in enumerate(csv.reader(f), 1):
+            row = [cell.strip() for cell in row]
+            # A trailing separator does not add a column.
+            while row and not row[-1]:
+                row.pop()
+            if not row or row[0].startswith("#"):
+                continue
+            # Only the first line may be a header, it does not start with a number.
+            if first_line:
+                first_line = False
+                try:
+                    float(row[0])
+                except ValueError:
+                    continue
+            try:
+                if len(row) not in (6, 8):
+                    raise ValueError("needs 6 or 8 columns, got "+str(len(row)))
+                if not all(row[:6]):
+                    raise ValueError("column "+str(row.index("")+1)+" is empty")
+                values = [float(cell) for cell in row[:6]]
+                offset = tuple(int(float(cell)) if cell else 0 for cell in row[6:8]) or (0, 0)
+            except ValueError as e:
+                raise ValueError("Line "+str(line)+" of "+path+": "+str(e))
+            dimensions = tuple(int(d+0.499) for d in values[:3])
+            table.append((dimensions, tuple(values[3:6]), offset))
+    return table
+
+
+def create_box_mesh(name: str, dimensions, imagesize=None, offset=(0, 0)):
+    """
+    Create a box mesh of the given size in a single from_pydata call.
+
+    Args:
+        name: Name of the mesh.
+        dimensions: Dimensions (dx, dy, dz) of the box.
+        imagesize: Optional width and height of the texture. If given, the
+                   box is unwrapped with its texture area at offset.
+
+    Returns:
+        The new bpy.types.Mesh.
+    """
+
+    dx, dy, dz = dimensions
+    verts, faces = create_box(dx/2., dz/2., dy/2.)
+    mesh = bpy.data.meshes.new(name)
+    mesh.from_pydata(verts, [], faces)
+    if imagesize is not None:
+        uvs = get_box_uvs([dimensions], imagesize, [offset])[0]
+        mesh.uv_layers.new().data.foreach_set("uv", uvs.astype(np.float32).ravel())
+    mesh.update()
+    return mesh
+
+
+def create_boxes(table: list, collection, imagesize=None, name: str = "Box") -> (list, int):
+    """
+    Create box objects from a parameter table. Boxes with the same
+    dimensions and uv layout share a mesh.
+
+    Args:
+        table: List of (dimensions, location, texture offset) tuples.
+        collection: Collection the objects are linked to.
+        imagesize: Optional texture size the boxes are unwrapped for.
+        name: Name prefix of the objects and meshes.
+
+    Returns:
+        The list of new objects and the number of new meshes.
+    """
+
+    meshes = {}
+    objects = []
+    for i, (dimensions, location, offset) in enumerate(table):
+        # Without a texture the offset does not change the mesh.
+        key = (tuple(dimensions), tuple(offset) if imagesize is not None else None)
+        mesh = meshes.get(key)
+        if mesh is None:
+            mesh = meshes[key] = create_box_mesh("{}_{}x{}x{}".format(name, *dimensions), dimensions,
+                                                 imagesize, offset)
+        obj = bpy.data.objects.new("{}_{}".format(name, i), mesh)
+        obj.location = location
+        collection.objects.link(obj)
+        objects.append(obj)
+    return objects, len(meshes)
@@ -9,15 +9,21 @@ bl_info = {
     "category":     "Import-Export"
 }
 
-import bpy
-
-from MCExport.Exporter import MinecraftCubeModelExporter
-from MCExport.Toolmenu import Menu
+# Blender modules are only imported on registration so the package itself can be
+# imported by the command line tools outside of blender.
 
 
 def register():
+    import bpy
+    from MCExport.Exporter import MinecraftCubeModelExporter
+    from MCExport.Toolmenu import Menu
+
     bpy.utils.register_class(Menu.OBJECT_OT_unwrapButton)
+    bpy.utils.register_class(Menu.OBJECT_OT_unwrapSelectedButton)
     bpy.utils.register_class(Menu.OBJECT_OT_addBoxButton)
+    bpy.utils.register_class(Menu.OBJECT_OT_addBoxesButton)
+    bpy.utils.register_class(Menu.OBJECT_OT_packButton)
+    bpy.utils.register_class(Menu.OBJECT_OT_watchButton)
     bpy.utils.register_class(Menu.ToolsPanel)
     bpy.utils.register_class(MinecraftCubeModelExporter.MinecraftCubeModelExporter)
     # Add the operator to the dynamic menu "INFO_MT_file_export"
@@ -25,8 +31,18 @@ def register():
 
 
 def unregister():
+    import bpy
+    from MCExport.Exporter import MinecraftCubeModelExporter
+    from MCExport.Exporter import watch
+    from MCExport.Toolmenu import Menu
+
+    watch.stop()
     bpy.utils.unregister_class(Menu.OBJECT_OT_unwrapButton)
+    bpy.utils.unregister_class(Menu.OBJECT_OT_unwrapSelectedButton)
     bpy.utils.unregister_class(Menu.OBJECT_OT_addBoxButton)
+    bpy.utils.unregister_class(Menu.OBJECT_OT_addBoxesButton)
+    bpy.utils.unregister_class(Menu.OBJECT_OT_packButton)
+    bpy.utils.unregister_class(Menu.OBJECT_OT_watchButton)
     bpy.utils.unregister_class(Menu.ToolsPanel)
     bpy.utils.unregister_class(MinecraftCubeModelExporter.MinecraftCubeModelExporter)
     bpy.types.TOPBAR_MT_file_export.remove(MinecraftCubeModelExporter.menu_func_export)
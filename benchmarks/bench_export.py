@@ -0,0 +1,234 @@
+"""
+Benchmarks of the export pipeline on synthetic scenes.
+
+The scenes are generated directly in the model representation (see
+Exporter/model.py) and as keyframe data for the bake engine, so blender is
+not needed. Every scenario runs the export phases one after another and
+reports the wall time (best of several runs) and the peak memory allocated
+(measured with tracemalloc in a separate run) per phase.
+
+Usage (the directory containing the MCExport folder is put on the path):
+    python MCExport/benchmarks/bench_export.py [--quick] [--save-baseline]
+
+Without --save-baseline the results are compared against the stored
+baseline and the script exits with 1 if a phase got slower or needs more
+memory than the tolerance allows, and with 2 if there is no baseline.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+import numpy as np
+
+from MCExport.Exporter import bake
+from MCExport.Exporter import codegen
+from MCExport.Exporter import model
+from MCExport.Exporter import reduce
+from MCExport.Exporter import writer
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+BOX_COUNTS = (10, 100, 1000, 10000, 100000)
+FRAME_COUNTS = (100, 1000, 10000)
+# Number of animated parts in the animation scenarios.
+ANIMATED_PARTS = 80
+# Distance between two keyframes of the synthetic fcurves.
+KEYFRAME_SPACING = 5
+
+
+def make_model(box_count: int, seed: int = 0) -> model.Model:
+    """
+    Generate a model of randomly placed and rotated boxes.
+    """
+
+    rng = random.Random(seed)
+    parts = []
+    for i in range(box_count):
+        box = model.Box(rng.randrange(0, 64), rng.randrange(0, 64),
+                        rng.uniform(-4., 0.), rng.uniform(-4., 0.), rng.uniform(-4., 0.),
+                        rng.randrange(1, 8), rng.randrange(1, 8), rng.randrange(1, 8))
+        parts.append(model.Part("box"+str(i), (rng.uniform(-16., 16.), rng.uniform(0., 24.), rng.uniform(-16., 16.)),
+                                (rng.uniform(-1., 1.), rng.uniform(-1., 1.), rng.uniform(-1., 1.)), [box]))
+    return model.Model("Benchmark", 64, 64, parts)
+
+
+def make_fcurves(channel_count: int, frame_count: int, seed: int = 0) -> list:
+    """
+    Generate keyframe data with a keyframe every KEYFRAME_SPACING frames and
+    a mix of constant, linear and bezier interpolation.
+    """
+
+    rng = np.random.default_rng(seed)
+    out_fcurves = []
+    for _ in range(channel_count):
+        x = np.arange(0., frame_count + KEYFRAME_SPACING, KEYFRAME_SPACING)
+        co = np.column_stack((x, rng.uniform(-1., 1., len(x))))
+        handle = np.column_stack((np.full(len(x), KEYFRAME_SPACING / 3.), rng.uniform(-.3, .3, len(x))))
+        interpolation = rng.choice([bake.INTERPOLATION_CONSTANT, bake.INTERPOLATION_LINEAR,
+                                    bake.INTERPOLATION_BEZIER, bake.INTERPOLATION_BEZIER], len(x))
+        out_fcurves.append(bake.FCurveData(co, co - handle, co + handle, interpolation.astype(np.int32),
+                                           "CONSTANT"))
+    return out_fcurves
+
+
+def phase_scene(state):
+    state["model"] = make_model(state["boxes"])
+
+
+def phase_bake(state):
+    frames = np.arange(state["frames"], dtype=np.float64)
+    state["baked"] = [bake.evaluate_keyframes(data, frames)[0].astype(np.float32) for data in state["fcurves"]]
+
+
+def phase_reduce(state):
+    runtime_channels = model.PIVOT_CHANNELS + model.ANGLE_CHANNELS
+    tracks = []
+    for i in range(state["boxes"]):
+        baked = state["baked"][i * len(model.CHANNEL_NAMES):(i + 1) * len(model.CHANNEL_NAMES)]
+        tracks.append(model.Track("box"+str(i), {name: values for name, values in zip(runtime_channels, baked)}))
+    state["clip"] = model.Clip("benchmark", 0, state["frames"], tracks)
+    reduce.reduce_clips([state["clip"]])
+
+
+def phase_codegen(state):
+    out = io.StringIO()
+    codegen.write_model(out, state["model"])
+    state["java"] = out.getvalue()
+
+
+def phase_write(state):
+    path = os.path.join(state["directory"], "Model"+state["model"].name+".java")
+    with writer.atomic_open(path) as file:
+        file.write(state["java"])
+
+
+def get_scenarios(quick: bool) -> list:
+    """
+    List the scenarios as (name, initial state, phases) tuples.
+    """
+
+    out_scenarios = []
+    for boxes in BOX_COUNTS:
+        if quick and boxes > 10000:
+            continue
+        out_scenarios.append(("boxes_"+str(boxes), {"boxes": boxes},
+                              [("scene scan", phase_scene), ("code generation", phase_codegen),
+                               ("file write", phase_write)]))
+    for frames in FRAME_COUNTS:
+        out_scenarios.append(("clip_"+str(frames), {"boxes": ANIMATED_PARTS, "frames": frames},
+                              [("scene scan", phase_scene), ("animation bake", phase_bake),
+                               ("keyframe reduction", phase_reduce)]))
+    return out_scenarios
+
+
+def prepare(state):
+    if "frames" in state:
+        state["fcurves"] = make_fcurves(state["boxes"] * 9, state["frames"])
+
+
+def run_scenario(initial_state: dict, phases: list, repeat: int, directory: str) -> dict:
+    """
+    Run the phases of a scenario.
+
+    Returns:
+        A dict mapping phase names to dicts with the best wall time in
+        seconds ('time') and the peak memory in bytes ('peak').
+    """
+
+    results = {name: {"time": float("inf"), "peak": 0} for name, _ in phases}
+    for _ in range(repeat):
+        state = dict(initial_state, directory=directory)
+        prepare(state)
+        for name, phase in phases:
+            start = time.perf_counter()
+            phase(state)
+            results[name]["time"] = min(results[name]["time"], time.perf_counter() - start)
+
+    # Measure memory separately, tracemalloc slows everything down.
+    state = dict(initial_state, directory=directory)
+    prepare(state)
+    tracemalloc.start()
+    try:
+        for name, phase in phases:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            phase(state)
+            results[name]["peak"] = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def compare(results: dict, baseline: dict, time_tolerance: float, memory_tolerance: float) -> list:
+    """
+    Compare results against a baseline.
+
+    Returns:
+        A list of messages describing the regressions.
+    """
+
+    out_regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        base = baseline[key]
+        # Small absolute slack so timer noise of tiny phases does not count.
+        if result["time"] > base["time"] * (1. + time_tolerance) + 0.002:
+            out_regressions.append("{}: time {:.2f} ms > baseline {:.2f} ms".format(
+                key, result["time"] * 1e3, base["time"] * 1e3))
+        if result["peak"] > base["peak"] * (1. + memory_tolerance) + 65536:
+            out_regressions.append("{}: peak memory {:.0f} KiB > baseline {:.0f} KiB".format(
+                key, result["peak"] / 1024., base["peak"] / 1024.))
+    return out_regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the export pipeline on synthetic scenes.")
+    parser.add_argument("--quick", action="store_true", help="Skip the largest scenes.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs per scenario.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file.")
+    parser.add_argument("--save-baseline", action="store_true", help="Store the results as new baseline.")
+    parser.add_argument("--time-tolerance", type=float, default=0.25,
+                        help="Allowed relative slowdown per phase (default: 0.25).")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10,
+                        help="Allowed relative increase of the peak memory per phase (default: 0.10).")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print("{:<16} {:<18} {:>12} {:>14}".format("scenario", "phase", "time [ms]", "peak [KiB]"))
+    with tempfile.TemporaryDirectory() as directory:
+        for scenario, state, phases in get_scenarios(args.quick):
+            for phase, result in run_scenario(state, phases, max(1, args.repeat), directory).items():
+                results[scenario+"/"+phase] = result
+                print("{:<16} {:<18} {:>12.2f} {:>14.0f}".format(scenario, phase, result["time"] * 1e3,
+                                                                  result["peak"] / 1024.))
+
+    if args.save_baseline:
+        with writer.atomic_open(args.baseline) as file:
+            json.dump(results, file, indent=1, sort_keys=True)
+        print("Baseline written to "+args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline found at "+args.baseline+", run with --save-baseline to create one.",
+              file=sys.stderr)
+        return 2
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline, args.time_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print("Regression: "+regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
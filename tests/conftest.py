@@ -0,0 +1,19 @@
+"""
+Make the addon importable as the package MCExport, whatever the name of the
+checked out folder is. The tests only cover the modules that work without
+blender.
+"""
+
+import importlib.util
+import os
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if "MCExport" not in sys.modules:
+    spec = importlib.util.spec_from_file_location("MCExport", os.path.join(ROOT, "__init__.py"),
+                                                  submodule_search_locations=[ROOT])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["MCExport"] = package
+    spec.loader.exec_module(package)
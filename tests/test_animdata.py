@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from MCExport.Exporter import animdata
+from MCExport.Exporter import model
+
+
+def make_clips() -> list:
+    walk = model.Clip("walk", 0, 5, [
+        model.Track("body", {"pivot_y": [0., 1., 2., 1., 0.], "angle_x": [0., 0.1, 0.2, 0.1, 0.]}),
+        model.Track("head", {}),
+    ])
+    walk.tracks[1].set_channel("angle_z", [0.5, -0.5], keyframes=[0, 4])
+    idle = model.Clip("idle", 1, 3, [model.Track("head", {"pivot_x": [2., 2.5, 3.]})])
+    return [walk, idle]
+
+
+def write(clips, encoding) -> bytes:
+    file = io.BytesIO()
+    written = animdata.write_animation_data(file, ["body", "head"], clips, encoding)
+    data = file.getvalue()
+    assert written == len(data)
+    return data
+
+
+def test_float_round_trip():
+    part_count, clips = animdata.read_animation_data(write(make_clips(), animdata.ENCODING_FLOAT32))
+    assert part_count == 2
+    (walk_frames, walk), (idle_frames, idle) = clips
+    assert (walk_frames, idle_frames) == (5, 3)
+    pivot_y = model.CHANNEL_NAMES.index("pivot_y")
+    angle_x = model.CHANNEL_NAMES.index("angle_x")
+    angle_z = model.CHANNEL_NAMES.index("angle_z")
+    assert walk[(0, pivot_y)] == [0., 1., 2., 1., 0.]
+    assert walk[(0, angle_x)] == pytest.approx([0., 0.1, 0.2, 0.1, 0.])
+    assert walk[(1, angle_z)] == ([0, 4], [0.5, -0.5])
+    assert idle == {(1, model.CHANNEL_NAMES.index("pivot_x")): [2., 2.5, 3.]}
+
+
+def test_quantized_round_trip():
+    _, clips = animdata.read_animation_data(write(make_clips(), animdata.ENCODING_INT16))
+    walk = clips[0][1]
+    values = walk[(0, model.CHANNEL_NAMES.index("pivot_y"))]
+    # The values are restored up to half a quantization step.
+    assert values == pytest.approx([0., 1., 2., 1., 0.], abs=2. / 65535.)
+    keyframes, values = walk[(1, model.CHANNEL_NAMES.index("angle_z"))]
+    assert keyframes == [0, 4]
+    assert values == pytest.approx([0.5, -0.5], abs=1. / 65535.)
+
+
+def test_payload_is_aligned():
+    data = write(make_clips(), animdata.ENCODING_INT16)
+    assert len(data) % 4 == 0
+    position = animdata.HEADER.size + animdata.CLIP_HEADER.size
+    offset = animdata.CHANNEL_ENTRY.unpack_from(data, position)[4]
+    assert offset % 4 == 0
+
+
+def test_other_versions_are_rejected():
+    data = bytearray(write(make_clips(), animdata.ENCODING_FLOAT32))
+    data[4] += 1
+    with pytest.raises(ValueError):
+        animdata.read_animation_data(bytes(data))
@@ -0,0 +1,49 @@
+import random
+
+import pytest
+
+from MCExport.Toolmenu import atlas
+
+
+def get_rectangles(dimensions, positions) -> list:
+    return [(x, y, x + width, y + height)
+            for (x, y), (width, height) in zip(positions, map(atlas.get_footprint, dimensions))]
+
+
+def overlaps(a, b) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_packed_areas_do_not_overlap(seed):
+    rng = random.Random(seed)
+    dimensions = [tuple(rng.randint(1, 12) for _ in range(3)) for _ in range(60)]
+    (width, height), positions, fill = atlas.pack_boxes(dimensions)
+    rectangles = get_rectangles(dimensions, positions)
+    for rectangle in rectangles:
+        assert 0 <= rectangle[0] and rectangle[2] <= width
+        assert 0 <= rectangle[1] and rectangle[3] <= height
+    for i, a in enumerate(rectangles):
+        for b in rectangles[i + 1:]:
+            assert not overlaps(a, b)
+    assert 0. < fill <= 1.
+    # Powers of two.
+    assert width & (width - 1) == 0 and height & (height - 1) == 0
+
+
+def test_fill_counts_the_cross_only():
+    # An 8x8x8 box needs a 32x16 rectangle, but its cross covers 6 faces of 8x8 pixels.
+    size, positions, fill = atlas.pack_boxes([(8, 8, 8)])
+    assert size == (32, 16)
+    assert positions == [(0, 0)]
+    assert fill == pytest.approx(6 * 64 / (32 * 16))
+
+
+def test_smallest_texture_is_chosen():
+    size, _, _ = atlas.pack_boxes([(2, 2, 2)] * 4)
+    assert size == (16, 8)
+
+
+def test_too_many_boxes():
+    with pytest.raises(ValueError):
+        atlas.pack_boxes([(8, 8, 8)] * 5, max_size=32)
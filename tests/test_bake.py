@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from MCExport.Exporter import bake
+
+
+def make_fcurve(points, interpolation, extrapolation="CONSTANT", handles=None):
+    co = np.array(points, dtype=np.float64)
+    if handles is None:
+        # Flat handles one frame away from the keyframes.
+        handle_left = co - [1., 0.]
+        handle_right = co + [1., 0.]
+    else:
+        handle_left, handle_right = (np.array(h, dtype=np.float64) for h in handles)
+    return bake.FCurveData(co, handle_left, handle_right, np.full(len(co), interpolation, dtype=np.int32),
+                           extrapolation)
+
+
+def test_empty_and_single_keyframe():
+    values, unsupported = bake.evaluate_keyframes(make_fcurve(np.zeros((0, 2)), bake.INTERPOLATION_LINEAR),
+                                                  [0., 5.])
+    assert values.tolist() == [0., 0.]
+    values, unsupported = bake.evaluate_keyframes(make_fcurve([(3., 2.5)], bake.INTERPOLATION_LINEAR), [0., 5.])
+    assert values.tolist() == [2.5, 2.5]
+    assert not unsupported.any()
+
+
+def test_constant_and_linear_segments():
+    points = [(0., 0.), (10., 5.), (20., -5.)]
+    values, _ = bake.evaluate_keyframes(make_fcurve(points, bake.INTERPOLATION_CONSTANT), [0., 9.9, 10., 15., 20.])
+    assert values.tolist() == [0., 0., 5., 5., -5.]
+    values, _ = bake.evaluate_keyframes(make_fcurve(points, bake.INTERPOLATION_LINEAR), [0., 5., 10., 15., 20.])
+    assert values == pytest.approx([0., 2.5, 5., 0., -5.])
+
+
+def test_extrapolation():
+    points = [(0., 0.), (10., 5.)]
+    frames = [-10., 30.]
+    values, _ = bake.evaluate_keyframes(make_fcurve(points, bake.INTERPOLATION_LINEAR), frames)
+    assert values.tolist() == [0., 5.]
+    values, _ = bake.evaluate_keyframes(make_fcurve(points, bake.INTERPOLATION_LINEAR, "LINEAR"), frames)
+    assert values == pytest.approx([-5., 15.])
+
+
+def test_bezier_with_collinear_handles_is_linear():
+    points = [(0., 0.), (9., 9.)]
+    handles = ([(-3., -3.), (6., 6.)], [(3., 3.), (12., 12.)])
+    frames = np.linspace(0., 9., 10)
+    values, _ = bake.evaluate_keyframes(make_fcurve(points, bake.INTERPOLATION_BEZIER, handles=handles), frames)
+    assert values == pytest.approx(frames, abs=1e-6)
+
+
+def test_bezier_with_flat_handles_eases():
+    points = [(0., 0.), (10., 10.)]
+    values, _ = bake.evaluate_keyframes(make_fcurve(points, bake.INTERPOLATION_BEZIER), np.linspace(0., 10., 11))
+    assert [values[0], values[-1]] == pytest.approx([0., 10.])
+    assert values[5] == pytest.approx(5.)
+    assert (np.diff(values) >= 0.).all()
+    assert values[1] < 1.
+
+
+def test_easing_is_left_to_blender():
+    fcurve = make_fcurve([(0., 0.), (10., 1.), (20., 0.)], bake.INTERPOLATION_LINEAR)
+    fcurve.interpolation[1] = bake.INTERPOLATION_BEZIER + 1
+    _, unsupported = bake.evaluate_keyframes(fcurve, [5., 15., 25.])
+    assert unsupported.tolist() == [False, True, False]
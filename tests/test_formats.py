@@ -0,0 +1,23 @@
+from MCExport.Exporter import bedrock
+from MCExport.Exporter import blockbench
+from MCExport.Exporter import model
+
+
+def make_model() -> model.Model:
+    # Parts are flagged as mirrored by default, which the java class does not apply to its boxes.
+    body = model.Part("body", (0., 12., 0.), boxes=[model.Box(4, 2, -4., -6., -2., 8, 12, 4)])
+    return model.Model("Test", 64, 32, [body])
+
+
+def test_geometry_is_not_mirrored():
+    bone, = bedrock.get_geometry(make_model())["minecraft:geometry"][0]["bones"]
+    assert "mirror" not in bone
+    assert bone["cubes"][0]["uv"] == [4, 2]
+
+
+def test_project_uses_the_java_texture_layout():
+    cube, = blockbench.get_project(make_model())["elements"]
+    assert cube["mirror_uv"] is False
+    # Box uv of a 8x12x4 box at (4, 2): east is the first face of the side row.
+    assert cube["faces"]["east"]["uv"] == [4, 6, 8, 18]
+    assert cube["faces"]["north"]["uv"] == [8, 6, 16, 18]
@@ -0,0 +1,68 @@
+import pytest
+
+from MCExport.Exporter import lod
+from MCExport.Exporter import model
+
+
+def make_part(name, size, *children) -> model.Part:
+    part = model.Part(name, boxes=[model.Box(0, 0, 0., 0., 0., size, 1, 1)])
+    part.children.extend(children)
+    return part
+
+
+def make_model() -> model.Model:
+    # body (12 pixels) > arm (8) > hand (2), and a separate tail (4).
+    body = make_part("body", 12, make_part("arm", 8, make_part("hand", 2)))
+    return model.Model("Test", 64, 32, [body, make_part("tail", 4)])
+
+
+@pytest.mark.parametrize("text, expected", [("", ()), ("24", (24.,)), (" 24, 48.5 ,", (24., 48.5))])
+def test_parse_distances(text, expected):
+    assert lod.parse_distances(text) == expected
+
+
+@pytest.mark.parametrize("text", ["48, 24", "24, 24", "0", "-5", "far"])
+def test_parse_invalid_distances(text):
+    with pytest.raises(ValueError):
+        lod.parse_distances(text)
+
+
+def test_projected_size_shrinks_with_distance():
+    near = lod.get_projected_size(8., 10.)
+    assert lod.get_projected_size(8., 20.) == pytest.approx(near / 2.)
+    assert lod.get_projected_size(16., 20.) == pytest.approx(near)
+
+
+def test_part_sizes_include_children():
+    model_data = make_model()
+    model_data.parts[0].boxes[0].inflate = 0.5
+    sizes = lod.get_part_sizes(model_data)
+    assert sizes == {"body": 13., "arm": 8., "hand": 2., "tail": 4.}
+
+
+def get_distance(size: float) -> float:
+    """Distance from which something of the given size is hidden."""
+
+    return lod.get_projected_size(size, 1.) / lod.MIN_SCREEN_SIZE
+
+
+def test_hidden_levels():
+    model_data = make_model()
+    # Slightly beyond the distances the hand and the tail, the arm and the body get too small.
+    distances = (get_distance(2.) * 1.01, get_distance(4.) * 1.01, get_distance(8.) * 1.01)
+    levels = lod.get_hidden_levels(model_data, distances)
+    assert levels == {"body": 0, "arm": 3, "hand": 1, "tail": 2}
+    hidden = lod.get_hidden_parts(model_data, levels, len(distances) + 1)
+    # Children are not listed once their parent is hidden.
+    assert hidden == [[], ["hand"], ["hand", "tail"], ["arm", "tail"]]
+
+
+def test_static_parts_are_always_shown():
+    levels = lod.get_hidden_levels(make_model(), (1000.,), static_roots={"body"})
+    assert levels == {"body": 0, "arm": 0, "hand": 0, "tail": 1}
+
+
+def test_report():
+    report = lod.get_report({"body": 0, "arm": 2, "hand": 1}, (24., 48.))
+    assert report.splitlines() == ["Level of detail 1 (from 24 blocks): 1 of 3 ModelRenderers hidden",
+                                   "Level of detail 2 (from 48 blocks): 2 of 3 ModelRenderers hidden"]
@@ -0,0 +1,95 @@
+import pytest
+
+from MCExport.Exporter import model
+from MCExport.Exporter import occlusion
+
+
+# Bits of the faces in the order of occlusion.FACES.
+POSITIVE_X = 1 << 0
+NEGATIVE_X = 1 << 1
+
+
+def make_model(*parts) -> model.Model:
+    return model.Model("Test", 64, 32, list(parts))
+
+
+def make_part(name, *boxes, pivot=(0., 0., 0.), angles=(0., 0., 0.)) -> model.Part:
+    return model.Part(name, pivot, angles, [model.Box(0, 0, *offset, *size) for offset, size in boxes])
+
+
+def get_hidden_faces(model_data) -> list:
+    return [box.hidden_faces for part in model_data.iter_parts() for box in part.boxes]
+
+
+def test_touching_faces_are_covered():
+    model_data = make_model(make_part("a", ((0., 0., 0.), (2, 2, 2))),
+                            make_part("b", ((2., 0., 0.), (2, 2, 2))))
+    assert occlusion.cull_hidden_faces(model_data) == (2, 12, 0)
+    assert get_hidden_faces(model_data) == [POSITIVE_X, NEGATIVE_X]
+
+
+def test_partly_covered_face_is_kept():
+    model_data = make_model(make_part("a", ((0., 0., 0.), (4, 4, 4)), ((4., 0., 0.), (2, 2, 2))))
+    occlusion.cull_hidden_faces(model_data)
+    # The small box is covered by the big one, but not the other way around.
+    assert get_hidden_faces(model_data) == [0, NEGATIVE_X]
+
+
+def test_face_covered_by_several_boxes():
+    model_data = make_model(make_part("a", ((0., 0., 0.), (2, 4, 2)), ((2., 0., 0.), (2, 2, 2)),
+                                      ((2., 2., 0.), (2, 2, 2))))
+    occlusion.cull_hidden_faces(model_data)
+    assert get_hidden_faces(model_data)[0] == POSITIVE_X
+
+
+def test_buried_box_is_hidden_entirely():
+    outer = [((x, y, z), (1, 1, 1)) for x in (-1., 0., 1.) for y in (-1., 0., 1.) for z in (-1., 0., 1.)
+             if (x, y, z) != (0., 0., 0.)]
+    model_data = make_model(make_part("a", ((0., 0., 0.), (1, 1, 1)), *outer))
+    hidden_count, face_count, hidden_boxes = occlusion.cull_hidden_faces(model_data)
+    assert get_hidden_faces(model_data)[0] == occlusion.ALL_FACES
+    assert hidden_boxes == 1
+    assert face_count == 27 * 6
+
+
+def test_rotated_parts_sharing_a_rotation():
+    angles = (0.3, -0.7, 1.1)
+    parent = make_part("a", ((0., 0., 0.), (2, 2, 2)), angles=angles)
+    # The child sits right next to its parent in the parent's space.
+    parent.children.append(make_part("b", ((0., 0., 0.), (2, 2, 2)), pivot=(2., 0., 0.)))
+    model_data = make_model(parent)
+    occlusion.cull_hidden_faces(model_data)
+    assert get_hidden_faces(model_data) == [POSITIVE_X, NEGATIVE_X]
+
+
+def test_animated_parts_do_not_cover_each_other():
+    parent = make_part("a", ((0., 0., 0.), (2, 2, 2)))
+    parent.children.append(make_part("b", ((0., 0., 0.), (2, 2, 2)), pivot=(2., 0., 0.)))
+    model_data = make_model(parent)
+    clip = model.Clip("wave", 0, 2, [model.Track("b", {"angle_x": [0., 1.]})])
+    assert occlusion.cull_hidden_faces(model_data, [clip])[0] == 0
+
+
+@pytest.mark.parametrize("levels, expected", [
+    ({"big": 0, "small": 0}, [POSITIVE_X, NEGATIVE_X]),
+    # The small part is hidden from level 1 on, the big one would show a hole there.
+    ({"big": 0, "small": 1}, [0, NEGATIVE_X]),
+    ({"big": 2, "small": 1}, [0, NEGATIVE_X]),
+    ({"big": 1, "small": 1}, [POSITIVE_X, NEGATIVE_X]),
+])
+def test_levels_of_detail(levels, expected):
+    model_data = make_model(make_part("big", ((0., 0., 0.), (2, 2, 2))),
+                            make_part("small", ((2., 0., 0.), (2, 2, 2))))
+    occlusion.cull_hidden_faces(model_data, hidden_levels=levels)
+    assert get_hidden_faces(model_data) == expected
+
+
+def test_find_neighbours_with_oversized_boxes():
+    bounds = [((x, 0., 0.), (x + 1., 1., 1.)) for x in range(0, 20, 2)]
+    # Far larger than the typical box, it touches all of them.
+    bounds.append(((-100., -100., -100.), (100., 100., 0.)))
+    bounds.append(((0.5, 0., 0.), (2.5, 1., 1.)))
+    neighbours = occlusion.find_neighbours(bounds)
+    assert neighbours[10] == set(range(10)) | {11}
+    assert neighbours[11] == {0, 1, 10}
+    assert neighbours[5] == {10}
@@ -0,0 +1,60 @@
+import io
+
+import pytest
+
+from MCExport.Exporter import model
+from MCExport.Exporter import partdata
+
+
+def make_model() -> model.Model:
+    body = model.Part("body", (0., 12., 0.), (0.1, 0., 0.), [
+        model.Box(0, 0, -4., -6., -2., 8, 12, 4, hidden_faces=0b000011),
+        model.Box(24, 0, -1., -1., -1., 2, 2, 2, inflate=0.5),
+    ])
+    head = model.Part("head", (0., -6., 0.), (0., 0.5, 0.), [model.Box(0, 16, -4., -8., -4., 8, 8, 8)], mirror=False)
+    body.children.append(head)
+    tail = model.Part("tail", (0., 10., 2.), boxes=[model.Box(32, 0, 0., 0., 0., 1, 1, 6)])
+    return model.Model("Test", 64, 32, [body, tail])
+
+
+def get_flags(data: bytes) -> list:
+    part_count = partdata.HEADER.unpack_from(data, 0)[3]
+    return [partdata.PART_ENTRY.unpack_from(data, partdata.HEADER.size + i * partdata.PART_ENTRY.size)[2]
+            for i in range(part_count)]
+
+
+def test_round_trip():
+    model_data = make_model()
+    file = io.BytesIO()
+    written = partdata.write_part_data(file, model_data)
+    assert written == len(file.getvalue())
+    restored = partdata.read_part_data(file.getvalue())
+    assert [(part.name, parent.name if parent else None) for part, parent in restored.iter_hierarchy()] == \
+           [(part.name, parent.name if parent else None) for part, parent in model_data.iter_hierarchy()]
+    for part, original in zip(restored.iter_parts(), model_data.iter_parts()):
+        assert part.pivot == pytest.approx(original.pivot)
+        assert part.angles == pytest.approx(original.angles)
+        assert part.mirror == original.mirror
+        assert len(part.boxes) == len(original.boxes)
+        for box, original_box in zip(part.boxes, original.boxes):
+            assert [getattr(box, name) for name in model.Box.__slots__] == \
+                   pytest.approx([getattr(original_box, name) for name in model.Box.__slots__])
+
+
+def test_flags():
+    model_data = make_model()
+    file = io.BytesIO()
+    # The head (8 pixels) gets smaller than 2 pixels on screen before 200 blocks, the body (12 pixels)
+    # before 400. The static tail is always shown.
+    partdata.write_part_data(file, model_data, static_roots={"tail"}, lod_distances=(200., 400.))
+    mirror, static, shift = partdata.FLAG_MIRROR, partdata.FLAG_STATIC, partdata.LOD_LEVEL_SHIFT
+    assert get_flags(file.getvalue()) == [mirror | 2 << shift, 1 << shift, mirror | static]
+
+
+def test_other_versions_are_rejected():
+    file = io.BytesIO()
+    partdata.write_part_data(file, make_model())
+    data = bytearray(file.getvalue())
+    data[4] += 1
+    with pytest.raises(ValueError):
+        partdata.read_part_data(bytes(data))
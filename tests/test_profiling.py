@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from MCExport.Exporter import profiling
+from MCExport.Exporter import steps
+
+
+def iter_work(profile):
+    with profiling.activate(profile):
+        with profiling.phase("bake"):
+            for _ in range(3):
+                time.sleep(0.01)
+                profiling.count("frames")
+                yield 0.5
+        with profiling.phase("write"):
+            data = bytearray(1 << 20)
+            yield 1.
+            del data
+
+
+def test_phases_add_up():
+    profile = profiling.Profile()
+    steps.run(iter_work(profile))
+    assert sum(entry["time"] for entry in profile.phases.values()) == pytest.approx(profile.total_time)
+    assert profile.phases["bake"]["time"] >= 0.03
+    assert profile.counters == {"frames": 3}
+    assert profile.peak_memory >= 1 << 20
+    assert profiling.get_active() is None
+
+
+def test_time_between_slices_is_not_booked():
+    profile = profiling.Profile()
+    work = iter_work(profile)
+    finished = False
+    while not finished:
+        with profiling.resumed(profile):
+            finished, _, _ = steps.advance(work, 0.)
+        assert profiling.get_active() is None
+        # Blender's interface running between the slices.
+        time.sleep(0.05)
+        profiling.count("frames")
+    assert profile.total_time < 0.15
+    assert profile.phases["bake"]["time"] >= 0.03
+    assert profile.phases["write"]["time"] < 0.05
+    assert profile.counters == {"frames": 3}
+    assert profile.peak_memory >= 1 << 20
+
+
+def test_cancelled_export_books_nothing_after_the_last_slice():
+    profile = profiling.Profile()
+    work = iter_work(profile)
+    with profiling.resumed(profile):
+        steps.advance(work, 0.)
+    time.sleep(0.05)
+    work.close()
+    assert profile.total_time < 0.05
+    assert not profile.is_suspended()
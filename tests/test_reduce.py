@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from MCExport.Exporter import model
+from MCExport.Exporter import reduce
+
+
+def get_max_error(samples, keys) -> float:
+    """Largest difference between the samples and the interpolation of the kept frames."""
+
+    frames = np.arange(len(samples))
+    keys = np.asarray(keys)
+    return float(np.abs(np.interp(frames, keys, samples[keys]) - samples).max())
+
+
+def make_channels(channel_count: int, frame_count: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    frames = np.linspace(0., 4. * np.pi, frame_count)
+    phases = rng.uniform(0., np.pi, (channel_count, 1))
+    noise = rng.normal(0., 0.01, (channel_count, frame_count))
+    return np.sin(frames + phases) * rng.uniform(0.1, 5., (channel_count, 1)) + noise
+
+
+@pytest.mark.parametrize("channel_count", [1, reduce.VECTORIZE_MIN_CHANNELS + 8])
+@pytest.mark.parametrize("tolerance", [0.001, 0.05])
+def test_error_bound(channel_count, tolerance):
+    samples = make_channels(channel_count, 300)
+    all_keys = reduce.reduce_channels(samples, [tolerance] * channel_count)
+    for row, keys in zip(samples, all_keys):
+        assert keys[0] == 0 and keys[-1] == len(row) - 1
+        assert list(keys) == sorted(set(keys))
+        assert len(keys) < len(row)
+        assert get_max_error(row, keys) <= tolerance + 1e-9
+
+
+def test_sequential_and_vectorized_search_agree():
+    samples = make_channels(reduce.VECTORIZE_MIN_CHANNELS, 200, seed=2)
+    tolerances = np.linspace(0.001, 0.1, len(samples))
+    vectorized = reduce.reduce_channels(samples, tolerances)
+    for row, tolerance, keys in zip(samples, tolerances, vectorized):
+        assert list(reduce.reduce_channels(row[np.newaxis], [tolerance])[0]) == list(keys)
+
+
+def test_linear_channels_keep_their_ends():
+    samples = np.array([np.full(50, 3.), np.linspace(-1., 2., 50)])
+    assert [list(keys) for keys in reduce.reduce_channels(samples, [1e-6, 1e-6])] == [[0, 49], [0, 49]]
+
+
+def test_short_channels_are_kept():
+    assert [list(keys) for keys in reduce.reduce_channels([[1., 2.]], [10.])] == [[0, 1]]
+
+
+def test_reduce_clips_only_stores_smaller_channels():
+    frames = np.arange(100)
+    track = model.Track("body", {"angle_x": np.sin(frames / 10.), "angle_y": np.random.default_rng(3).normal(size=100),
+                                 "pivot_x": frames * 0.5})
+    clip = model.Clip("walk", 0, 100, [track])
+    stats = reduce.reduce_clips([clip], pivot_tolerance=0.01, angle_tolerance=0.01)
+    # Noise can not be reduced and stays dense.
+    assert "angle_y" not in track.keyframes
+    assert list(track.keyframes["pivot_x"]) == [0, 99]
+    keys = np.asarray(track.keyframes["angle_x"])
+    samples = np.sin(frames / 10.).astype(np.float32)
+    assert get_max_error(samples, keys) <= 0.01 + 1e-6
+    assert stats == [("walk", 300, 100 + 2 + len(keys))]